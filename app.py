@@ -1,11 +1,31 @@
+import hashlib
+import hmac
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, session, make_response, g, jsonify, send_file
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
 from functools import wraps
+import images
+import metrics
+import profiles
+import search as site_search
+import templating
+import uploads
 import utils
 import uuid
 
+class UploadRequest(Request):
+    """Spools uploaded files to disk past UPLOAD_SPOOL_SIZE instead of holding them in memory."""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_SIZE'], mode='rb+')
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.secret_key = 'supersecretkey' # Needed for flash messages
 app.config['UPLOAD_FOLDER'] = 'static/images/faculty'
 app.config['GALLERY_FOLDER'] = 'static/images/gallery'
@@ -19,6 +39,59 @@ app.config['LABS_FOLDER'] = 'static/images/labs'
 app.config['ADMIN_USERNAME'] = 'admin'
 app.config['ADMIN_PASSWORD'] = 'password123'
 
+# Rendered page cache for public routes (see cached_page)
+app.config['PAGE_CACHE_TTL'] = float(os.environ.get('PAGE_CACHE_TTL', utils.CACHE_TTL))
+app.config['PAGE_CACHE_MAX_ENTRIES'] = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 256))
+
+# Cache-Control policy per route type. Pages are revalidated on every visit
+# (cheap, thanks to ETags); images rarely change once uploaded.
+app.config['CACHE_CONTROL'] = {
+    'page': os.environ.get('CACHE_CONTROL_PAGE', 'public, no-cache'),
+    'image': os.environ.get('CACHE_CONTROL_IMAGE', 'public, max-age=86400'),
+    # Uploads are named after their content, so a URL never changes what it serves
+    'immutable': os.environ.get('CACHE_CONTROL_IMMUTABLE', 'public, max-age=31536000, immutable'),
+}
+def _source_digest():
+    """Hash of the app's code and templates: the same on every process and instance of a deploy."""
+    base = os.path.dirname(os.path.abspath(__file__))
+    paths = [name for name in os.listdir(base) if name.endswith('.py')]
+    for root, _, files in os.walk(os.path.join(base, 'templates')):
+        paths += [os.path.relpath(os.path.join(root, name), base) for name in files]
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        h.update(path.encode('utf-8') + b'\0')
+        with open(os.path.join(base, path), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+# Part of every page ETag so a new deploy (changed templates) never matches an old one
+app.config['BUILD_ID'] = os.environ.get('BUILD_ID') or os.environ.get('VERCEL_GIT_COMMIT_SHA') or _source_digest()
+
+# Admin uploads go to Cloud Storage from a background pool (see uploads.py).
+# Off by default on Vercel: it freezes the process after the response, so a
+# worker may never finish, and the staged copy in /tmp is only on one instance.
+app.config['BACKGROUND_UPLOADS'] = os.environ.get('BACKGROUND_UPLOADS', '0' if os.environ.get('VERCEL') else '1') != '0'
+
+# Upload limits. Requests over MAX_CONTENT_LENGTH are refused before the body
+# is read; images are checked from their header bytes before anything is stored.
+app.config['MAX_CONTENT_LENGTH'] = int(float(os.environ.get('MAX_UPLOAD_MB', 32)) * 1024 * 1024)
+app.config['UPLOAD_SPOOL_SIZE'] = int(os.environ.get('UPLOAD_SPOOL_KB', 512)) * 1024
+app.config['UPLOAD_IMAGE_FORMATS'] = images.SNIFFED_FORMATS
+app.config['UPLOAD_MAX_PIXELS'] = int(os.environ.get('UPLOAD_MAX_PIXELS', 40_000_000))
+
+# /metrics is open to a logged-in admin, and to a scraper sending
+# "Authorization: Bearer <METRICS_TOKEN>" when a token is set
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+
+# Templates load from precompiled bytecode (see templating.py). They are
+# re-read from disk when edited only while debugging, or with
+# TEMPLATES_AUTO_RELOAD=1; otherwise each process compiles them once. Shared
+# blocks such as the layout's header, nav and footer are wrapped in
+# {% cache %} and rendered once per process (or data change).
+app.config['TEMPLATES_AUTO_RELOAD'] = True if os.environ.get('TEMPLATES_AUTO_RELOAD') == '1' else None
+app.jinja_options = dict(app.jinja_options, bytecode_cache=templating.BytecodeCache(),
+                        extensions=[templating.FragmentCache])
+
 # Helper for directory creation (handles read-only systems like Vercel)
 def safe_makedirs(path):
     try:
@@ -29,80 +102,348 @@ def safe_makedirs(path):
         else:
             raise
 
+def _local_path(folder, name):
+    """Local copy location: /tmp on Vercel, else the static folder (served by serve_tmp_images)."""
+    base_folder = '/tmp' if os.environ.get('VERCEL') else '.'
+    full_folder = os.path.join(base_folder, folder)
+    os.makedirs(full_folder, exist_ok=True)
+    return os.path.join(full_folder, name)
+
+def _local_url(folder, name):
+    return '/' + '/'.join(folder.split(os.sep)) + '/' + name
+
+# Uploaded files are stored as <sha256 prefix>[-<width>].<ext>: the same image
+# uploaded twice maps to one object and is never uploaded again
+CONTENT_NAME_LENGTH = 32
+_CONTENT_NAME = re.compile(r'^[0-9a-f]{%d}(-\d+)?\.\w+$' % CONTENT_NAME_LENGTH)
+
+def _content_name(digest, ext, suffix=''):
+    return f"{digest[:CONTENT_NAME_LENGTH]}{suffix}{ext.lower()}"
+
+def _copy_hashed(stream, out=None):
+    """Reads a stream in chunks (copying it to out, if given). Returns its SHA-256 hex digest."""
+    h = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        h.update(chunk)
+        if out:
+            out.write(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+def _uploads_queued():
+    return app.config['BACKGROUND_UPLOADS'] and utils.firebase_enabled()
+
+def _stage_upload(local_path, folder, name, content_type, refs):
+    """Remembers a locally saved file for queue_uploads to hand to the upload pool."""
+    if 'staged_uploads' not in g:
+        g.staged_uploads = []
+    g.staged_uploads.append({
+        'path': local_path,
+        'blob': f"{folder}/{name}",
+        'content_type': content_type,
+        'cache_control': app.config['CACHE_CONTROL']['immutable'],
+        'refs': refs,
+    })
+
+def queue_uploads(filename, record_id, path=None):
+    """Queues this request's staged files; the record is patched with their URLs when done."""
+    staged = g.pop('staged_uploads', None)
+    if not staged:
+        return None
+    job_id = uploads.submit(staged, target=(filename, record_id, path))
+    flash(f'Images are uploading in the background (job {job_id}).', 'info')
+    return job_id
+
+@app.teardown_request
+def _flush_staged_uploads(exc):
+    # Files staged by a route that didn't call queue_uploads are still uploaded
+    staged = g.pop('staged_uploads', None)
+    if staged:
+        uploads.submit(staged)
+
+# Request Metrics
+# Each request's latency is recorded under its endpoint (the view function's
+# name) and exported at /metrics along with the metrics utils keeps for
+# collection loads, saves and the data cache.
+REQUEST_SECONDS = metrics.histogram(
+    'site_request_seconds', 'Time to handle a request, by endpoint.', ('endpoint', 'method'))
+REQUESTS = metrics.counter(
+    'site_requests_total', 'Requests handled, by endpoint and status.', ('endpoint', 'method', 'status'))
+PAGE_CACHE_REQUESTS = metrics.counter(
+    'site_page_cache_requests_total', 'Rendered page cache lookups (not_modified: answered with a 304).', ('result',))
+FILE_STORE_SECONDS = metrics.histogram(
+    'site_file_store_seconds', 'Time to store an uploaded or generated file.', ('folder', 'backend'))
+CACHE_ENTRIES = metrics.gauge('site_cache_entries', 'Entries in the in-memory caches.', ('cache',))
+PENDING_UPLOADS = metrics.gauge('site_pending_uploads', 'Files waiting for the background upload pool.')
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+        REQUESTS.inc(endpoint, request.method, response.status_code)
+    return response
+
+# On-demand profiling (see profiles.py). Registered after the timer, so its
+# after_request hook runs first and the profile ends before the timing does.
+def _profile_requested():
+    # Only a request carrying the flag looks at the session, so other
+    # responses don't pick up a Vary: Cookie header
+    flagged = request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1'
+    return flagged and 'logged_in' in session
+
+@app.before_request
+def _start_profiler():
+    if _profile_requested():
+        profiler = profiles.start()
+        if profiler:
+            g.profiler = profiler
+
+@app.after_request
+def _save_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        try:
+            response.headers['X-Profile'] = profiles.save(profiler, {
+                'endpoint': request.endpoint, 'method': request.method, 'path': request.full_path.rstrip('?'),
+                'status': response.status_code,
+                'seconds': round(time.perf_counter() - g.get('request_started', time.perf_counter()), 4),
+            })
+        except OSError as e:
+            print(f"Profile save error: {e}")
+    return response
+
+@app.teardown_request
+def _stop_profiler(exc):
+    # Still running if the request failed before after_request
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+def _file_stored(started, folder, backend):
+    FILE_STORE_SECONDS.observe(time.perf_counter() - started, os.path.basename(folder), backend)
+
+def check_image_upload(file):
+    """Returns None if an upload looks like an acceptable image, else the reason it doesn't.
+
+    Only the header bytes are read, so bad files are turned away before any
+    hashing, processing or storage I/O.
+    """
+    info = images.sniff(file.stream)
+    if not info or info[0] not in app.config['UPLOAD_IMAGE_FORMATS']:
+        allowed = ', '.join(fmt.upper() for fmt in app.config['UPLOAD_IMAGE_FORMATS'])
+        return f"not a supported image (use {allowed})"
+    fmt, width, height = info
+    if not width or not height:
+        return "image has no dimensions"
+    if width * height > app.config['UPLOAD_MAX_PIXELS']:
+        return f"image is too large ({width}x{height} pixels)"
+    return None
+
+def _reject_upload(file):
+    """Flashes and returns True if an upload fails check_image_upload."""
+    problem = check_image_upload(file)
+    if problem:
+        print(f"Rejected upload {file.filename}: {problem}")
+        flash(f"Upload {file.filename} rejected: {problem}.", 'danger')
+        return True
+    return False
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    flash(f"Upload rejected: the request is larger than {limit_mb:g} MB.", 'danger')
+    return redirect(request.referrer or url_for('index'))
+
+def _save_hashed(file, folder, ext):
+    """Saves an upload locally under its content name. Returns (name, local path)."""
+    # Hash while copying to disk, then move the copy to its content name
+    part_path = _local_path(folder, f".{uuid.uuid4().hex}.part")
+    try:
+        with open(part_path, 'wb') as out:
+            digest = _copy_hashed(file.stream, out)
+        name = _content_name(digest, ext)
+        local_path = _local_path(folder, name)
+        os.replace(part_path, local_path)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return name, local_path
+
 # Helper to save uploaded files safely (handles Firebase Cloud Storage)
 def save_file_safely(file, folder):
     filename = secure_filename(file.filename)
-    if not filename:
+    if not filename or _reject_upload(file):
         return ""
+    started = time.perf_counter()
         
     # Standard path for local development fallback or if Firebase is not available
     target_path = os.path.join(folder, filename)
     
+    # Stage locally and let the upload pool push it to Firebase
+    if _uploads_queued():
+        try:
+            name, local_path = _save_hashed(file, folder, os.path.splitext(filename)[1])
+            _stage_upload(local_path, folder, name, file.content_type, [name])
+            _file_stored(started, folder, 'queued')
+            return name
+        except Exception as e:
+            print(f"Upload staging error: {e}")
+
     # Firebase Storage Upload
-    from firebase_admin import storage
-    try:
-        bucket = storage.bucket()
-        if bucket:
-            # Create a unique blob name using UUID to avoid collisions
-            ext = os.path.splitext(filename)[1]
-            blob_name = f"{folder}/{uuid.uuid4()}{ext}"
-            blob = bucket.blob(blob_name)
-            
-            # Reset file pointer and upload
-            file.seek(0)
-            blob.upload_from_file(file, content_type=file.content_type)
-            
-            # Make the blob publicly viewable
-            blob.make_public()
-            print(f"Uploaded to Firebase: {blob.public_url}")
-            return blob.public_url
-    except Exception as e:
-        print(f"Firebase Storage upload error: {e}")
+    if utils.firebase_enabled():
+        from firebase_admin import storage
+        try:
+            bucket = storage.bucket()
+            if bucket:
+                # Name the blob after its content; a duplicate is not uploaded again
+                ext = os.path.splitext(filename)[1]
+                blob_name = f"{folder}/{_content_name(_copy_hashed(file.stream), ext)}"
+                url = uploads.publish(
+                    bucket, blob_name,
+                    lambda blob, **options: blob.upload_from_file(file, content_type=file.content_type, **options),
+                    app.config['CACHE_CONTROL']['immutable'])
+                print(f"Uploaded to Firebase: {url}")
+                _file_stored(started, folder, 'firebase')
+                return url
+        except Exception as e:
+            print(f"Firebase Storage upload error: {e}")
 
     # Fallback to local /tmp on Vercel or local static folder
     try:
-        base_folder = '/tmp' if os.environ.get('VERCEL') else '.'
-        full_folder = os.path.join(base_folder, folder)
-        os.makedirs(full_folder, exist_ok=True)
-        
-        final_path = os.path.join(full_folder, filename)
-        file.seek(0)
-        file.save(final_path)
-        return filename
+        name, _ = _save_hashed(file, folder, os.path.splitext(filename)[1])
+        _file_stored(started, folder, 'local')
+        return name
     except Exception as e:
         print(f"Fallback save error: {e}")
         return ""
 
+def apply_cache_control(response, route_type):
+    """Sets the configured Cache-Control policy for a route type ('page', 'image' or 'immutable')."""
+    policy = app.config['CACHE_CONTROL'].get(route_type)
+    if policy:
+        response.headers['Cache-Control'] = policy
+    return response
+
+def _store_bytes(data, folder, name, content_type):
+    """Stores generated file content. Returns (value for the record, public URL)."""
+    started = time.perf_counter()
+    if _uploads_queued():
+        try:
+            local_path = _local_path(folder, name)
+            with open(local_path, 'wb') as f:
+                f.write(data)
+            url = _local_url(folder, name)
+            _stage_upload(local_path, folder, name, content_type, [name, url])
+            _file_stored(started, folder, 'queued')
+            return name, url
+        except Exception as e:
+            print(f"Upload staging error: {e}")
+
+    if utils.firebase_enabled():
+        from firebase_admin import storage
+        try:
+            url = uploads.publish(
+                storage.bucket(), f"{folder}/{name}",
+                lambda blob, **options: blob.upload_from_string(data, content_type=content_type, **options),
+                app.config['CACHE_CONTROL']['immutable'])
+            _file_stored(started, folder, 'firebase')
+            return url, url
+        except Exception as e:
+            print(f"Firebase Storage upload error: {e}")
+
+    # Fallback to local /tmp on Vercel or local static folder (served by serve_tmp_images)
+    try:
+        with open(_local_path(folder, name), 'wb') as f:
+            f.write(data)
+        _file_stored(started, folder, 'local')
+        return name, _local_url(folder, name)
+    except Exception as e:
+        print(f"Fallback save error: {e}")
+        return "", ""
+
+# Helper to save uploaded images as responsive variants
+def save_image_safely(file, folder):
+    """Saves an uploaded image as resized WebP/JPEG variants (EXIF stripped).
+
+    Returns (image, srcset): image is the largest JPEG, stored the same way
+    save_file_safely stores files so existing templates keep working, and
+    srcset maps 'webp'/'jpeg' to srcset strings. Falls back to storing the
+    original (with an empty srcset) if Pillow is missing or the file can't
+    be processed. Rejected uploads (see check_image_upload) return ("", {}).
+    """
+    if not secure_filename(file.filename) or _reject_upload(file):
+        return "", {}
+    variants = images.make_variants(file.stream)
+    if not variants:
+        return save_file_safely(file, folder), {}
+
+    image = ""
+    srcset = {fmt: [] for fmt in images.FORMATS}
+    for width, fmt, data in variants:
+        ext, content_type = images.FORMATS[fmt]
+        name = _content_name(hashlib.sha256(data).hexdigest(), f".{ext}", f"-{width}")
+        value, url = _store_bytes(data, folder, name, content_type)
+        if not value:
+            return save_file_safely(file, folder), {}
+        srcset[fmt].append(f"{url} {width}w")
+        if fmt == 'jpeg':
+            image = value
+    return image, {fmt: ', '.join(entries) for fmt, entries in srcset.items()}
+
+@app.template_global()
+def picture_sources(srcset, sizes='100vw'):
+    """Emits the WebP <source> for a <picture>, given a record's *_srcset field."""
+    if not srcset or not srcset.get('webp'):
+        return ''
+    return Markup('<source type="image/webp" srcset="{}" sizes="{}">').format(srcset['webp'], sizes)
+
+@app.template_global()
+def img_srcset(srcset, sizes='100vw'):
+    """Emits JPEG srcset/sizes attributes for an <img>, given a record's *_srcset field."""
+    if not srcset or not srcset.get('jpeg'):
+        return ''
+    return Markup(' srcset="{}" sizes="{}"').format(srcset['jpeg'], sizes)
+
 # Custom route to serve static files from /tmp on Vercel
 @app.route('/static/images/<path:filename>')
 def serve_tmp_images(filename):
     from flask import send_from_directory
+    # send_from_directory answers If-None-Match / If-Modified-Since with a 304
+    # using a strong ETag built from the file's mtime, size and path
     # Try standard static first
     static_folder = os.path.join(app.root_path, 'static', 'images')
     if os.path.exists(os.path.join(static_folder, filename)):
-        return send_from_directory(static_folder, filename)
-    
-    # Fallback to /tmp
-    tmp_folder = os.path.join('/tmp', 'static', 'images')
-    return send_from_directory(tmp_folder, filename)
+        response = send_from_directory(static_folder, filename)
+    else:
+        # Fallback to /tmp
+        tmp_folder = os.path.join('/tmp', 'static', 'images')
+        response = send_from_directory(tmp_folder, filename)
+    if _CONTENT_NAME.match(os.path.basename(filename)):
+        return apply_cache_control(response, 'immutable')
+    return apply_cache_control(response, 'image')
 
 @app.route('/favicon.ico')
 def favicon_ico():
-    return app.send_static_file('favicon.ico')
+    return apply_cache_control(app.send_static_file('favicon.ico'), 'image')
 
 @app.route('/favicon.png')
 def favicon_png():
-    return app.send_static_file('favicon.png')
-
-# Ensure upload directory exists locally (won't affect Vercel root but good for local)
-if not os.environ.get('VERCEL'):
-    safe_makedirs(app.config['UPLOAD_FOLDER'])
-    safe_makedirs(app.config['GALLERY_FOLDER'])
-    safe_makedirs(app.config['NEWS_FOLDER'])
-    safe_makedirs(app.config['PLACEMENTS_FOLDER'])
-    safe_makedirs(app.config['FACILITIES_FOLDER'])
-    safe_makedirs(app.config['ACTIVITIES_FOLDER'])
-    safe_makedirs(app.config['LABS_FOLDER'])
+    return apply_cache_control(app.send_static_file('favicon.png'), 'image')
+
+# Upload directories are created on demand by save_file_safely, so nothing
+# is touched on the filesystem at import (keeps serverless cold starts cheap)
+
+def page_args():
+    """Returns (limit, cursor) from the ?limit= and ?cursor= of a paged listing."""
+    return request.args.get('limit', type=int), request.args.get('cursor') or None
 
 # Login Required Decorator
 def login_required(f):
@@ -114,12 +455,98 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Rendered Page Cache
+# Public pages are stored as rendered responses keyed by the request path plus
+# the content versions of the collections they read. When a collection
+# changes, utils notifies us and exactly the pages that read it are dropped.
+_page_cache = OrderedDict()  # (full_path, versions) -> (expires_at, collections, body, status, headers)
+_page_deps = {}  # collection key -> set of page cache keys
+_page_cache_lock = threading.Lock()
+page_cache_stats = {'hits': 0, 'misses': 0}
+
+def _forget_page(page_key):
+    entry = _page_cache.pop(page_key, None)
+    if entry:
+        for key in entry[1]:
+            _page_deps.get(key, set()).discard(page_key)
+
+@utils.on_change
+def _drop_dependent_pages(key, version):
+    with _page_cache_lock:
+        for page_key in list(_page_deps.pop(key, ())):
+            _forget_page(page_key)
+
+def _page_etag(full_path, versions):
+    raw = '|'.join([app.config['BUILD_ID'], full_path] + [str(v) for v in versions])
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=12).hexdigest()
+
+def clear_page_cache():
+    with _page_cache_lock:
+        _page_cache.clear()
+        _page_deps.clear()
+
+def cached_page(*collections):
+    """Caches a public GET route's response until a collection it reads changes.
+
+    Responses carry an ETag derived from the same versions, so a browser or
+    CDN revalidating an unchanged page gets a 304 without any rendering.
+    """
+    keys = tuple(c.replace('.json', '') for c in collections)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            ttl = app.config['PAGE_CACHE_TTL']
+            # A profiled request renders the page rather than timing a cache hit
+            if request.method != 'GET' or ttl <= 0 or 'profiler' in g:
+                return f(*args, **kwargs)
+
+            versions = tuple(utils.collection_version(c) for c in collections)
+            etag = _page_etag(request.full_path, versions)
+            if etag in request.if_none_match:
+                PAGE_CACHE_REQUESTS.inc('not_modified')
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                return apply_cache_control(response, 'page')
+
+            page_key = (request.full_path, versions)
+            with _page_cache_lock:
+                entry = _page_cache.get(page_key)
+                if entry and entry[0] > time.monotonic():
+                    _page_cache.move_to_end(page_key)
+                    page_cache_stats['hits'] += 1
+                    PAGE_CACHE_REQUESTS.inc('hit')
+                    _, _, body, status, headers = entry
+                    return app.response_class(body, status=status, headers=headers)
+                page_cache_stats['misses'] += 1
+                PAGE_CACHE_REQUESTS.inc('miss')
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                apply_cache_control(response, 'page')
+            if response.status_code == 200 and not response.direct_passthrough:
+                headers = [(k, v) for k, v in response.headers if k.lower() != 'set-cookie']
+                with _page_cache_lock:
+                    _forget_page(page_key)
+                    _page_cache[page_key] = (time.monotonic() + ttl, keys, response.get_data(), 200, headers)
+                    for key in keys:
+                        _page_deps.setdefault(key, set()).add(page_key)
+                    while len(_page_cache) > app.config['PAGE_CACHE_MAX_ENTRIES']:
+                        _forget_page(next(iter(_page_cache)))
+            return response
+        return decorated_function
+    return decorator
+
 @app.route('/')
+@cached_page('news.json', 'placements.json', 'announcements.json')
 def index():
-    news_items = utils.load_json('news.json')
-    placement_data = utils.load_json('placements.json')
+    # Fetched together so cold collections load in parallel; the latest
+    # news then comes straight from the cached sorted index
+    _, placement_data, announcements = utils.load_many(
+        'news.json', 'placements.json', 'announcements.json')
+    news_items, _ = utils.load_page('news.json', 3)
     stories = placement_data.get('stories', []) if placement_data else []
-    announcements = utils.load_json('announcements.json')
     return render_template('index.html', news=news_items, stories=stories, announcements=announcements)
 
 # --- Admin Routes ---
@@ -147,12 +574,70 @@ def admin_logout():
 @app.route('/admin/dashboard')
 @login_required
 def admin_dashboard():
+    faculty_list, news_list, activities_list = utils.load_many(
+        'faculty.json', 'news.json', 'activities.json')
     stats = {
-        'faculty': len(utils.load_json('faculty.json')),
-        'news': len(utils.load_json('news.json')),
-        'activities': len(utils.load_json('activities.json'))
+        'faculty': len(faculty_list),
+        'news': len(news_list),
+        'activities': len(activities_list)
     }
-    return render_template('admin/dashboard.html', stats=stats)
+    return render_template('admin/dashboard.html', stats=stats, profiles=profiles.recent())
+
+# --- Request Profiles (see profiles.py) ---
+@app.route('/admin/profiles/<name>')
+@login_required
+def download_profile(name):
+    stats_path = profiles.path(name)
+    if not stats_path:
+        return jsonify(error='Unknown profile'), 404
+    return send_file(stats_path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f"{name}.pstats")
+
+@app.route('/admin/profiles/<name>/summary')
+@login_required
+def profile_summary(name):
+    text = profiles.summary(name)
+    if text is None:
+        return jsonify(error='Unknown profile'), 404
+    return app.response_class(text, mimetype='text/plain')
+
+# --- Background Upload Status ---
+@app.route('/admin/uploads')
+@login_required
+def upload_jobs():
+    return jsonify(pending=uploads.pending_count(), jobs=uploads.recent_jobs())
+
+@app.route('/admin/uploads/<job_id>')
+@login_required
+def upload_status(job_id):
+    job = uploads.status(job_id)
+    if not job:
+        return jsonify(error='Unknown upload job'), 404
+    return jsonify(job)
+
+# --- Metrics (Prometheus text format) ---
+@app.route('/metrics')
+def metrics_export():
+    token = app.config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return _metrics_response()
+    if 'Authorization' in request.headers:
+        return app.response_class('Invalid metrics token.\n', status=401, mimetype='text/plain')
+    return _admin_metrics()
+
+@login_required
+def _admin_metrics():
+    return _metrics_response()
+
+def _metrics_response():
+    CACHE_ENTRIES.set(utils.cache_stats()['entries'], 'data')
+    with _page_cache_lock:
+        CACHE_ENTRIES.set(len(_page_cache), 'page')
+    CACHE_ENTRIES.set(templating.fragment_count(), 'fragment')
+    PENDING_UPLOADS.set(uploads.pending_count())
+    response = app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 # --- Faculty Management ---
 @app.route('/admin/faculty', methods=['GET', 'POST'])
@@ -170,11 +655,11 @@ def manage_faculty():
         specialization = request.form.get('specialization')
         
         # Handle Image Upload
-        image_filename = ""
+        image_filename, image_srcset = "", {}
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                image_filename = save_file_safely(file, app.config['UPLOAD_FOLDER'])
+                image_filename, image_srcset = save_image_safely(file, app.config['UPLOAD_FOLDER'])
 
         new_faculty = {
             "id": str(uuid.uuid4()),
@@ -183,6 +668,7 @@ def manage_faculty():
             "role": role,
             "designation": designation,
             "image": image_filename,
+            "image_srcset": image_srcset,
             "bio": bio,
             "experience": experience,
             "email": email,
@@ -190,44 +676,48 @@ def manage_faculty():
             "specialization": specialization
         }
         
-        faculty_list = utils.load_json('faculty.json')
-        faculty_list.append(new_faculty)
-        utils.save_json('faculty.json', faculty_list)
+        utils.append_record('faculty.json', new_faculty)
+        queue_uploads('faculty.json', new_faculty['id'])
         flash('Faculty member added successfully!', 'success')
         return redirect(url_for('manage_faculty'))
         
-    faculty_list = utils.load_json('faculty.json')
+    faculty_list, next_cursor = utils.load_page('faculty.json', *page_args())
     departments_list = utils.load_json('departments.json')
-    return render_template('admin/manage_faculty.html', faculty=faculty_list, departments=departments_list)
+    return render_template('admin/manage_faculty.html', faculty=faculty_list, departments=departments_list,
+                           next_cursor=next_cursor)
 
 @app.route('/admin/faculty/edit/<id>', methods=['GET', 'POST'])
 @login_required
 def edit_faculty(id):
-    faculty_list = utils.load_json('faculty.json')
-    faculty_member = next((f for f in faculty_list if f['id'] == id), None)
+    faculty_member = utils.get_record('faculty.json', id)
     
     if not faculty_member:
         flash('Faculty member not found.', 'danger')
         return redirect(url_for('manage_faculty'))
 
     if request.method == 'POST':
-        faculty_member['name'] = request.form.get('name')
-        faculty_member['department'] = request.form.get('department')
-        faculty_member['role'] = request.form.get('role')
-        faculty_member['designation'] = request.form.get('designation')
-        faculty_member['bio'] = request.form.get('bio')
-        faculty_member['experience'] = request.form.get('experience')
-        faculty_member['email'] = request.form.get('email')
-        faculty_member['qualification'] = request.form.get('qualification')
-        faculty_member['specialization'] = request.form.get('specialization')
+        updates = {
+            'name': request.form.get('name'),
+            'department': request.form.get('department'),
+            'role': request.form.get('role'),
+            'designation': request.form.get('designation'),
+            'bio': request.form.get('bio'),
+            'experience': request.form.get('experience'),
+            'email': request.form.get('email'),
+            'qualification': request.form.get('qualification'),
+            'specialization': request.form.get('specialization')
+        }
         
         # Handle Image Upload - Only update if a new file is provided
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                faculty_member['image'] = save_file_safely(file, app.config['UPLOAD_FOLDER'])
+                image, image_srcset = save_image_safely(file, app.config['UPLOAD_FOLDER'])
+                if image: # Keep the current image if the upload was rejected
+                    updates['image'], updates['image_srcset'] = image, image_srcset
 
-        utils.save_json('faculty.json', faculty_list)
+        utils.update_record('faculty.json', id, updates)
+        queue_uploads('faculty.json', id)
         flash('Faculty details updated!', 'success')
         return redirect(url_for('manage_faculty'))
         
@@ -237,9 +727,7 @@ def edit_faculty(id):
 @app.route('/admin/faculty/delete/<id>')
 @login_required
 def delete_faculty(id):
-    faculty_list = utils.load_json('faculty.json')
-    faculty_list = [f for f in faculty_list if f['id'] != id]
-    utils.save_json('faculty.json', faculty_list)
+    utils.delete_record('faculty.json', id)
     flash('Faculty member deleted.', 'info')
     return redirect(url_for('manage_faculty'))
 
@@ -253,60 +741,62 @@ def manage_news():
         description = request.form.get('description')
         
         # Handle Image Upload
-        image_filename = ""
+        image_filename, image_srcset = "", {}
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                image_filename = save_file_safely(file, app.config['NEWS_FOLDER'])
+                image_filename, image_srcset = save_image_safely(file, app.config['NEWS_FOLDER'])
         
         new_item = {
             "id": str(uuid.uuid4()),
             "title": title,
             "date": date,
             "description": description,
-            "image": image_filename if image_filename else "https://via.placeholder.com/400x250"
+            "image": image_filename if image_filename else "https://via.placeholder.com/400x250",
+            "image_srcset": image_srcset
         }
         
-        news_list = utils.load_json('news.json')
-        news_list.append(new_item)
-        utils.save_json('news.json', news_list)
+        utils.append_record('news.json', new_item)
+        queue_uploads('news.json', new_item['id'])
         flash('News item added!', 'success')
         return redirect(url_for('manage_news'))
         
-    news_list = utils.load_json('news.json')
-    return render_template('admin/manage_news.html', news=news_list)
+    news_list, next_cursor = utils.load_page('news.json', *page_args())
+    return render_template('admin/manage_news.html', news=news_list, next_cursor=next_cursor)
 
 @app.route('/admin/news/delete/<id>')
 @login_required
 def delete_news(id):
-    news_list = utils.load_json('news.json')
-    news_list = [n for n in news_list if n['id'] != id]
-    utils.save_json('news.json', news_list)
+    utils.delete_record('news.json', id)
     flash('News item deleted.', 'info')
     return redirect(url_for('manage_news'))
 
 @app.route('/admin/news/edit/<id>', methods=['GET', 'POST'])
 @login_required
 def edit_news(id):
-    news_list = utils.load_json('news.json')
-    item = next((n for n in news_list if n['id'] == id), None)
+    item = utils.get_record('news.json', id)
     
     if not item:
         flash('News item not found.', 'danger')
         return redirect(url_for('manage_news'))
 
     if request.method == 'POST':
-        item['title'] = request.form.get('title')
-        item['date'] = request.form.get('date')
-        item['description'] = request.form.get('description')
+        updates = {
+            'title': request.form.get('title'),
+            'date': request.form.get('date'),
+            'description': request.form.get('description')
+        }
         
         # Handle Image Upload - Only update if a new file is provided
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                item['image'] = save_file_safely(file, app.config['NEWS_FOLDER'])
+                image, image_srcset = save_image_safely(file, app.config['NEWS_FOLDER'])
+                if image: # Keep the current image if the upload was rejected
+                    updates['image'], updates['image_srcset'] = image, image_srcset
 
-        utils.save_json('news.json', news_list)
+        utils.update_record('news.json', id, updates)
+        queue_uploads('news.json', id)
         flash('News item updated successfully!', 'success')
         return redirect(url_for('manage_news'))
         
@@ -319,25 +809,21 @@ def manage_announcements():
     if request.method == 'POST':
         text = request.form.get('text')
         if text:
-            announcements = utils.load_json('announcements.json')
             new_announcement = {
                 "id": str(uuid.uuid4()),
                 "text": text
             }
-            announcements.append(new_announcement)
-            utils.save_json('announcements.json', announcements)
+            utils.append_record('announcements.json', new_announcement)
             flash('Announcement added successfully!', 'success')
         return redirect(url_for('manage_announcements'))
         
-    announcements = utils.load_json('announcements.json')
-    return render_template('admin/manage_announcements.html', announcements=announcements)
+    announcements, next_cursor = utils.load_page('announcements.json', *page_args())
+    return render_template('admin/manage_announcements.html', announcements=announcements, next_cursor=next_cursor)
 
 @app.route('/admin/announcements/delete/<id>')
 @login_required
 def delete_announcement(id):
-    announcements = utils.load_json('announcements.json')
-    announcements = [a for a in announcements if a['id'] != id]
-    utils.save_json('announcements.json', announcements)
+    utils.delete_record('announcements.json', id)
     flash('Announcement deleted.', 'info')
     return redirect(url_for('manage_announcements'))
 
@@ -349,37 +835,35 @@ def manage_gallery():
         caption = request.form.get('caption')
         
         # Handle Image Upload
-        image_filename = ""
+        image_filename, image_srcset = "", {}
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                image_filename = save_file_safely(file, app.config['GALLERY_FOLDER'])
+                image_filename, image_srcset = save_image_safely(file, app.config['GALLERY_FOLDER'])
         
         if image_filename:
             new_item = {
                 "id": str(uuid.uuid4()),
                 "caption": caption,
-                "image": image_filename
+                "image": image_filename,
+                "image_srcset": image_srcset
             }
             
-            gallery_list = utils.load_json('gallery.json')
-            gallery_list.append(new_item)
-            utils.save_json('gallery.json', gallery_list)
+            utils.append_record('gallery.json', new_item)
+            queue_uploads('gallery.json', new_item['id'])
             flash('Image added to gallery!', 'success')
         else:
              flash('Please upload an image.', 'danger')
              
         return redirect(url_for('manage_gallery'))
         
-    gallery_list = utils.load_json('gallery.json')
-    return render_template('admin/manage_gallery.html', gallery=gallery_list)
+    gallery_list, next_cursor = utils.load_page('gallery.json', *page_args())
+    return render_template('admin/manage_gallery.html', gallery=gallery_list, next_cursor=next_cursor)
 
 @app.route('/admin/gallery/delete/<id>')
 @login_required
 def delete_gallery(id):
-    gallery_list = utils.load_json('gallery.json')
-    gallery_list = [g for g in gallery_list if g['id'] != id]
-    utils.save_json('gallery.json', gallery_list)
+    utils.delete_record('gallery.json', id)
     flash('Image deleted.', 'info')
     return redirect(url_for('manage_gallery'))
 
@@ -387,31 +871,29 @@ def delete_gallery(id):
 @app.route('/admin/placements', methods=['GET', 'POST'])
 @login_required
 def manage_placements():
-    data = utils.load_json('placements.json')
-    if not data:
-         data = {"stats": {}, "recruiters": [], "stories": []}
-
     if request.method == 'POST':
         action = request.form.get('action')
         
         if action == 'update_stats':
-            data['stats']['percentage'] = request.form.get('percentage')
-            data['stats']['highest_package'] = request.form.get('highest_package')
-            data['stats']['recruiters_count'] = request.form.get('recruiters_count')
+            utils.patch_json('placements.json', {
+                'percentage': request.form.get('percentage'),
+                'highest_package': request.form.get('highest_package'),
+                'recruiters_count': request.form.get('recruiters_count')
+            }, path='stats')
             flash('Stats updated!', 'success')
             
         elif action == 'update_recruiters':
             recruiters_str = request.form.get('recruiters')
-            data['recruiters'] = [r.strip() for r in recruiters_str.split(',')]
+            utils.patch_json('placements.json', {'recruiters': [r.strip() for r in recruiters_str.split(',')]})
             flash('Recruiters list updated!', 'success')
             
         elif action == 'add_story':
             # Handle Image Upload
-            image_filename = ""
+            image_filename, image_srcset = "", {}
             if 'image' in request.files:
                 file = request.files['image']
                 if file and file.filename != '':
-                    image_filename = save_file_safely(file, app.config['PLACEMENTS_FOLDER'])
+                    image_filename, image_srcset = save_image_safely(file, app.config['PLACEMENTS_FOLDER'])
 
             new_story = {
                 "id": str(uuid.uuid4()),
@@ -419,28 +901,29 @@ def manage_placements():
                 "company": request.form.get('company'),
                 "package": request.form.get('package'),
                 "quote": request.form.get('quote'),
-                "image": image_filename if image_filename else "https://via.placeholder.com/100"
+                "image": image_filename if image_filename else "https://via.placeholder.com/100",
+                "image_srcset": image_srcset
             }
-            if 'stories' not in data: data['stories'] = []
-            data['stories'].append(new_story)
+            utils.append_record('placements.json', new_story, path='stories')
+            queue_uploads('placements.json', new_story['id'], path='stories')
             flash('Success story added!', 'success')
             
-        utils.save_json('placements.json', data)
         return redirect(url_for('manage_placements'))
         
+    data = utils.load_json('placements.json')
+    if not data:
+         data = {"stats": {}, "recruiters": [], "stories": []}
     return render_template('admin/manage_placements.html', data=data)
 
 @app.route('/admin/placements/delete_story/<id>')
 @login_required
 def delete_story(id):
-    data = utils.load_json('placements.json')
-    if 'stories' in data:
-        data['stories'] = [s for s in data['stories'] if s['id'] != id]
-        utils.save_json('placements.json', data)
+    if utils.delete_record('placements.json', id, path='stories'):
         flash('Story deleted.', 'info')
     return redirect(url_for('manage_placements'))
 
 @app.route('/about')
+@cached_page('leadership.json')
 def about():
     leadership_data = utils.load_json('leadership.json')
     return render_template('about.html', leadership=leadership_data)
@@ -456,12 +939,12 @@ def manage_leadership():
         message = request.form.get('message')
         
         # Handle Image Upload
-        image_filename = ""
+        image_filename, image_srcset = "", {}
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
                 # Use faculty folder as they are staff/faculty essentially
-                image_filename = save_file_safely(file, app.config['UPLOAD_FOLDER'])
+                image_filename, image_srcset = save_image_safely(file, app.config['UPLOAD_FOLDER'])
 
         new_leader = {
             "id": str(uuid.uuid4()),
@@ -469,12 +952,12 @@ def manage_leadership():
             "role": role,
             "designation": designation,
             "message": message,
-            "image": image_filename
+            "image": image_filename,
+            "image_srcset": image_srcset
         }
         
-        leadership_list = utils.load_json('leadership.json')
-        leadership_list.append(new_leader)
-        utils.save_json('leadership.json', leadership_list)
+        utils.append_record('leadership.json', new_leader)
+        queue_uploads('leadership.json', new_leader['id'])
         flash('Leadership profile added!', 'success')
         return redirect(url_for('manage_leadership'))
         
@@ -484,49 +967,51 @@ def manage_leadership():
 @app.route('/admin/leadership/delete/<id>')
 @login_required
 def delete_leadership(id):
-    leadership_list = utils.load_json('leadership.json')
-    leadership_list = [l for l in leadership_list if l['id'] != id]
-    utils.save_json('leadership.json', leadership_list)
+    utils.delete_record('leadership.json', id)
     flash('Leadership profile deleted.', 'info')
     return redirect(url_for('manage_leadership'))
 
 @app.route('/admin/leadership/edit/<id>', methods=['GET', 'POST'])
 @login_required
 def edit_leadership(id):
-    leadership_list = utils.load_json('leadership.json')
-    leader = next((l for l in leadership_list if l['id'] == id), None)
+    leader = utils.get_record('leadership.json', id)
     
     if not leader:
         flash('Leadership profile not found.', 'danger')
         return redirect(url_for('manage_leadership'))
 
     if request.method == 'POST':
-        leader['name'] = request.form.get('name')
-        leader['role'] = request.form.get('role')
-        leader['designation'] = request.form.get('designation')
-        leader['message'] = request.form.get('message')
+        updates = {
+            'name': request.form.get('name'),
+            'role': request.form.get('role'),
+            'designation': request.form.get('designation'),
+            'message': request.form.get('message')
+        }
         
         # Handle Image Upload - Only update if a new file is provided
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                leader['image'] = save_file_safely(file, app.config['UPLOAD_FOLDER'])
+                image, image_srcset = save_image_safely(file, app.config['UPLOAD_FOLDER'])
+                if image: # Keep the current image if the upload was rejected
+                    updates['image'], updates['image_srcset'] = image, image_srcset
 
-        utils.save_json('leadership.json', leadership_list)
+        utils.update_record('leadership.json', id, updates)
+        queue_uploads('leadership.json', id)
         flash('Leadership details updated successfully!', 'success')
         return redirect(url_for('manage_leadership'))
         
     return render_template('admin/edit_leadership.html', leader=leader)
 
 @app.route('/departments')
+@cached_page('departments.json')
 def departments():
     departments_list = utils.load_json('departments.json')
     return render_template('departments.html', departments=departments_list)
 
 @app.route('/departments/<dept_id>/labs')
 def department_labs(dept_id):
-    departments_list = utils.load_json('departments.json')
-    dept = next((d for d in departments_list if d['id'] == dept_id), None)
+    dept = utils.get_record('departments.json', dept_id)
     if not dept:
         flash('Department not found.', 'danger')
         return redirect(url_for('departments'))
@@ -554,11 +1039,11 @@ def manage_departments():
         hod_quote = request.form.get('hod_quote')
         
         # Handle HOD Image Upload
-        hod_image_filename = ""
+        hod_image_filename, hod_image_srcset = "", {}
         if 'hod_image' in request.files:
             file = request.files['hod_image']
             if file and file.filename != '':
-                hod_image_filename = save_file_safely(file, app.config['UPLOAD_FOLDER'])
+                hod_image_filename, hod_image_srcset = save_image_safely(file, app.config['UPLOAD_FOLDER'])
 
         # Construct new department object
         new_dept = {
@@ -576,15 +1061,15 @@ def manage_departments():
                 "name": hod_name,
                 "role": hod_role,
                 "quote": hod_quote,
-                "image": hod_image_filename if hod_image_filename else ""
+                "image": hod_image_filename if hod_image_filename else "",
+                "image_srcset": hod_image_srcset
             }
         }
         
-        departments_list = utils.load_json('departments.json')
         # Check if ID exists to avoid duplicates if user manually typed it? 
         # For simplicity, just append. If we wanted update, we'd check ID.
-        departments_list.append(new_dept)
-        utils.save_json('departments.json', departments_list)
+        utils.append_record('departments.json', new_dept)
+        queue_uploads('departments.json', new_dept['id'])
         flash('Department added successfully!', 'success')
         return redirect(url_for('manage_departments'))
 
@@ -594,33 +1079,38 @@ def manage_departments():
 @app.route('/admin/departments/edit/<dept_id>', methods=['GET', 'POST'])
 @login_required
 def edit_department(dept_id):
-    departments_list = utils.load_json('departments.json')
-    dept = next((d for d in departments_list if d['id'] == dept_id), None)
+    dept = utils.get_record('departments.json', dept_id)
     
     if not dept:
         flash('Department not found.', 'danger')
         return redirect(url_for('manage_departments'))
 
     if request.method == 'POST':
-        dept['name'] = request.form.get('name')
-        dept['icon'] = request.form.get('icon')
-        dept['theme_color'] = request.form.get('theme_color')
-        dept['tagline'] = request.form.get('tagline')
-        dept['intake'] = int(request.form.get('intake', 0))
-        dept['description'] = request.form.get('description')
-        dept['vision'] = request.form.get('vision')
-        dept['mission'] = request.form.get('mission')
+        updates = {
+            'name': request.form.get('name'),
+            'icon': request.form.get('icon'),
+            'theme_color': request.form.get('theme_color'),
+            'tagline': request.form.get('tagline'),
+            'intake': int(request.form.get('intake', 0)),
+            'description': request.form.get('description'),
+            'vision': request.form.get('vision'),
+            'mission': request.form.get('mission')
+        }
         
         # HOD fields
-        dept['hod']['name'] = request.form.get('hod_name')
-        dept['hod']['role'] = request.form.get('hod_role')
-        dept['hod']['quote'] = request.form.get('hod_quote')
+        hod = dict(dept.get('hod') or {})
+        hod['name'] = request.form.get('hod_name')
+        hod['role'] = request.form.get('hod_role')
+        hod['quote'] = request.form.get('hod_quote')
         
         # Handle HOD Image Upload
         if 'hod_image' in request.files:
             file = request.files['hod_image']
             if file and file.filename != '':
-                dept['hod']['image'] = save_file_safely(file, app.config['UPLOAD_FOLDER'])
+                image, image_srcset = save_image_safely(file, app.config['UPLOAD_FOLDER'])
+                if image: # Keep the current image if the upload was rejected
+                    hod['image'], hod['image_srcset'] = image, image_srcset
+        updates['hod'] = hod
 
         # Handle Labs (Parsed from dynamic form fields)
         lab_names = request.form.getlist('lab_name[]')
@@ -629,6 +1119,8 @@ def edit_department(dept_id):
         lab_descriptions = request.form.getlist('lab_description[]')
         lab_existing_imgs = request.form.getlist('lab_existing_image[]')
         lab_files = request.files.getlist('lab_image[]')
+        # Variants of labs whose image isn't replaced are carried over by image
+        existing_srcsets = {lab.get('image'): lab.get('image_srcset') for lab in dept.get('labs') or []}
         
         new_labs = []
         # In multi-file upload, empty inputs are still sent. We need to match by index.
@@ -637,23 +1129,28 @@ def edit_department(dept_id):
         for i in range(len(lab_names)):
             if lab_names[i].strip():
                 lab_img = lab_existing_imgs[i] if i < len(lab_existing_imgs) else ""
+                lab_srcset = existing_srcsets.get(lab_img) or {}
                 
                 # Check if a new file was uploaded for this specific index
                 if i < len(lab_files):
                     file = lab_files[i]
                     if file and file.filename != '':
-                        lab_img = save_file_safely(file, app.config['LABS_FOLDER'])
+                        image, image_srcset = save_image_safely(file, app.config['LABS_FOLDER'])
+                        if image:
+                            lab_img, lab_srcset = image, image_srcset
                 
                 new_labs.append({
                     "name": lab_names[i],
                     "icon": lab_icons[i] if i < len(lab_icons) else "fas fa-flask",
                     "color": lab_colors[i] if i < len(lab_colors) else "#666",
                     "image": lab_img,
+                    "image_srcset": lab_srcset,
                     "description": lab_descriptions[i] if i < len(lab_descriptions) else ""
                 })
-        dept['labs'] = new_labs
+        updates['labs'] = new_labs
 
-        utils.save_json('departments.json', departments_list)
+        utils.update_record('departments.json', dept_id, updates)
+        queue_uploads('departments.json', dept_id)
         flash('Department details updated successfully!', 'success')
         return redirect(url_for('manage_departments'))
         
@@ -662,18 +1159,18 @@ def edit_department(dept_id):
 @app.route('/admin/departments/delete/<dept_id>')
 @login_required
 def delete_department(dept_id):
-    departments_list = utils.load_json('departments.json')
-    departments_list = [d for d in departments_list if d['id'] != dept_id]
-    utils.save_json('departments.json', departments_list)
+    utils.delete_record('departments.json', dept_id)
     flash('Department deleted.', 'info')
     return redirect(url_for('manage_departments'))
 
 @app.route('/facilities')
+@cached_page('facilities.json')
 def facilities():
     facilities_list = utils.load_json('facilities.json')
     return render_template('facilities.html', facilities=facilities_list)
 
 @app.route('/library')
+@cached_page('library.json')
 def library():
     library_data = utils.load_json('library.json')
     return render_template('library.html', library=library_data)
@@ -688,23 +1185,23 @@ def manage_facilities():
         icon = request.form.get('icon')
         
         # Handle Image Upload
-        image_filename = ""
+        image_filename, image_srcset = "", {}
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                image_filename = save_file_safely(file, app.config['FACILITIES_FOLDER'])
+                image_filename, image_srcset = save_image_safely(file, app.config['FACILITIES_FOLDER'])
         
         new_facility = {
             "id": str(uuid.uuid4()),
             "name": name,
             "description": description,
             "icon": icon,
-            "image": image_filename
+            "image": image_filename,
+            "image_srcset": image_srcset
         }
         
-        facilities_list = utils.load_json('facilities.json')
-        facilities_list.append(new_facility)
-        utils.save_json('facilities.json', facilities_list)
+        utils.append_record('facilities.json', new_facility)
+        queue_uploads('facilities.json', new_facility['id'])
         flash('Facility added successfully!', 'success')
         return redirect(url_for('manage_facilities'))
         
@@ -714,9 +1211,7 @@ def manage_facilities():
 @app.route('/admin/facilities/delete/<id>')
 @login_required
 def delete_facility(id):
-    facilities = utils.load_json('facilities.json')
-    facilities = [f for f in facilities if f['id'] != id]
-    utils.save_json('facilities.json', facilities)
+    utils.delete_record('facilities.json', id)
     flash('Facility removed.', 'success')
     return redirect(url_for('manage_facilities'))
 
@@ -724,8 +1219,6 @@ def delete_facility(id):
 @app.route('/admin/academics', methods=['GET', 'POST'])
 @login_required
 def manage_academics():
-    academics_data = utils.load_json('academics.json')
-    
     if request.method == 'POST':
         form_type = request.form.get('form_type')
         
@@ -737,7 +1230,7 @@ def manage_academics():
                 "category": request.form.get('category'),
                 "badge_class": request.form.get('badge_class')
             }
-            academics_data['calendar'].append(new_event)
+            utils.append_record('academics.json', new_event, path='calendar')
             flash('Academic event added!', 'success')
             
         elif form_type == 'notice':
@@ -748,49 +1241,47 @@ def manage_academics():
                 "content": request.form.get('content'),
                 "border_color": request.form.get('border_color') or None
             }
-            academics_data['notices'].insert(0, new_notice)
+            utils.append_record('academics.json', new_notice, path='notices', prepend=True)
             flash('Notice board updated!', 'success')
             
-        utils.save_json('academics.json', academics_data)
         return redirect(url_for('manage_academics'))
         
+    academics_data = utils.load_json('academics.json')
     return render_template('admin/manage_academics.html', academics=academics_data)
 
 @app.route('/admin/academics/event/delete/<id>')
 @login_required
 def delete_academic_event(id):
-    academics_data = utils.load_json('academics.json')
-    academics_data['calendar'] = [e for e in academics_data['calendar'] if e['id'] != id]
-    utils.save_json('academics.json', academics_data)
+    utils.delete_record('academics.json', id, path='calendar')
     flash('Event removed from calendar.', 'success')
     return redirect(url_for('manage_academics'))
 
 @app.route('/admin/academics/notice/delete/<id>')
 @login_required
 def delete_academic_notice(id):
-    academics_data = utils.load_json('academics.json')
-    academics_data['notices'] = [n for n in academics_data['notices'] if n['id'] != id]
-    utils.save_json('academics.json', academics_data)
+    utils.delete_record('academics.json', id, path='notices')
     flash('Notice removed from feed.', 'success')
     return redirect(url_for('manage_academics'))
 
 @app.route('/activities')
+@cached_page('activities.json')
 def activities():
-    activities_list = utils.load_json('activities.json')
-    # Sort by date descending
-    activities_list.sort(key=lambda x: x.get('date', ''), reverse=True)
-    return render_template('activities.html', activities=activities_list)
+    # Newest first, one page at a time
+    activities_list, next_cursor = utils.load_page('activities.json', *page_args())
+    return render_template('activities.html', activities=activities_list, next_cursor=next_cursor)
 
 @app.route('/governance')
+@cached_page('governance.json')
 def governance():
     governance_data = utils.load_json('governance.json')
     return render_template('governance.html', governance=governance_data)
 
 @app.route('/news')
+@cached_page('news.json')
 def news():
-    news_items = utils.load_json('news.json')
-    # Sort news by date if possible (assuming date format is consistent)
-    return render_template('news.html', news=news_items)
+    # Newest first, one page at a time
+    news_items, next_cursor = utils.load_page('news.json', *page_args())
+    return render_template('news.html', news=news_items, next_cursor=next_cursor)
 
 @app.route('/admin/activities', methods=['GET', 'POST'])
 @login_required
@@ -806,11 +1297,9 @@ def manage_activities():
             flash('Title and Category are required.', 'danger')
             return redirect(url_for('manage_activities'))
             
-        activities_list = utils.load_json('activities.json')
-        
-        filename = ""
+        filename, image_srcset = "", {}
         if image_file and image_file.filename != '':
-            filename = save_file_safely(image_file, app.config['ACTIVITIES_FOLDER'])
+            filename, image_srcset = save_image_safely(image_file, app.config['ACTIVITIES_FOLDER'])
             
         new_activity = {
             "id": str(uuid.uuid4()),
@@ -818,24 +1307,22 @@ def manage_activities():
             "category": category,
             "description": description,
             "date": date,
-            "image": filename
+            "image": filename,
+            "image_srcset": image_srcset
         }
         
-        activities_list.append(new_activity)
-        utils.save_json('activities.json', activities_list)
+        utils.append_record('activities.json', new_activity)
+        queue_uploads('activities.json', new_activity['id'])
         flash('Activity added successfully!', 'success')
         return redirect(url_for('manage_activities'))
         
-    activities_list = utils.load_json('activities.json')
-    activities_list.sort(key=lambda x: x.get('date', ''), reverse=True)
-    return render_template('admin/manage_activities.html', activities=activities_list)
+    activities_list, next_cursor = utils.load_page('activities.json', *page_args())
+    return render_template('admin/manage_activities.html', activities=activities_list, next_cursor=next_cursor)
 
 @app.route('/admin/activities/delete/<id>')
 @login_required
 def delete_activity(id):
-    activities_list = utils.load_json('activities.json')
-    activities_list = [a for a in activities_list if a['id'] != id]
-    utils.save_json('activities.json', activities_list)
+    utils.delete_record('activities.json', id)
     flash('Activity deleted successfully!', 'success')
     return redirect(url_for('manage_activities'))
 
@@ -851,14 +1338,14 @@ def manage_governance():
         website = request.form.get('website')
         
         # Handle Logo Upload
-        logo_filename = ""
+        logo_filename, logo_srcset = "", {}
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename != '':
                 # Ensure governance folder exists in static
                 gov_folder = os.path.join('static', 'images', 'governance')
                 safe_makedirs(gov_folder)
-                logo_filename = save_file_safely(file, gov_folder)
+                logo_filename, logo_srcset = save_image_safely(file, gov_folder)
 
         new_body = {
             "id": str(uuid.uuid4()),
@@ -867,12 +1354,12 @@ def manage_governance():
             "type": type_body,
             "description": description,
             "logo": logo_filename,
+            "logo_srcset": logo_srcset,
             "website": website
         }
         
-        governance_list = utils.load_json('governance.json')
-        governance_list.append(new_body)
-        utils.save_json('governance.json', governance_list)
+        utils.append_record('governance.json', new_body)
+        queue_uploads('governance.json', new_body['id'])
         flash('Governing body added successfully!', 'success')
         return redirect(url_for('manage_governance'))
         
@@ -882,59 +1369,68 @@ def manage_governance():
 @app.route('/admin/governance/delete/<id>')
 @login_required
 def delete_governance(id):
-    governance_list = utils.load_json('governance.json')
-    governance_list = [g for g in governance_list if g['id'] != id]
-    utils.save_json('governance.json', governance_list)
+    utils.delete_record('governance.json', id)
     flash('Governing body removed successfully.', 'info')
     return redirect(url_for('manage_governance'))
 
 @app.route('/admin/activities/edit/<id>', methods=['GET', 'POST'])
 @login_required
 def edit_activity(id):
-    activities_list = utils.load_json('activities.json')
-    activity = next((a for a in activities_list if a['id'] == id), None)
+    activity = utils.get_record('activities.json', id)
     
     if not activity:
         flash('Activity not found.', 'danger')
         return redirect(url_for('manage_activities'))
         
     if request.method == 'POST':
-        activity['title'] = request.form.get('title')
-        activity['category'] = request.form.get('category')
-        activity['description'] = request.form.get('description')
-        activity['date'] = request.form.get('date')
+        updates = {
+            'title': request.form.get('title'),
+            'category': request.form.get('category'),
+            'description': request.form.get('description'),
+            'date': request.form.get('date')
+        }
         
         image_file = request.files.get('image')
         if image_file and image_file.filename != '':
-            filename = save_file_safely(image_file, app.config['ACTIVITIES_FOLDER'])
-            activity['image'] = filename
+            filename, image_srcset = save_image_safely(image_file, app.config['ACTIVITIES_FOLDER'])
+            if filename: # Keep the current image if the upload was rejected
+                updates['image'] = filename
+                updates['image_srcset'] = image_srcset
             
-        utils.save_json('activities.json', activities_list)
+        utils.update_record('activities.json', id, updates)
+        queue_uploads('activities.json', id)
         flash('Activity updated successfully!', 'success')
         return redirect(url_for('manage_activities'))
         
     return render_template('admin/edit_activity.html', activity=activity)
 
 @app.route('/contact')
+@cached_page()
 def contact():
     return render_template('contact.html')
 
 @app.route('/academics')
+@cached_page('academics.json')
 def academics():
-    academics_data = utils.load_json('academics.json')
+    academics_data = utils.load_json('academics.json') or {}
+    # Calendar in date order, notices newest first (both from the sorted index)
+    academics_data['calendar'] = utils.sorted_records('academics.json', path='calendar', oldest_first=True)
+    academics_data['notices'] = utils.sorted_records('academics.json', path='notices')
     return render_template('academics.html', academics=academics_data)
 
 @app.route('/faculty')
+@cached_page('faculty.json', 'departments.json')
 def faculty():
-    faculty_list = utils.load_json('faculty.json')
-    # Group by department using helper
-    grouped_faculty = utils.get_faculty_by_dept(faculty_list)
-    return render_template('faculty.html', grouped_faculty=grouped_faculty)
+    # Grouped by department (HOD first) from the maintained view; ?dept= shows one department
+    dept = request.args.get('dept') or None
+    departments_list = utils.load_json('departments.json') or []
+    order = [d.get('name') for d in departments_list if isinstance(d, dict)]
+    grouped_faculty = utils.load_groups('faculty.json', group=dept, order=order)
+    return render_template('faculty.html', grouped_faculty=grouped_faculty, dept=dept)
 
 @app.route('/faculty/<id>')
 def faculty_detail(id):
-    faculty_list = utils.load_json('faculty.json')
-    faculty_member = next((f for f in faculty_list if f['id'] == id), None)
+    faculty_member = utils.get_record('faculty.json', id)
     
     if not faculty_member:
         flash('Faculty member not found.', 'danger')
@@ -943,19 +1439,41 @@ def faculty_detail(id):
     return render_template('faculty_detail.html', faculty=faculty_member)
 
 @app.route('/placement')
+@cached_page('placements.json')
 def placement():
     data = utils.load_json('placements.json')
     return render_template('placement.html', data=data)
 
 @app.route('/gallery')
+@cached_page('gallery.json')
 def gallery():
-    gallery_items = utils.load_json('gallery.json')
-    return render_template('gallery.html', gallery_items=gallery_items)
+    gallery_items, next_cursor = utils.load_page('gallery.json', *page_args())
+    return render_template('gallery.html', gallery_items=gallery_items, next_cursor=next_cursor)
 
 @app.route('/admission')
+@cached_page()
 def admission():
     return render_template('admission.html')
 
+# Where each kind of search result links to
+SEARCH_RESULT_LINKS = {
+    'faculty': ('Faculty', lambda r: url_for('faculty_detail', id=r['id'])),
+    'news': ('News', lambda r: url_for('news')),
+    'activities': ('Activity', lambda r: url_for('activities')),
+    'departments': ('Department', lambda r: url_for('departments', _anchor=r['id'])),
+    'notices': ('Notice', lambda r: url_for('academics')),
+}
+
+@app.route('/search')
+def search():
+    query = request.args.get('q', '').strip()[:200]
+    kind = request.args.get('kind')
+    results = site_search.search(query, kinds=[kind] if kind else None) if query else []
+    for result in results:
+        result['label'], link = SEARCH_RESULT_LINKS[result['kind']]
+        result['url'] = link(result)
+    return render_template('search.html', query=query, kind=kind, results=results)
+
 @app.route('/upload_faculty', methods=['GET', 'POST'])
 def upload_faculty():
     if request.method == 'POST':
@@ -0,0 +1,377 @@
+"""Local storage backends, used when Firebase is not.
+
+utils keeps Firebase as it is and reads and writes everything else through
+one of these stores, picked by DATA_BACKEND:
+
+- FileStore keeps each collection in data/<name>.json plus its write
+  journal (see journal.py). This is the default.
+- SqliteStore keeps every collection in one SQLite database. Each record of
+  a record list (a top-level list of objects, or the collection itself if it
+  is one) is a row, indexed by id, department, date and category, so one
+  record, one page or one department is read without loading the rest.
+  Everything else in a collection (e.g. placements 'stats') is kept as JSON
+  beside the rows, and reads put the two back together, so callers get the
+  same shapes as from the JSON files.
+
+Both stores take the same calls, with `filename` as under data/ ('news.json'):
+
+    lock(filename)                held around a read-check-write
+    state(filename)               tuple that changes with every write
+    read(filename, locked=False)  (data, state); FileNotFoundError if there is no such collection
+    replace(filename, data)       stores data as the whole collection; returns the new state
+    write(filename, op)           applies one record-level write (see utils._apply_op); returns the new state
+
+A store with `queries = True` also answers get(), page() and find(). Each
+returns a tuple starting with whether it could answer; when it can't (the
+list isn't a record list), the caller loads the collection instead.
+Database errors are raised as OSError, like file errors.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+import journal
+
+BUSY_TIMEOUT = 10  # seconds a writer waits for another process's transaction
+
+class FileStore:
+    """Collections as JSON files in `folder`, with record-level writes journaled."""
+
+    queries = False
+
+    def __init__(self, folder, apply):
+        self.folder = folder
+        self.apply = apply
+
+    def _path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def lock(self, filename):
+        os.makedirs(self.folder, exist_ok=True)
+        return journal.lock(self._path(filename))
+
+    def state(self, filename):
+        return journal.state(self._path(filename))
+
+    def read(self, filename, locked=False):
+        return journal.read(self._path(filename), self.apply, locked)
+
+    def replace(self, filename, data):
+        return journal.replace(self._path(filename), data)
+
+    def write(self, filename, op):
+        return journal.append(self._path(filename), op, self.apply)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    body TEXT NOT NULL,   -- the collection as JSON, record lists left empty
+    lists TEXT NOT NULL,  -- JSON list of the keys holding record lists, '' for the collection itself
+    stamp TEXT NOT NULL   -- changes with every write
+);
+CREATE TABLE IF NOT EXISTS records (
+    collection TEXT NOT NULL,
+    path TEXT NOT NULL,
+    position REAL NOT NULL,  -- list order
+    id,
+    department,
+    date,                    -- the sort key in dated lists (see utils.SORTED_COLLECTIONS)
+    category,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_position ON records (collection, path, position);
+CREATE INDEX IF NOT EXISTS records_id ON records (collection, path, id, position);
+CREATE INDEX IF NOT EXISTS records_date ON records (collection, path, date, position);
+CREATE INDEX IF NOT EXISTS records_department ON records (collection, path, department, position);
+CREATE INDEX IF NOT EXISTS records_category ON records (collection, path, category, position);
+"""
+FILTER_COLUMNS = ('id', 'department', 'category')
+
+def _name(filename):
+    return filename[:-len('.json')] if filename.endswith('.json') else filename
+
+def _is_record_list(value):
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+def _split(data):
+    """Returns (body, record list paths, {path: records}) for a collection."""
+    if _is_record_list(data):
+        return [], [''], {'': data}
+    if not isinstance(data, dict):
+        return data, [], {}
+    body = {}
+    lists = {}
+    for k, v in data.items():
+        if _is_record_list(v):
+            body[k] = []  # keeps the key's place
+            lists[k] = v
+        else:
+            body[k] = v
+    return body, list(lists), lists
+
+def _scalar(value):
+    return value if isinstance(value, (str, int, float)) else None
+
+class SqliteStore:
+    """Collections in an SQLite database at `path`, record lists as indexed rows.
+
+    columns(filename, path, record) gives a record's (department, date,
+    category) column values. A collection missing from the database is
+    imported from `seed` (a FileStore) the first time it is asked for.
+    """
+
+    queries = True
+
+    def __init__(self, path, apply, columns, seed=None):
+        self.path = path
+        self.apply = apply
+        self.columns = columns
+        self.seed = seed
+        self._local = threading.local()  # a connection per thread
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def _transaction(self, write=True):
+        """Runs the block in one transaction; nested blocks join the outer one."""
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            raise OSError(f"{self.path}: {e}") from e
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+        try:
+            conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            local.depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            try:
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            raise OSError(f"{self.path}: {e}") from e
+        finally:
+            local.depth = 0
+
+    def lock(self, filename):
+        return self._transaction()
+
+    def _row(self, conn, name):
+        return conn.execute('SELECT body, lists, stamp FROM collections WHERE name = ?', (name,)).fetchone()
+
+    def _ensure(self, filename):
+        """Imports a collection from the seed store if the database doesn't have it yet."""
+        name = _name(filename)
+        with self._transaction(write=False) as conn:
+            if self._row(conn, name) is not None or self.seed is None:
+                return
+        try:
+            data, _ = self.seed.read(filename)
+        except (OSError, ValueError):
+            return
+        with self._transaction() as conn:
+            if self._row(conn, name) is None:
+                self._store(conn, filename, data)
+
+    def _insert_rows(self, conn, filename, path, records, start=0):
+        name = _name(filename)
+        rows = []
+        for i, record in enumerate(records):
+            department, date, category = (_scalar(v) for v in self.columns(filename, path or None, record))
+            rows.append((name, path, start + i, _scalar(record.get('id')), department, date, category,
+                         json.dumps(record, separators=(',', ':'))))
+        conn.executemany(
+            'INSERT INTO records (collection, path, position, id, department, date, category, body) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def _store(self, conn, filename, data):
+        name = _name(filename)
+        body, lists, records = _split(data)
+        conn.execute('DELETE FROM records WHERE collection = ?', (name,))
+        conn.execute('INSERT OR REPLACE INTO collections (name, body, lists, stamp) VALUES (?, ?, ?, ?)',
+                     (name, json.dumps(body), json.dumps(lists), uuid.uuid4().hex))
+        for path in lists:
+            self._insert_rows(conn, filename, path, records[path])
+
+    def _touch(self, conn, name):
+        stamp = uuid.uuid4().hex
+        conn.execute('UPDATE collections SET stamp = ? WHERE name = ?', (stamp, name))
+        return ('sqlite', stamp)
+
+    def state(self, filename):
+        self._ensure(filename)
+        with self._transaction(write=False) as conn:
+            row = self._row(conn, _name(filename))
+        return ('sqlite', row[2] if row else None)
+
+    def read(self, filename, locked=False):
+        self._ensure(filename)
+        name = _name(filename)
+        with self._transaction(write=False) as conn:
+            row = self._row(conn, name)
+            if row is None:
+                raise FileNotFoundError(filename)
+            data = json.loads(row[0])
+            for path in json.loads(row[1]):
+                records = [json.loads(body) for (body,) in conn.execute(
+                    'SELECT body FROM records WHERE collection = ? AND path = ? ORDER BY position', (name, path))]
+                if path:
+                    data[path] = records
+                else:
+                    data = records
+            return data, ('sqlite', row[2])
+
+    def replace(self, filename, data):
+        with self._transaction() as conn:
+            self._store(conn, filename, data)
+            return ('sqlite', self._row(conn, _name(filename))[2])
+
+    def write(self, filename, op):
+        name = _name(filename)
+        path = op.get('path') or ''
+        self._ensure(filename)
+        with self._transaction() as conn:
+            row = self._row(conn, name)
+            lists = json.loads(row[1]) if row else []
+            body = json.loads(row[0]) if row else None
+            if op['op'] != 'patch' and path in lists:
+                self._write_record(conn, filename, path, op)
+            elif (op['op'] == 'patch' and isinstance(body, dict) and path.split('/')[0] not in lists
+                    and (path or not set(op['fields']) & set(lists))):
+                conn.execute('UPDATE collections SET body = ? WHERE name = ?',
+                             (json.dumps(self.apply(body, op)), name))
+            else:
+                # A write that changes the collection's shape, e.g. the first
+                # record of a new list: apply it to the whole collection
+                data = self.read(filename)[0] if row else None
+                self._store(conn, filename, self.apply(data, op))
+            return self._touch(conn, name)
+
+    def _write_record(self, conn, filename, path, op):
+        name = _name(filename)
+        if op['op'] == 'append':
+            end = 'MIN(position) - 1' if op.get('prepend') else 'MAX(position) + 1'
+            position = conn.execute(f'SELECT {end} FROM records WHERE collection = ? AND path = ?',
+                                    (name, path)).fetchone()[0]
+            self._insert_rows(conn, filename, path, [op['record']], position or 0)
+            return
+        found = conn.execute(
+            'SELECT rowid, body FROM records WHERE collection = ? AND path = ? AND id = ? '
+            'ORDER BY position LIMIT 1', (name, path, op['id'])).fetchone()
+        if found is None:
+            return
+        if op['op'] == 'delete':
+            conn.execute('DELETE FROM records WHERE rowid = ?', (found[0],))
+        elif op['op'] == 'update':
+            record = json.loads(found[1])
+            record.update(op['fields'])
+            department, date, category = (_scalar(v) for v in self.columns(filename, path or None, record))
+            conn.execute('UPDATE records SET id = ?, department = ?, date = ?, category = ?, body = ? WHERE rowid = ?',
+                         (_scalar(record.get('id')), department, date, category,
+                          json.dumps(record, separators=(',', ':')), found[0]))
+
+    # Queries
+    def _lists(self, conn, filename):
+        row = conn.execute('SELECT lists FROM collections WHERE name = ?', (_name(filename),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, filename, path, record_id):
+        """Returns (answered, record or None) for the record with `record_id`."""
+        self._ensure(filename)
+        path = path or ''
+        with self._transaction(write=False) as conn:
+            lists = self._lists(conn, filename)
+            if lists is None:
+                return True, None
+            if path not in lists:
+                return False, None
+            row = conn.execute(
+                'SELECT body FROM records WHERE collection = ? AND path = ? AND id = ? ORDER BY position LIMIT 1',
+                (_name(filename), path, record_id)).fetchone()
+            return True, (json.loads(row[0]) if row else None)
+
+    def page(self, filename, path, limit, cursor, dated):
+        """Returns (answered, records, next cursor) for a page, newest first.
+
+        Dated lists are ordered by the date column and the cursor is a date
+        value; others follow list order and the cursor is a record id. As
+        utils.load_page, the page ends just before the cursor.
+        """
+        self._ensure(filename)
+        name, path = _name(filename), path or ''
+        with self._transaction(write=False) as conn:
+            lists = self._lists(conn, filename)
+            if lists is None:
+                return True, [], None
+            if path not in lists:
+                return False, None, None
+            column = 'date' if dated else 'position'
+            end = cursor
+            if cursor and not dated:
+                row = conn.execute(
+                    'SELECT position FROM records WHERE collection = ? AND path = ? AND id = ? '
+                    'ORDER BY position LIMIT 1', (name, path, cursor)).fetchone()
+                if row is None:
+                    return True, [], None
+                end = row[0]
+            query = 'SELECT body, date FROM records WHERE collection = ? AND path = ?'
+            params = [name, path]
+            if cursor:
+                query += f' AND {column} < ?'
+                params.append(end)
+            query += f' ORDER BY {column} DESC, position DESC LIMIT ?'
+            params.append(limit + 1)
+            rows = conn.execute(query, params).fetchall()
+        page = [json.loads(body) for body, _ in rows[:limit]]
+        if len(rows) <= limit:
+            return True, page, None
+        return True, page, (rows[limit - 1][1] if dated else page[-1].get('id'))
+
+    def find(self, filename, path, field, values):
+        """Returns (answered, records in list order) whose `field` is one of `values` (None: unset)."""
+        if field not in FILTER_COLUMNS:
+            return False, None
+        self._ensure(filename)
+        name, path = _name(filename), path or ''
+        with self._transaction(write=False) as conn:
+            lists = self._lists(conn, filename)
+            if lists is None:
+                return True, []
+            if path not in lists:
+                return False, None
+            given = [v for v in values if v is not None]
+            conditions = []
+            if given:
+                conditions.append(f"{field} IN ({', '.join('?' * len(given))})")
+            if None in values:
+                conditions.append(f'{field} IS NULL')
+            if not conditions:
+                return True, []
+            rows = conn.execute(
+                f"SELECT body FROM records WHERE collection = ? AND path = ? AND ({' OR '.join(conditions)}) "
+                'ORDER BY position', [name, path] + given).fetchall()
+        return True, [json.loads(body) for (body,) in rows]
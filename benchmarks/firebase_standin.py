@@ -0,0 +1,504 @@
+"""Local stand-in for the Firebase Realtime Database and Storage REST APIs.
+
+Serves the RTDB REST calls (get, set, update, push, delete and the ordered,
+filtered queries utils.py runs) and the Cloud Storage calls behind
+blob.exists(), uploads, make_public() and downloads. It lets the Firebase
+code paths run without a project. The data is held in memory. Every request
+can be slowed down and made to fail on purpose:
+
+    python benchmarks/firebase_standin.py --port 9000 --latency 40 --jitter 15 --error-rate 0.01
+
+Then point the app at it through the SDKs' emulator settings:
+
+    FIREBASE_DATABASE_EMULATOR_HOST=127.0.0.1:9000 STORAGE_EMULATOR_HOST=http://127.0.0.1:9000 python app.py
+
+Each request waits --latency ms plus a random delay with a mean of
+--jitter ms, drawn from an exponential distribution so there is a long tail
+like a real network. A --error-rate fraction of requests is answered with
+--error-status instead. --bandwidth additionally limits the speed of Storage
+uploads and downloads. benchmarks/routes.py --backend firebase starts
+one of these itself.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import string
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+try:
+    import google_crc32c  # installed with google-cloud-storage
+except ImportError:
+    google_crc32c = None
+
+class StandIn:
+    """The stand-in's data and fault settings. Settings can be changed while it serves."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, bandwidth=None, seed=None):
+        self.latency = latency  # seconds added to every request
+        self.jitter = jitter  # mean of the extra, exponentially distributed delay, in seconds
+        self.error_rate = error_rate  # fraction of requests answered with error_status
+        self.error_status = error_status
+        self.bandwidth = bandwidth  # bytes per second for Storage media, None for unlimited
+        self.tree = None  # the database, as nested dicts
+        self.objects = {}  # (bucket, name) -> (object resource, data)
+        self.uploads = {}  # resumable upload id -> (bucket, metadata, received bytes)
+        self.stats = {'requests': 0, 'errors': 0}
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._last_push = (0, '')
+
+    def delay(self, size=0):
+        """Sleeps for one request's injected latency, plus transfer time for `size` bytes."""
+        with self.lock:
+            extra = self._random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0
+        seconds = self.latency + extra
+        if size and self.bandwidth:
+            seconds += size / self.bandwidth
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def should_fail(self):
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return True
+        return False
+
+    def push_id(self):
+        """A push key like RTDB's: time-ordered, with random characters after the timestamp."""
+        now = int(time.time() * 1000)
+        with self.lock:
+            last_time, last_suffix = self._last_push
+            if now <= last_time:
+                # Same millisecond: bump the suffix so keys stay in push order
+                now = last_time
+                digits = [PUSH_CHARS.index(c) for c in last_suffix]
+                i = len(digits) - 1
+                while digits[i] == len(PUSH_CHARS) - 1:
+                    digits[i] = 0
+                    i -= 1
+                digits[i] += 1
+                suffix = ''.join(PUSH_CHARS[d] for d in digits)
+            else:
+                suffix = ''.join(self._random.choice(PUSH_CHARS) for _ in range(12))
+            self._last_push = (now, suffix)
+        prefix = ''
+        for _ in range(8):
+            prefix = PUSH_CHARS[now % 64] + prefix
+            now //= 64
+        return prefix + suffix
+
+PUSH_CHARS = '-' + string.digits + string.ascii_uppercase + '_' + string.ascii_lowercase
+
+# Realtime Database
+# Data is kept as the server keeps it: lists become objects keyed "0", "1"...
+# and nulls and empty objects are not stored. Reads turn objects whose keys
+# are mostly consecutive integers back into arrays, as the REST API does.
+
+def _normalize(value):
+    if isinstance(value, list):
+        value = {str(i): v for i, v in enumerate(value)}
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            v = _normalize(v)
+            if v is not None:
+                out[str(k)] = v
+        return out or None
+    return value
+
+def _export(value):
+    if not isinstance(value, dict):
+        return value
+    out = {k: _export(v) for k, v in value.items()}
+    indexes = [int(k) for k in out if k.isdigit() and str(int(k)) == k]
+    if out and len(indexes) == len(out) and max(indexes) < 2 * len(out):
+        array = [None] * (max(indexes) + 1)
+        for k, v in out.items():
+            array[int(k)] = v
+        return array
+    return out
+
+def _json(value):
+    """A JSON body; unlike _send's None (no body), a missing node is answered with null."""
+    return json.dumps(value).encode()
+
+def _get(tree, parts):
+    node = tree
+    for part in parts:
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node
+
+def _set(tree, parts, value):
+    """Returns tree with the node at parts replaced by value (None deletes it)."""
+    if not parts:
+        return _normalize(value)
+    tree = tree if isinstance(tree, dict) else {}
+    child = _set(tree.get(parts[0]), parts[1:], value)
+    if child is None:
+        tree.pop(parts[0], None)
+    else:
+        tree[parts[0]] = child
+    return tree or None
+
+def _rank(value):
+    """Sort position of a value in RTDB order: null, false, true, numbers, strings, objects."""
+    if value is None:
+        return (0, 0)
+    if value is False:
+        return (1, 0)
+    if value is True:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, 0)
+
+def _key_rank(key):
+    """Keys that are 32-bit integers sort first, numerically; then the rest as strings."""
+    if key.lstrip('-').isdigit() and str(int(key)) == key and -2**31 <= int(key) < 2**31:
+        return (0, int(key), '')
+    return (1, 0, key)
+
+def _query(node, params):
+    """Applies orderBy, startAt, endAt, equalTo and limitToFirst/Last to a node's children."""
+    order = json.loads(params['orderBy'])
+    if not isinstance(node, dict):
+        return node
+    if order in ('$key', '$priority'):
+        rank = lambda k, v: _key_rank(k)
+        bound = lambda b: _key_rank(str(b))
+    elif order == '$value':
+        rank = lambda k, v: _rank(v)
+        bound = _rank
+    else:
+        parts = [p for p in order.split('/') if p]
+        rank = lambda k, v: _rank(_get(v, parts))
+        bound = _rank
+    items = sorted(node.items(), key=lambda kv: (rank(*kv), _key_rank(kv[0])))
+    if 'equalTo' in params:
+        params = dict(params, startAt=params['equalTo'], endAt=params['equalTo'])
+    if 'startAt' in params:
+        low = bound(json.loads(params['startAt']))
+        items = [kv for kv in items if rank(*kv) >= low]
+    if 'endAt' in params:
+        high = bound(json.loads(params['endAt']))
+        items = [kv for kv in items if rank(*kv) <= high]
+    if 'limitToFirst' in params:
+        items = items[:int(params['limitToFirst'])]
+    if 'limitToLast' in params:
+        items = items[-int(params['limitToLast']):] if int(params['limitToLast']) else []
+    return dict(items) or None
+
+def _etag(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+# Cloud Storage
+
+def _object_resource(bucket, name, metadata, data, acl=None):
+    now = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    generation = str(time.time_ns() // 1000)
+    resource = {
+        'kind': 'storage#object',
+        'id': f"{bucket}/{name}/{generation}",
+        'name': name,
+        'bucket': bucket,
+        'generation': generation,
+        'metageneration': '1',
+        'contentType': metadata.get('contentType') or 'application/octet-stream',
+        'size': str(len(data)),
+        'md5Hash': base64.b64encode(hashlib.md5(data).digest()).decode(),
+        'timeCreated': now,
+        'updated': now,
+        'acl': acl or [],
+    }
+    if google_crc32c is not None:
+        resource['crc32c'] = base64.b64encode(google_crc32c.Checksum(data).digest()).decode()
+    for field in ('cacheControl', 'contentDisposition', 'contentEncoding', 'metadata'):
+        if metadata.get(field) is not None:
+            resource[field] = metadata[field]
+    return resource
+
+def _split_multipart(body, content_type):
+    """Returns (metadata, data) from a multipart/related upload body."""
+    boundary = content_type.split('boundary=', 1)[1].strip().strip('"').encode()
+    parts = []
+    for chunk in body.split(b'--' + boundary)[1:]:
+        if chunk.startswith(b'--'):
+            break
+        headers, _, content = chunk[2:].partition(b'\r\n\r\n')  # drop the CRLF after the boundary
+        parts.append(content[:-2] if content.endswith(b'\r\n') else content)
+    return json.loads(parts[0] or b'{}'), parts[1]
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    standin = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, content_type='application/json; charset=utf-8', headers=None):
+        if body is None:
+            payload = b''
+        elif isinstance(body, bytes):
+            payload = body
+        else:
+            payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload or status != 204:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if payload and self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        body = self._body()
+        storage = url.path.startswith(('/storage/v1/', '/upload/storage/v1/', '/download/storage/v1/'))
+        standin = self.standin
+        standin.delay(len(body) if storage else 0)
+        if standin.should_fail():
+            if storage:
+                return self._send(standin.error_status, {'error': {
+                    'code': standin.error_status, 'message': 'Injected failure'}})
+            return self._send(standin.error_status, {'error': 'Injected failure'})
+        try:
+            if storage:
+                return self._storage(url.path, params, body)
+            if not url.path.endswith('.json') and self._public_object(url.path):
+                return
+            return self._database(url.path, params, body)
+        except (ValueError, KeyError, IndexError) as e:
+            return self._send(400, {'error': f"Bad request: {e}"})
+
+    do_GET = do_PUT = do_POST = do_PATCH = do_DELETE = _handle
+
+    # Realtime Database
+
+    def _database(self, path, params, body):
+        if not path.endswith('.json'):
+            return self._send(404, {'error': 'Not found'})
+        parts = [unquote(p) for p in path[:-len('.json')].split('/') if p]
+        standin = self.standin
+        silent = params.get('print') == 'silent'
+        with standin.lock:
+            current = _get(standin.tree, parts)
+            if self.command == 'GET':
+                if params.get('shallow') == 'true' and isinstance(current, dict):
+                    value = {k: True for k in current}
+                elif 'orderBy' in params:
+                    value = _query(current, params)
+                else:
+                    value = current
+                headers = {'ETag': _etag(current)} if self.headers.get('X-Firebase-ETag') == 'true' else None
+                return self._send(200, _json(_export(value)), headers=headers)
+
+            value = json.loads(body) if body else None
+            if_match = self.headers.get('if-match')
+            if if_match and if_match != _etag(current):
+                return self._send(412, _export(current), headers={'ETag': _etag(current)})
+            if self.command == 'PUT':
+                standin.tree = _set(standin.tree, parts, value)
+                result = _get(standin.tree, parts)
+            elif self.command == 'PATCH':
+                if not isinstance(value, dict):
+                    return self._send(400, {'error': 'Invalid data; couldn\'t parse JSON object.'})
+                # Multi-location update: keys are paths under this node
+                for child, child_value in value.items():
+                    standin.tree = _set(standin.tree, parts + [p for p in child.split('/') if p], child_value)
+                result = value
+            elif self.command == 'POST':
+                key = standin.push_id()
+                standin.tree = _set(standin.tree, parts + [key], value)
+                return self._send(200, {'name': key})
+            else:  # DELETE
+                standin.tree = _set(standin.tree, parts, None)
+                result = None
+        if silent:
+            return self._send(204)
+        return self._send(200, _json(_export(result)))
+
+    # Cloud Storage
+
+    def _storage(self, path, params, body):
+        parts = path.split('/')
+        standin = self.standin
+        if path.startswith('/upload/'):
+            # /upload/storage/v1/b/<bucket>/o
+            return self._upload(unquote(parts[5]), params, body)
+        download = path.startswith('/download/')
+        if download:
+            parts = parts[1:]
+        # /storage/v1/b/<bucket>/o/<name>[/acl]
+        if len(parts) < 7 or parts[3] != 'b' or parts[5] != 'o' or not parts[6]:
+            return self._send(404, {'error': {'code': 404, 'message': 'Not Found'}})
+        bucket, name = unquote(parts[4]), unquote(parts[6])
+        acl = len(parts) > 7 and parts[7] == 'acl'
+        with standin.lock:
+            stored = standin.objects.get((bucket, name))
+            if stored is not None and self.command == 'PATCH':
+                resource = dict(stored[0], **json.loads(body or b'{}'))
+                resource['metageneration'] = str(int(resource['metageneration']) + 1)
+                stored = standin.objects[(bucket, name)] = (resource, stored[1])
+            elif stored is not None and self.command == 'DELETE':
+                del standin.objects[(bucket, name)]
+        if stored is None:
+            return self._send(404, {'error': {'code': 404, 'message': f"No such object: {bucket}/{name}"}})
+        resource, data = stored
+        if self.command == 'GET':
+            if acl:
+                return self._send(200, {'kind': 'storage#objectAccessControls', 'items': resource['acl']})
+            if download or params.get('alt') == 'media':
+                return self._media(resource, data)
+            return self._send(200, resource)
+        if self.command == 'PATCH':
+            return self._send(200, resource)
+        if self.command == 'DELETE':
+            return self._send(204)
+        return self._send(405, {'error': {'code': 405, 'message': 'Method not allowed'}})
+
+    def _upload(self, bucket, params, body):
+        standin = self.standin
+        kind = params.get('uploadType')
+        if self.command == 'POST' and kind == 'multipart':
+            metadata, data = _split_multipart(body, self.headers['Content-Type'])
+            return self._store(bucket, metadata.get('name') or params['name'], metadata, data, params)
+        if self.command == 'POST' and kind == 'resumable':
+            metadata = json.loads(body or b'{}')
+            metadata.setdefault('name', params.get('name'))
+            if not metadata.get('contentType') and self.headers.get('X-Upload-Content-Type'):
+                metadata['contentType'] = self.headers['X-Upload-Content-Type']
+            upload_id = uuid.uuid4().hex
+            with standin.lock:
+                standin.uploads[upload_id] = (bucket, metadata, bytearray(), params)
+            host = self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]
+            location = (f"http://{host}/upload/storage/v1/b/{quote(bucket, safe='')}/o"
+                        f"?uploadType=resumable&upload_id={upload_id}")
+            return self._send(200, {}, headers={'Location': location})
+        if self.command == 'PUT' and kind == 'resumable':
+            with standin.lock:
+                bucket, metadata, received, start_params = standin.uploads[params['upload_id']]
+                received += body
+            # Content-Range: bytes <first>-<last>/<total or *>, or bytes */<total> to finish
+            total = (self.headers.get('Content-Range') or '').rpartition('/')[2]
+            if total != '*' and total and len(received) >= int(total):
+                with standin.lock:
+                    del standin.uploads[params['upload_id']]
+                return self._store(bucket, metadata['name'], metadata, bytes(received), start_params)
+            headers = {'Range': f"bytes=0-{len(received) - 1}"} if received else {}
+            return self._send(308, b'', headers=headers)
+        return self._send(400, {'error': {'code': 400, 'message': f"Unsupported upload: {kind}"}})
+
+    def _store(self, bucket, name, metadata, data, params):
+        # predefinedAcl=publicRead publishes the object with the upload itself
+        acl = [{'entity': 'allUsers', 'role': 'READER'}] if params.get('predefinedAcl') == 'publicRead' else None
+        resource = _object_resource(bucket, name, metadata, data, acl)
+        with self.standin.lock:
+            existing = self.standin.objects.get((bucket, name))
+            # ifGenerationMatch=0: only create, never overwrite
+            if params.get('ifGenerationMatch') == '0' and existing is not None:
+                return self._send(412, {'error': {'code': 412, 'message': 'At least one of the pre-conditions you specified did not hold.'}})
+            self.standin.objects[(bucket, name)] = (resource, data)
+        return self._send(200, resource)
+
+    def _media(self, resource, data):
+        if self.standin.bandwidth:
+            self.standin.delay(len(data))
+        headers = {'Cache-Control': resource['cacheControl']} if resource.get('cacheControl') else None
+        return self._send(200, data, content_type=resource['contentType'], headers=headers)
+
+    def _public_object(self, path):
+        """Serves blob.public_url, which points at the stand-in: /<bucket>/<name>. Returns False if no such object."""
+        bucket, _, name = path.lstrip('/').partition('/')
+        with self.standin.lock:
+            stored = self.standin.objects.get((unquote(bucket), unquote(name)))
+        if stored is None:
+            return False
+        if any(e.get('entity') == 'allUsers' for e in stored[0].get('acl') or []):
+            self._media(*stored)
+        else:
+            self._send(403, {'error': {'code': 403, 'message': 'Object is not public'}})
+        return True
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that give up on a slow (injected) response are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+def make_server(host='127.0.0.1', port=0, **settings):
+    """Returns an HTTP server for a new StandIn(**settings); serve it with serve_forever()."""
+    handler = type('StandInHandler', (Handler,), {'standin': StandIn(**settings)})
+    server = Server((host, port), handler)
+    server.standin = handler.standin
+    return server
+
+def start(host='127.0.0.1', port=0, **settings):
+    """Serves a stand-in on a background thread. Returns the server; call shutdown() to stop it."""
+    server = make_server(host, port, **settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def environment(server):
+    """The environment variables that point firebase_admin and google-cloud-storage at a server."""
+    host, port = server.server_address[:2]
+    return {
+        'FIREBASE_DATABASE_EMULATOR_HOST': f"{host}:{port}",
+        'STORAGE_EMULATOR_HOST': f"http://{host}:{port}",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency', type=float, default=0, help='ms added to every request (default 0)')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='mean ms of extra, exponentially distributed delay (default 0)')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests that fail (default 0)')
+    parser.add_argument('--error-status', type=int, default=503, help='status of failed requests (default 503)')
+    parser.add_argument('--bandwidth', type=float, help='MB/s for Storage uploads and downloads (default unlimited)')
+    parser.add_argument('--seed', type=int, help='seed for the injected delays and failures')
+    parser.add_argument('--data', help='JSON file to load as the initial database')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                         error_rate=args.error_rate, error_status=args.error_status,
+                         bandwidth=args.bandwidth * 1024 * 1024 if args.bandwidth else None, seed=args.seed)
+    if args.data:
+        with open(args.data) as f:
+            server.standin.tree = _normalize(json.load(f))
+    for name, value in environment(server).items():
+        print(f"{name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    stats = server.standin.stats
+    print(f"\n{stats['requests']} requests, {stats['errors']} failed on purpose")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""Generates a synthetic dataset for load testing.
+
+Writes every collection migrate_to_firebase.py knows about, in the shapes
+app.py reads and writes, at a chosen scale, plus placeholder images:
+
+    python benchmarks/generate_data.py --out /tmp/site-data                # medium
+    python benchmarks/generate_data.py --out /tmp/site-data --scale large
+    python benchmarks/generate_data.py --out /tmp/site-data --faculty 10000 --labs 300
+    DATA_DIR=/tmp/site-data DATA_BACKEND=files python app.py              # serve it
+
+Images are sets of resized JPEG/WebP variants made the way admin uploads are
+(see images.py), from placeholders at typical photo sizes with enough
+texture to compress like photos. They are written to
+static/images/<folder>/synthetic/, where the app serves them, and shared
+round-robin by the records of each folder. Everything comes from --seed, so
+the same arguments give the same data.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import images  # noqa: E402
+import journal  # noqa: E402
+
+IMAGES_DIR = os.path.join(ROOT_DIR, 'static', 'images')
+IMAGE_SUBFOLDER = 'synthetic'
+
+# Record counts per collection ('labs' is per department)
+SCALES = {
+    'small': {
+        'departments': 6, 'labs': 4, 'faculty': 60, 'news': 50, 'activities': 40, 'gallery': 60,
+        'stories': 12, 'recruiters': 20, 'facilities': 8, 'leadership': 4, 'announcements': 5,
+        'calendar': 20, 'notices': 10, 'governance': 4, 'library_images': 6,
+    },
+    'medium': {
+        'departments': 12, 'labs': 20, 'faculty': 1000, 'news': 5000, 'activities': 2000, 'gallery': 3000,
+        'stories': 200, 'recruiters': 100, 'facilities': 30, 'leadership': 10, 'announcements': 30,
+        'calendar': 200, 'notices': 500, 'governance': 10, 'library_images': 30,
+    },
+    'large': {
+        'departments': 40, 'labs': 300, 'faculty': 10000, 'news': 50000, 'activities': 20000, 'gallery': 30000,
+        'stories': 2000, 'recruiters': 500, 'facilities': 100, 'leadership': 25, 'announcements': 100,
+        'calendar': 1000, 'notices': 5000, 'governance': 25, 'library_images': 100,
+    },
+}
+
+# Image folder under static/images -> placeholder size (width, height)
+IMAGE_SIZES = {
+    'faculty': (600, 750),
+    'news': (1200, 675),
+    'gallery': (1600, 1067),
+    'placements': (400, 400),
+    'facilities': (1400, 933),
+    'activities': (1200, 800),
+    'labs': (1200, 800),
+    'governance': (400, 400),
+}
+
+# (id, name, icon, theme colour); past the end they repeat as further campuses
+DISCIPLINES = [
+    ('cse', 'Computer Science & Engineering', 'fas fa-laptop-code', '#3b82f6'),
+    ('aids', 'AI & Data Science', 'fas fa-brain', '#8b5cf6'),
+    ('civil', 'Civil Engineering', 'fas fa-hard-hat', '#22c55e'),
+    ('mech', 'Mechanical Engineering', 'fas fa-cogs', '#ef4444'),
+    ('ee', 'Electrical Engineering', 'fas fa-bolt', '#f59e0b'),
+    ('poly', 'Polytechnic', 'fas fa-tools', '#14b8a6'),
+    ('ece', 'Electronics & Communication', 'fas fa-microchip', '#06b6d4'),
+    ('it', 'Information Technology', 'fas fa-server', '#6366f1'),
+    ('chem', 'Chemical Engineering', 'fas fa-flask', '#84cc16'),
+    ('bt', 'Biotechnology', 'fas fa-dna', '#10b981'),
+    ('arch', 'Architecture', 'fas fa-drafting-compass', '#f97316'),
+    ('mba', 'Management Studies', 'fas fa-briefcase', '#a855f7'),
+]
+FIRST_NAMES = ('Aarav Aditi Akash Ananya Arjun Deepa Divya Gaurav Ishaan Kavya Manish Meera Neha Nikhil '
+               'Pooja Priya Rahul Riya Rohan Sakshi Sanjay Shreya Sunil Tanvi Varun Vikram Yash Zoya').split()
+LAST_NAMES = ('Agarwal Bhatt Chauhan Dubey Gupta Iyer Jain Joshi Kapoor Khan Kulkarni Mehta Mishra Nair '
+              'Pandey Patel Rao Reddy Saxena Sharma Singh Sinha Tiwari Verma Yadav').split()
+WORDS = ('academic advanced analysis applied campus certified college community computing conference '
+         'curriculum data department design development digital engineering excellence faculty '
+         'industry innovation institute laboratory learning machine modern national network practical '
+         'program project quality research robotics science seminar skills smart society student '
+         'sustainable systems technical technology training university workshop').split()
+COMPANIES = ('Infosys TCS Wipro Accenture Capgemini Cognizant Deloitte Amazon Microsoft Google IBM Oracle '
+             'HCL Tech Mahindra L&T Bosch Siemens Intel Adobe Flipkart Zoho Persistent Mindtree').split()
+DESIGNATIONS = ('Professor', 'Associate Professor', 'Assistant Professor', 'Lecturer')
+QUALIFICATIONS = ('Ph.D.', 'M.Tech', 'M.E.', 'M.Sc', 'MBA')
+EVENT_TYPES = [('Academic', 'badge-other'), ('Examination', 'badge-exam'), ('Cultural', 'badge-event'),
+               ('Holiday', 'badge-holiday'), ('Other', 'badge-other')]
+BORDER_COLORS = (None, '#10b981', '#ef4444', '#3b82f6', '#f59e0b')
+ANCHOR_DATE = date(2025, 6, 30)  # dates count back from here, so output doesn't depend on today
+
+def _id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+def _paragraph(rng, sentences=4):
+    return ' '.join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+def _title(rng, words=6):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).title()
+
+def _date(rng, days_back):
+    return ANCHOR_DATE - timedelta(days=rng.randrange(max(1, days_back)))
+
+def _news_date(d, rng):
+    # The ways admins type dates into the free-text field
+    return rng.choice([d.strftime('%b %d, %Y').upper(), d.isoformat(), d.strftime('%B %d, %Y')])
+
+def _placeholder(rng, width, height, label):
+    """A textured placeholder that compresses about like a photo."""
+    from PIL import Image, ImageDraw, ImageFilter
+    texture = Image.frombytes('L', (width, height), rng.randbytes(width * height))
+    texture = texture.filter(ImageFilter.GaussianBlur(1.2))
+    colour = Image.new('RGB', (width, height), tuple(rng.randrange(40, 220) for _ in range(3)))
+    shade = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    img = Image.blend(Image.blend(colour, shade, 0.3), Image.merge('RGB', [texture] * 3), 0.35)
+    ImageDraw.Draw(img).text((16, 16), label, fill=(255, 255, 255))
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=95)
+    buf.seek(0)
+    return buf
+
+def make_images(seed, folder, count, images_dir=IMAGES_DIR):
+    """Writes `count` variant sets for a folder. Returns [(image, srcset)] as records store them.
+
+    Sets already written by an earlier run with the same seed are reused.
+    """
+    if not images.available():
+        return []
+    width, height = IMAGE_SIZES[folder]
+    os.makedirs(os.path.join(images_dir, folder, IMAGE_SUBFOLDER), exist_ok=True)
+    made = []
+    for i in range(count):
+        names = {(w, fmt): f"{IMAGE_SUBFOLDER}/{folder}-{seed}-{i + 1}-{w}.{ext}"
+                 for w in images.target_widths(width) for fmt, (ext, _) in images.FORMATS.items()}
+        if not all(os.path.exists(os.path.join(images_dir, folder, name)) for name in names.values()):
+            rng = random.Random(f"{seed}-{folder}-{i}")
+            for w, fmt, data in images.make_variants(_placeholder(rng, width, height, f"{folder} {i + 1}")):
+                with open(os.path.join(images_dir, folder, names[(w, fmt)]), 'wb') as f:
+                    f.write(data)
+        srcset = {fmt: ', '.join(f"/static/images/{folder}/{names[(w, fmt)]} {w}w"
+                                 for w in images.target_widths(width))
+                  for fmt in images.FORMATS}
+        made.append((names[(images.target_widths(width)[-1], 'jpeg')], srcset))
+    return made
+
+def _pick(pool, i, default=''):
+    return pool[i % len(pool)] if pool else (default, {})
+
+def _departments(rng, counts, pool):
+    departments = []
+    for i in range(counts['departments']):
+        code, name, icon, colour = DISCIPLINES[i % len(DISCIPLINES)]
+        campus = i // len(DISCIPLINES)
+        if campus:
+            code, name = f"{code}{campus + 1}", f"{name} (Campus {campus + 1})"
+        labs = []
+        for j in range(counts['labs']):
+            image, srcset = _pick(pool['labs'], i * counts['labs'] + j)
+            labs.append({
+                "name": f"{_title(rng, 2)} Lab {j + 1}",
+                "icon": rng.choice(['fas fa-flask', 'fas fa-microscope', 'fas fa-robot', 'fas fa-desktop']),
+                "color": colour,
+                "image": image,
+                "image_srcset": srcset,
+                "description": _sentence(rng, 18),
+                "room_no": f"{rng.choice('ABCD')}-{rng.randint(101, 420)}",
+            })
+        departments.append({
+            "id": code,
+            "name": name,
+            "icon": icon,
+            "theme_color": colour,
+            "tagline": _title(rng, 4),
+            "intake": rng.choice([60, 120, 180, 240]),
+            "description": _paragraph(rng, 3),
+            "vision": _sentence(rng, 20),
+            "mission": _sentence(rng, 24),
+            "labs": labs,
+            "hod": {},  # filled in from the faculty list
+        })
+    return departments
+
+def _faculty(rng, counts, departments, pool):
+    faculty = []
+    for i in range(counts['faculty']):
+        dept = departments[i % len(departments)] if departments else None
+        hod = i < len(departments)
+        image, srcset = _pick(pool['faculty'], i)
+        name = f"Dr. {_name(rng)}" if hod or rng.random() < 0.4 else _name(rng)
+        member = {
+            "id": _id(rng),
+            "name": name,
+            "department": dept['name'] if dept else 'General',
+            "role": 'HOD' if hod else ('Staff' if rng.random() < 0.1 else 'Faculty'),
+            "designation": 'Professor & Head' if hod else rng.choice(DESIGNATIONS),
+            "image": image,
+            "image_srcset": srcset,
+            "bio": _paragraph(rng, 3),
+            "experience": f"{rng.randint(1, 30)} Years",
+            "email": f"{name.split()[-1].lower()}.{i}@example.edu",
+            "qualification": rng.choice(QUALIFICATIONS),
+            "specialization": _title(rng, 3),
+        }
+        faculty.append(member)
+        if hod and dept:
+            dept['hod'] = {
+                "name": name,
+                "role": 'Head of Department',
+                "quote": _sentence(rng, 16),
+                "image": image,
+                "image_srcset": srcset,
+                "faculty_id": member['id'],
+            }
+    return faculty
+
+def _dated(rng, count, days_back, make):
+    return [make(i, _date(rng, days_back)) for i in range(count)]
+
+def build(counts, seed=1, images_dir=IMAGES_DIR, image_pool=6):
+    """Returns {filename: data} for a dataset, writing its images on the way."""
+    pool = {folder: make_images(seed, folder, image_pool, images_dir) for folder in IMAGE_SIZES}
+    rng = random.Random(seed)
+    # About 2,000 dated items a year, so bigger archives reach further back
+    years = lambda n: max(1, n // 2000) * 365
+
+    departments = _departments(rng, counts, pool)
+    faculty = _faculty(rng, counts, departments, pool)
+
+    def news_item(i, d):
+        image, srcset = _pick(pool['news'], i, "https://via.placeholder.com/400x250")
+        return {"id": _id(rng), "title": _title(rng, rng.randint(5, 9)), "date": _news_date(d, rng),
+                "description": _paragraph(rng, 2), "image": image, "image_srcset": srcset}
+
+    def activity(i, d):
+        image, srcset = _pick(pool['activities'], i)
+        return {"id": _id(rng), "title": _title(rng, 5), "category": rng.choice(['sports', 'cultural']),
+                "description": _paragraph(rng, 2), "date": d.isoformat(), "image": image, "image_srcset": srcset}
+
+    def event(i, d):
+        category, badge = rng.choice(EVENT_TYPES)
+        end = d + timedelta(days=rng.randint(0, 5))
+        when = (f"{d.strftime('%B')} {d.day} - {end.day}, {d.year}"
+                if end.month == d.month and end != d else d.strftime('%B %d, %Y'))
+        return {"id": _id(rng), "activity": _title(rng, 4), "date": when, "category": category, "badge_class": badge}
+
+    def notice(i, d):
+        return {"id": _id(rng), "title": _title(rng, 6), "date": d.strftime('%B %d, %Y'),
+                "content": _paragraph(rng, 2), "border_color": rng.choice(BORDER_COLORS)}
+
+    gallery = []
+    for i in range(counts['gallery']):
+        image, srcset = _pick(pool['gallery'], i)
+        gallery.append({"id": _id(rng), "caption": _title(rng, 4), "image": image, "image_srcset": srcset})
+
+    stories = []
+    for i in range(counts['stories']):
+        image, srcset = _pick(pool['placements'], i, "https://via.placeholder.com/100")
+        stories.append({"id": _id(rng), "name": _name(rng), "company": rng.choice(COMPANIES),
+                        "package": f"{rng.randint(4, 40)} LPA", "quote": _sentence(rng, 20),
+                        "image": image, "image_srcset": srcset})
+    recruiters = [COMPANIES[i % len(COMPANIES)] + ('' if i < len(COMPANIES) else f" {i // len(COMPANIES) + 1}")
+                  for i in range(counts['recruiters'])]
+
+    facilities = []
+    for i in range(counts['facilities']):
+        image, srcset = _pick(pool['facilities'], i)
+        facilities.append({"id": _id(rng), "name": _title(rng, 2), "description": _paragraph(rng, 2),
+                           "icon": rng.choice(['fas fa-book', 'fas fa-bus', 'fas fa-wifi', 'fas fa-futbol']),
+                           "image": image, "image_srcset": srcset})
+
+    leadership = []
+    for i in range(counts['leadership']):
+        image, srcset = _pick(pool['faculty'], i)
+        leadership.append({"id": _id(rng), "name": f"Dr. {_name(rng)}",
+                           "role": ['Director', 'Principal', 'Chairman', 'Dean'][i % 4],
+                           "designation": _title(rng, 3), "message": _paragraph(rng, 4),
+                           "image": image, "image_srcset": srcset})
+
+    governance = []
+    for i in range(counts['governance']):
+        logo, srcset = _pick(pool['governance'], i)
+        short = ''.join(w[0] for w in _title(rng, 4).split()).upper()
+        governance.append({"id": _id(rng), "name": short, "full_name": _title(rng, 5),
+                           "type": rng.choice(['Regulatory Body', 'Affiliating University', 'Accreditation']),
+                           "description": _paragraph(rng, 2), "logo": logo, "logo_srcset": srcset,
+                           "website": f"https://www.{short.lower()}.example.org"})
+
+    librarian, _ = _pick(pool['faculty'], 0)
+    # library.html shows these from images/gallery/ and titles them from the file name
+    gallery_jpegs = [image for image, _ in pool['gallery']]
+    return {
+        'news.json': _dated(rng, counts['news'], years(counts['news']), news_item),
+        'faculty.json': faculty,
+        'departments.json': departments,
+        'gallery.json': gallery,
+        'placements.json': {
+            "stats": {"percentage": f"{rng.randint(80, 98)}%", "highest_package": f"{rng.randint(12, 45)} LPA",
+                      "recruiters_count": f"{counts['recruiters']}+"},
+            "recruiters": recruiters,
+            "stories": stories,
+        },
+        'facilities.json': facilities,
+        'activities.json': _dated(rng, counts['activities'], years(counts['activities']), activity),
+        'leadership.json': leadership,
+        'announcements.json': [{"id": _id(rng), "text": f"{_sentence(rng, 10)} <strong>{_title(rng, 2)}</strong>"}
+                               for _ in range(counts['announcements'])],
+        'academics.json': {
+            "calendar": _dated(rng, counts['calendar'], 365, event),
+            "notices": _dated(rng, counts['notices'], years(counts['notices']), notice),
+        },
+        'library.json': {
+            "stats": {"total_books": f"{rng.randint(20, 90)},000+", "journals": f"{rng.randint(50, 300)}+",
+                      "digital_resources": f"{rng.randint(5, 20)},000+", "titles": f"{rng.randint(5, 30)},000+"},
+            "features": [_title(rng, 3) for _ in range(6)],
+            "images": [gallery_jpegs[i % len(gallery_jpegs)] for i in range(counts['library_images'])]
+                      if gallery_jpegs else [],
+            "incharge": {"name": _name(rng), "designation": 'Librarian', "qualification": 'M.Lib.I.Sc',
+                         "experience": f"{rng.randint(5, 25)} Years", "message": _paragraph(rng, 2),
+                         "image": librarian},
+        },
+        'governance.json': governance,
+    }
+
+def write(out, collections):
+    """Writes collections to `out` as the app stores them (see journal.py)."""
+    # Imported here so a caller can still set DATA_DIR etc. before utils reads them
+    import utils
+    os.makedirs(out, exist_ok=True)
+    for filename, data in collections.items():
+        utils.add_sort_keys(filename.replace('.json', ''), data)
+        path = os.path.join(out, filename)
+        with journal.lock(path):
+            journal.replace(path, data)
+    if os.path.exists(os.path.join(out, 'site.db')):
+        print(f"Note: {os.path.join(out, 'site.db')} is left as it was; "
+              "delete it for DATA_BACKEND=sqlite to import the new files.")
+
+def generate(out, counts, seed=1, images_dir=IMAGES_DIR, image_pool=6):
+    collections = build(counts, seed, images_dir, image_pool)
+    write(out, collections)
+    return collections
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', required=True, help='folder to write the collections to (use as DATA_DIR)')
+    parser.add_argument('--scale', choices=SCALES, default='medium', help='preset record counts (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default %(default)s)')
+    parser.add_argument('--images', type=int, default=6,
+                        help='distinct images per folder, shared by its records (default %(default)s)')
+    parser.add_argument('--images-dir', default=IMAGES_DIR, help='where image folders go (default static/images)')
+    for name in SCALES['medium']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, metavar='N', help=f'override the {name} count')
+    args = parser.parse_args()
+
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+    if not images.available():
+        print("Pillow is not installed: records are written without images.")
+
+    started = time.perf_counter()
+    collections = generate(args.out, counts, args.seed, args.images_dir, args.images)
+    for filename in collections:
+        size = os.path.getsize(os.path.join(args.out, filename))
+        print(f"  {filename:20} {size / (1024 * 1024):8.1f} MB")
+    print(f"Wrote {len(collections)} collections to {args.out} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
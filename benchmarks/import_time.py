@@ -0,0 +1,99 @@
+"""Measures the cold-start cost of `from app import app`.
+
+Every run happens in a fresh interpreter, the same way a Vercel cold start
+reaches the app through api/index.py. Results can be saved as a baseline and
+later runs compared against it:
+
+    python benchmarks/import_time.py --save      # record a new baseline
+    python benchmarks/import_time.py             # compare against it
+    python benchmarks/import_time.py --top 15    # show the slowest imports
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'import_time.json')
+
+SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "from app import app; "
+    "print(time.perf_counter() - t)"
+)
+
+def run_once(env):
+    out = subprocess.run(
+        [sys.executable, '-c', SNIPPET],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # The last line is ours; anything before it is app start-up output
+    return float(out.stdout.strip().splitlines()[-1])
+
+def slowest_imports(env, top):
+    """Returns (cumulative_us, module) for the slowest imports, via -X importtime."""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import app'],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), module.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to start (default 10)')
+    parser.add_argument('--save', action='store_true', help='store the result as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown over the baseline median, as a fraction (default 0.25)')
+    parser.add_argument('--top', type=int, default=0, help='also list the N slowest imports')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    # Warm the OS file cache so the first sample isn't an outlier
+    run_once(env)
+    samples = [run_once(env) for _ in range(args.runs)]
+    result = {
+        'runs': args.runs,
+        'min_ms': round(min(samples) * 1000, 1),
+        'median_ms': round(statistics.median(samples) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+    }
+    print(f"from app import app: median {result['median_ms']} ms "
+          f"(min {result['min_ms']}, max {result['max_ms']}, {args.runs} runs)")
+
+    if args.top:
+        print(f"\nSlowest imports (cumulative):")
+        for cumulative, module in slowest_imports(env, args.top):
+            print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(result, f, indent=4)
+        print(f"\nBaseline saved to {os.path.relpath(BASELINE_PATH, ROOT_DIR)}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nNo baseline yet; run with --save to create one.")
+        return 0
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    limit = baseline['median_ms'] * (1 + args.tolerance)
+    change = (result['median_ms'] - baseline['median_ms']) / baseline['median_ms'] * 100
+    print(f"\nBaseline median {baseline['median_ms']} ms ({change:+.0f}%)")
+    if result['median_ms'] > limit:
+        print(f"REGRESSION: median is above the allowed {limit:.1f} ms")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""Benchmarks every route of app.py in-process.
+
+A synthetic dataset (see generate_data.py) is written to a temporary folder
+and the app is pointed at it through DATA_DIR. Every route is then
+requested through Flask's test client, after a few warm-up requests:
+public pages, admin pages and CRUD actions, and image serving. The report
+gives p50/p95/p99 latency and requests per second per route. Results can be
+saved as a baseline and later runs compared against it, as with
+import_time.py:
+
+    python benchmarks/routes.py --save                  # record a baseline
+    python benchmarks/routes.py                         # compare against it
+    python benchmarks/routes.py --scale large --backend sqlite
+    python benchmarks/routes.py --only news,faculty     # routes whose name contains these
+    python benchmarks/routes.py --backend firebase --latency 40 --jitter 15
+
+The rendered-page cache is off unless --page-cache is given, so every
+request renders its template. Baselines are kept per scale and backend, in
+baselines/routes_<scale>_<backend>.json. A route added to app.py without a
+scenario here is reported and fails the run.
+
+--backend firebase runs the Firebase code paths against a local stand-in
+(see firebase_standin.py) loaded with the dataset. --latency, --jitter and
+--error-rate set the stand-in's faults.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'baselines')
+sys.path.insert(0, ROOT_DIR)
+
+import firebase_standin  # noqa: E402
+import generate_data  # noqa: E402
+
+# A p95 this much slower than the baseline is only reported as a regression
+# if it is also slower by at least NOISE_MS, so sub-millisecond routes don't flap
+NOISE_MS = 2.0
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list."""
+    return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+def scenario(name, endpoint, url, method='GET', data=None, admin=False, status=200, setup=None):
+    """A benchmarked request. url and data may be callables of the request number.
+
+    setup(n), if given, runs untimed before the scenario with the number of
+    requests it will make (e.g. to add the records its requests delete).
+    """
+    return {'name': name, 'endpoint': endpoint, 'url': url, 'method': method, 'data': data,
+            'admin': admin, 'status': status, 'setup': setup}
+
+def _victims(utils, filename, record, path=None):
+    """Setup that adds records for a delete route to remove, one per request."""
+    def setup(n):
+        for i in range(n):
+            utils.append_record(filename, dict(record, id=f"bench-{filename}-{i}"), path=path)
+    return setup
+
+def _upload(name, data):
+    return lambda i: {'caption': 'Benchmark upload', 'image': (io.BytesIO(data), name)}
+
+def build_scenarios(utils, profiles, collections, sample_image):
+    """Returns the scenarios for the app's routes, from the generated collections."""
+    faculty = collections['faculty.json'][len(collections['departments.json'])]  # not an HOD
+    dept = collections['departments.json'][0]
+    news = collections['news.json'][0]
+    activity = collections['activities.json'][0]
+    leader = collections['leadership.json'][0]
+    image_path, image_bytes = sample_image
+    image_url = f"/static/images/{image_path}"
+    dept_form = {
+        'name': dept['name'], 'icon': dept['icon'], 'theme_color': dept['theme_color'], 'tagline': dept['tagline'],
+        'intake': str(dept['intake']), 'description': dept['description'], 'vision': dept['vision'],
+        'mission': dept['mission'], 'hod_name': dept['hod'].get('name', ''), 'hod_role': dept['hod'].get('role', ''),
+        'hod_quote': dept['hod'].get('quote', ''),
+        'lab_name[]': [lab['name'] for lab in dept['labs']],
+        'lab_icon[]': [lab['icon'] for lab in dept['labs']],
+        'lab_color[]': [lab['color'] for lab in dept['labs']],
+        'lab_description[]': [lab['description'] for lab in dept['labs']],
+        'lab_existing_image[]': [lab['image'] for lab in dept['labs']],
+    }
+    faculty_form = {k: faculty[k] for k in ('name', 'department', 'role', 'designation', 'bio', 'experience',
+                                             'email', 'qualification', 'specialization')}
+    profile = {}
+
+    def record_profile(n):
+        profile['name'] = profiles.save(profiles.start(), {'endpoint': 'benchmark', 'method': 'GET', 'path': '/',
+                                                           'status': 200, 'seconds': 0})
+
+    new_dept = dict(dept_form, id='')
+    for key in list(new_dept):
+        if key.endswith('[]'):
+            del new_dept[key]
+
+    return [
+        # Public pages
+        scenario('home', 'index', '/'),
+        scenario('news', 'news', '/news'),
+        scenario('news page 2', 'news', lambda i: '/news?cursor=' + news.get('sort_key', '')),
+        scenario('activities', 'activities', '/activities'),
+        scenario('gallery', 'gallery', '/gallery'),
+        scenario('faculty', 'faculty', '/faculty'),
+        scenario('faculty one dept', 'faculty', f"/faculty?dept={dept['name']}"),
+        scenario('faculty detail', 'faculty_detail', f"/faculty/{faculty['id']}"),
+        scenario('departments', 'departments', '/departments'),
+        scenario('department labs', 'department_labs', f"/departments/{dept['id']}/labs"),
+        scenario('academics', 'academics', '/academics'),
+        scenario('placement', 'placement', '/placement'),
+        scenario('about', 'about', '/about'),
+        scenario('facilities', 'facilities', '/facilities'),
+        scenario('library', 'library', '/library'),
+        scenario('governance', 'governance', '/governance'),
+        scenario('contact', 'contact', '/contact'),
+        scenario('admission', 'admission', '/admission'),
+        scenario('search', 'search', '/search?q=engineering research'),
+        scenario('search prefix', 'search', '/search?q=comp&kind=faculty'),
+        # Files
+        scenario('image', 'serve_tmp_images', image_url),
+        scenario('favicon.ico', 'favicon_ico', '/favicon.ico'),
+        scenario('favicon.png', 'favicon_png', '/favicon.png'),
+        scenario('stylesheet', 'static', '/static/css/style.css'),
+        # Admin pages
+        scenario('login page', 'admin_login', '/admin/login'),
+        scenario('login', 'admin_login', '/admin/login', 'POST',
+                 {'username': 'admin', 'password': 'password123'}, status=302),
+        scenario('logout', 'admin_logout', '/admin/logout', admin=True, status=302),
+        scenario('dashboard', 'admin_dashboard', '/admin/dashboard', admin=True),
+        scenario('upload jobs', 'upload_jobs', '/admin/uploads', admin=True),
+        scenario('upload status', 'upload_status', '/admin/uploads/none', admin=True, status=404),
+        scenario('metrics', 'metrics_export', '/metrics', admin=True),
+        scenario('home profiled', 'index', '/?_profile=1', admin=True),
+        scenario('profile download', 'download_profile', lambda i: f"/admin/profiles/{profile['name']}",
+                 admin=True, setup=record_profile),
+        scenario('profile summary', 'profile_summary', lambda i: f"/admin/profiles/{profile['name']}/summary",
+                 admin=True, setup=record_profile),
+        scenario('admin faculty', 'manage_faculty', '/admin/faculty', admin=True),
+        scenario('admin news', 'manage_news', '/admin/news', admin=True),
+        scenario('admin announcements', 'manage_announcements', '/admin/announcements', admin=True),
+        scenario('admin gallery', 'manage_gallery', '/admin/gallery', admin=True),
+        scenario('admin placements', 'manage_placements', '/admin/placements', admin=True),
+        scenario('admin leadership', 'manage_leadership', '/admin/leadership', admin=True),
+        scenario('admin departments', 'manage_departments', '/admin/departments', admin=True),
+        scenario('admin facilities', 'manage_facilities', '/admin/facilities', admin=True),
+        scenario('admin academics', 'manage_academics', '/admin/academics', admin=True),
+        scenario('admin activities', 'manage_activities', '/admin/activities', admin=True),
+        scenario('admin governance', 'manage_governance', '/admin/governance', admin=True),
+        scenario('edit faculty page', 'edit_faculty', f"/admin/faculty/edit/{faculty['id']}", admin=True),
+        scenario('edit news page', 'edit_news', f"/admin/news/edit/{news['id']}", admin=True),
+        scenario('edit leadership page', 'edit_leadership', f"/admin/leadership/edit/{leader['id']}", admin=True),
+        scenario('edit department page', 'edit_department', f"/admin/departments/edit/{dept['id']}", admin=True),
+        scenario('edit activity page', 'edit_activity', f"/admin/activities/edit/{activity['id']}", admin=True),
+        scenario('upload faculty page', 'upload_faculty', '/upload_faculty'),
+        # Admin writes: creates, then edits that write back the same values, then deletes
+        scenario('add faculty', 'manage_faculty', '/admin/faculty', 'POST', faculty_form, admin=True, status=302),
+        scenario('add news', 'manage_news', '/admin/news', 'POST',
+                 {'title': news['title'], 'date': news['date'], 'description': news['description']},
+                 admin=True, status=302),
+        scenario('add announcement', 'manage_announcements', '/admin/announcements', 'POST',
+                 {'text': 'Benchmark announcement'}, admin=True, status=302),
+        scenario('add gallery image', 'manage_gallery', '/admin/gallery', 'POST',
+                 _upload('photo.jpg', image_bytes), admin=True, status=302),
+        scenario('update placement stats', 'manage_placements', '/admin/placements', 'POST',
+                 {'action': 'update_stats', 'percentage': '90%', 'highest_package': '30 LPA',
+                  'recruiters_count': '100+'}, admin=True, status=302),
+        scenario('add story', 'manage_placements', '/admin/placements', 'POST',
+                 {'action': 'add_story', 'name': 'Benchmark', 'company': 'Example', 'package': '10 LPA',
+                  'quote': 'Benchmark story'}, admin=True, status=302),
+        scenario('add leader', 'manage_leadership', '/admin/leadership', 'POST',
+                 {'name': leader['name'], 'role': leader['role'], 'designation': leader['designation'],
+                  'message': leader['message']}, admin=True, status=302),
+        scenario('add department', 'manage_departments', '/admin/departments', 'POST', new_dept,
+                 admin=True, status=302),
+        scenario('add facility', 'manage_facilities', '/admin/facilities', 'POST',
+                 {'name': 'Benchmark Hall', 'description': 'Benchmark facility', 'icon': 'fas fa-book'},
+                 admin=True, status=302),
+        scenario('add calendar event', 'manage_academics', '/admin/academics', 'POST',
+                 {'form_type': 'event', 'activity': 'Benchmark', 'date': 'June 15 - 20, 2025',
+                  'category': 'Academic', 'badge_class': 'badge-other'}, admin=True, status=302),
+        scenario('add notice', 'manage_academics', '/admin/academics', 'POST',
+                 {'form_type': 'notice', 'title': 'Benchmark', 'date': 'March 10, 2025',
+                  'content': 'Benchmark notice', 'border_color': ''}, admin=True, status=302),
+        scenario('add activity', 'manage_activities', '/admin/activities', 'POST',
+                 {'title': activity['title'], 'category': activity['category'],
+                  'description': activity['description'], 'date': activity['date']}, admin=True, status=302),
+        scenario('add governing body', 'manage_governance', '/admin/governance', 'POST',
+                 {'name': 'BENCH', 'full_name': 'Benchmark Council', 'type': 'Regulatory Body',
+                  'description': 'Benchmark', 'website': 'https://example.org'}, admin=True, status=302),
+        scenario('edit faculty', 'edit_faculty', f"/admin/faculty/edit/{faculty['id']}", 'POST', faculty_form,
+                 admin=True, status=302),
+        scenario('edit news', 'edit_news', f"/admin/news/edit/{news['id']}", 'POST',
+                 {'title': news['title'], 'date': news['date'], 'description': news['description']},
+                 admin=True, status=302),
+        scenario('edit leader', 'edit_leadership', f"/admin/leadership/edit/{leader['id']}", 'POST',
+                 {'name': leader['name'], 'role': leader['role'], 'designation': leader['designation'],
+                  'message': leader['message']}, admin=True, status=302),
+        scenario('edit department', 'edit_department', f"/admin/departments/edit/{dept['id']}", 'POST',
+                 dept_form, admin=True, status=302),
+        scenario('edit activity', 'edit_activity', f"/admin/activities/edit/{activity['id']}", 'POST',
+                 {'title': activity['title'], 'category': activity['category'],
+                  'description': activity['description'], 'date': activity['date']}, admin=True, status=302),
+        scenario('upload faculty image', 'upload_faculty', '/upload_faculty', 'POST',
+                 lambda i: {'filename': 'bench.jpg', 'file': (io.BytesIO(image_bytes), 'bench.jpg')}, status=302),
+        scenario('delete faculty', 'delete_faculty', lambda i: f"/admin/faculty/delete/bench-faculty.json-{i}",
+                 admin=True, status=302, setup=_victims(utils, 'faculty.json', faculty)),
+        scenario('delete news', 'delete_news', lambda i: f"/admin/news/delete/bench-news.json-{i}",
+                 admin=True, status=302, setup=_victims(utils, 'news.json', news)),
+        scenario('delete announcement', 'delete_announcement',
+                 lambda i: f"/admin/announcements/delete/bench-announcements.json-{i}", admin=True, status=302,
+                 setup=_victims(utils, 'announcements.json', {'text': 'Benchmark'})),
+        scenario('delete gallery image', 'delete_gallery', lambda i: f"/admin/gallery/delete/bench-gallery.json-{i}",
+                 admin=True, status=302, setup=_victims(utils, 'gallery.json', collections['gallery.json'][0])),
+        scenario('delete story', 'delete_story', lambda i: f"/admin/placements/delete_story/bench-placements.json-{i}",
+                 admin=True, status=302,
+                 setup=_victims(utils, 'placements.json', collections['placements.json']['stories'][0], 'stories')),
+        scenario('delete leader', 'delete_leadership', lambda i: f"/admin/leadership/delete/bench-leadership.json-{i}",
+                 admin=True, status=302, setup=_victims(utils, 'leadership.json', leader)),
+        scenario('delete department', 'delete_department',
+                 lambda i: f"/admin/departments/delete/bench-departments.json-{i}", admin=True, status=302,
+                 setup=_victims(utils, 'departments.json', dict(dept, labs=[]))),
+        scenario('delete facility', 'delete_facility', lambda i: f"/admin/facilities/delete/bench-facilities.json-{i}",
+                 admin=True, status=302, setup=_victims(utils, 'facilities.json', collections['facilities.json'][0])),
+        scenario('delete calendar event', 'delete_academic_event',
+                 lambda i: f"/admin/academics/event/delete/bench-academics.json-{i}", admin=True, status=302,
+                 setup=_victims(utils, 'academics.json', collections['academics.json']['calendar'][0], 'calendar')),
+        scenario('delete notice', 'delete_academic_notice',
+                 lambda i: f"/admin/academics/notice/delete/bench-academics.json-{i}", admin=True, status=302,
+                 setup=_victims(utils, 'academics.json', collections['academics.json']['notices'][0], 'notices')),
+        scenario('delete activity', 'delete_activity', lambda i: f"/admin/activities/delete/bench-activities.json-{i}",
+                 admin=True, status=302, setup=_victims(utils, 'activities.json', activity)),
+        scenario('delete governing body', 'delete_governance',
+                 lambda i: f"/admin/governance/delete/bench-governance.json-{i}", admin=True, status=302,
+                 setup=_victims(utils, 'governance.json', collections['governance.json'][0])),
+    ]
+
+def run_scenario(app, sc, requests, warmup):
+    """Returns (sorted latencies in seconds, their total, {unexpected status: count})."""
+    if sc['setup']:
+        sc['setup'](warmup + requests)
+    client = app.test_client()
+    login = {'username': app.config['ADMIN_USERNAME'], 'password': app.config['ADMIN_PASSWORD']}
+    if sc['admin']:
+        client.post('/admin/login', data=login)
+    latencies = []
+    bad = {}
+    for i in range(warmup + requests):
+        if sc['endpoint'] == 'admin_logout':
+            client.post('/admin/login', data=login)  # untimed: every request needs a session to end
+        url = sc['url'](i) if callable(sc['url']) else sc['url']
+        data = sc['data'](i) if callable(sc['data']) else sc['data']
+        t = time.perf_counter()
+        response = client.open(url, method=sc['method'], data=data)
+        elapsed = time.perf_counter() - t
+        response.close()
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        if response.status_code != sc['status']:
+            bad[response.status_code] = bad.get(response.status_code, 0) + 1
+    latencies.sort()
+    return latencies, sum(latencies), bad
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=generate_data.SCALES, default='small',
+                        help='dataset size (default %(default)s)')
+    parser.add_argument('--backend', choices=('files', 'sqlite', 'firebase'), default='files',
+                        help='DATA_BACKEND to run against, or firebase for the stand-in (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0, help='ms the Firebase stand-in adds per call')
+    parser.add_argument('--jitter', type=float, default=0, help='mean ms of extra random delay per call')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of Firebase calls that fail')
+    parser.add_argument('--requests', type=int, default=30, help='timed requests per route (default 30)')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per route first (default 3)')
+    parser.add_argument('--only', help='comma-separated parts of route names to run')
+    parser.add_argument('--page-cache', action='store_true', help='leave the rendered-page cache on')
+    parser.add_argument('--seed', type=int, default=1, help='dataset seed (default %(default)s)')
+    parser.add_argument('--save', action='store_true', help='store the result as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95 slowdown over the baseline, as a fraction (default 0.25)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='routes-bench-')
+    standin = None
+    try:
+        # Configure utils and the app before either is imported
+        os.environ.update(DATA_DIR=os.path.join(work_dir, 'data'), PROFILE_DIR=os.path.join(work_dir, 'profiles'),
+                          BACKGROUND_UPLOADS='0',
+                          DATA_BACKEND='' if args.backend == 'firebase' else args.backend)
+        if args.backend == 'firebase':
+            standin = firebase_standin.start()
+            os.environ.update(firebase_standin.environment(standin))
+        if not args.page_cache:
+            os.environ['PAGE_CACHE_TTL'] = '0'
+        print(f"Generating the {args.scale} dataset...")
+        collections = generate_data.generate(os.environ['DATA_DIR'], generate_data.SCALES[args.scale], args.seed)
+        # Admin uploads are written under the working directory
+        os.chdir(work_dir)
+        from app import app
+        import profiles
+        import utils
+
+        if standin:
+            for filename, data in collections.items():
+                utils.save_json(filename, data)
+            utils.invalidate_cache()
+            standin.standin.latency = args.latency / 1000
+            standin.standin.jitter = args.jitter / 1000
+            standin.standin.error_rate = args.error_rate
+
+        gallery = collections['gallery.json'][0]['image']
+        image_path = f"gallery/{gallery}" if gallery else 'faculty_placeholder.jpg'
+        with open(os.path.join(ROOT_DIR, 'static', 'images', image_path), 'rb') as f:
+            sample_image = (image_path, f.read())
+        scenarios = build_scenarios(utils, profiles, collections, sample_image)
+
+        covered = {sc['endpoint'] for sc in scenarios}
+        missing = sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered)
+        if args.only:
+            parts = [p.strip() for p in args.only.split(',') if p.strip()]
+            scenarios = [sc for sc in scenarios if any(p in sc['name'] for p in parts)]
+
+        results = {}
+        failed = False
+        print(f"\n{'route':28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for sc in scenarios:
+            latencies, total, bad = run_scenario(app, sc, max(1, args.requests), max(0, args.warmup))
+            result = {
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+                'rps': round(len(latencies) / total, 1) if total else 0,
+            }
+            results[sc['name']] = result
+            note = ''
+            if bad:
+                failed = True
+                note = '  unexpected status ' + ', '.join(f"{code} x{n}" for code, n in sorted(bad.items()))
+            print(f"{sc['name']:28} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                  f"{result['p99_ms']:8.2f} {result['rps']:8.1f}{note}")
+    finally:
+        if standin:
+            standin.shutdown()
+        os.chdir(ROOT_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if missing:
+        failed = True
+        print(f"\nRoutes without a scenario: {', '.join(missing)}")
+
+    output = {'scale': args.scale, 'backend': args.backend, 'requests': args.requests,
+              'page_cache': args.page_cache, 'routes': results}
+    if args.backend == 'firebase':
+        output['faults'] = {'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=4)
+
+    baseline_path = os.path.join(BASELINE_DIR, f"routes_{args.scale}_{args.backend}.json")
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(output, f, indent=4)
+        print(f"\nBaseline saved to {os.path.relpath(baseline_path, ROOT_DIR)}")
+        return 1 if failed else 0
+
+    if not os.path.exists(baseline_path):
+        print("\nNo baseline yet; run with --save to create one.")
+        return 1 if failed else 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline.get('page_cache') != args.page_cache or baseline.get('faults') != output.get('faults'):
+        print("\nBaseline was recorded with different --page-cache or fault settings; not comparing.")
+        return 1 if failed else 0
+    regressions = []
+    for name, result in results.items():
+        before = baseline['routes'].get(name)
+        if not before:
+            continue
+        limit = before['p95_ms'] * (1 + args.tolerance)
+        if result['p95_ms'] > limit and result['p95_ms'] - before['p95_ms'] >= NOISE_MS:
+            change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            regressions.append(f"  {name}: p95 {result['p95_ms']:.2f} ms, baseline {before['p95_ms']:.2f} ms "
+                               f"({change:+.0f}%)")
+    if regressions:
+        print(f"\nREGRESSION: p95 above the baseline by more than {args.tolerance:.0%}:")
+        print('\n'.join(regressions))
+        return 1
+    print(f"\nNo route's p95 is more than {args.tolerance:.0%} above "
+          f"{os.path.relpath(baseline_path, ROOT_DIR)}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Upload-time image processing.
+
+Turns an uploaded photo into a set of resized WebP and JPEG variants with
+EXIF/metadata stripped, so pages can serve a right-sized file through
+srcset instead of the multi-megabyte original.
+"""
+import importlib.util
+import io
+import struct
+
+# Widths larger than the original are skipped; the original width (capped at
+# the largest entry) is always produced and becomes the main image.
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpeg': ('jpg', 'image/jpeg'),
+}
+
+# Formats sniff() recognises
+SNIFFED_FORMATS = ('jpeg', 'png', 'gif', 'webp')
+# JPEG markers that start a frame and carry the dimensions (SOF0-SOF15 minus DHT/JPG/DAC)
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Pillow is imported on first use, so cold starts and requests that never
+# resize an image don't pay for it. It is optional; without it uploads are
+# stored as-is.
+def available():
+    """Returns True if Pillow is installed."""
+    return importlib.util.find_spec('PIL') is not None
+
+def target_widths(width):
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    widths.append(min(width, VARIANT_WIDTHS[-1]))
+    return widths
+
+def _encode(img, fmt):
+    from PIL import Image
+    buf = io.BytesIO()
+    if fmt == 'webp':
+        img.save(buf, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        if img.mode != 'RGB':
+            # JPEG has no alpha channel: flatten onto white
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A') if 'A' in img.getbands() else None)
+            img = background
+        img.save(buf, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+def make_variants(stream):
+    """Returns a list of (width, fmt, bytes) for an image stream, smallest first.
+
+    fmt is a key of FORMATS. Returns None when Pillow is missing, the stream
+    is not a readable image, or it is an animation (kept as uploaded).
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        stream.seek(0)
+        img = Image.open(stream)
+        if getattr(img, 'is_animated', False):
+            return None
+        # Apply the EXIF orientation to the pixels; EXIF itself is not re-saved
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    except Exception as e:
+        print(f"Image processing skipped: {e}")
+        return None
+    finally:
+        stream.seek(0)
+
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+
+    variants = []
+    for width in target_widths(img.width):
+        if width == img.width:
+            resized = img
+        else:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+        for fmt in FORMATS:
+            variants.append((width, fmt, _encode(resized, fmt)))
+    return variants
+
+def _sniff_jpeg(stream):
+    """Walks the JPEG segment headers (seeking past their payloads) to the first frame header."""
+    stream.seek(2)
+    while True:
+        marker = stream.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:  # fill bytes
+            marker = marker[1:] + stream.read(1)
+            if len(marker) < 2:
+                return None
+        code = marker[1]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:  # markers without a payload
+            continue
+        size = stream.read(2)
+        if len(size) < 2:
+            return None
+        length = struct.unpack('>H', size)[0]
+        if code in _JPEG_SOF:
+            frame = stream.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        if code == 0xDA:  # image data started without a frame header
+            return None
+        stream.seek(length - 2, io.SEEK_CUR)
+
+def _sniff_header(head):
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        return ('png',) + struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return ('gif',) + struct.unpack('<HH', head[6:10])
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        chunk = head[12:16]
+        if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+            width, height = struct.unpack('<HH', head[26:30])
+            return 'webp', width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L' and head[20:21] == b'\x2f':
+            bits = int.from_bytes(head[21:25], 'little')
+            return 'webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return 'webp', int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None
+
+def sniff(stream):
+    """Returns (fmt, width, height) read from an image's header bytes, or None.
+
+    Only the first few bytes are read (JPEG segments are seeked over), so
+    this is cheap even for a large upload and doesn't need Pillow. fmt is
+    one of SNIFFED_FORMATS. The stream is rewound afterwards.
+    """
+    try:
+        stream.seek(0)
+        head = stream.read(32)
+        if head[:2] == b'\xff\xd8':
+            size = _sniff_jpeg(stream)
+            return ('jpeg',) + size if size else None
+        if len(head) < 30:
+            return None
+        return _sniff_header(head)
+    except (OSError, struct.error):
+        return None
+    finally:
+        stream.seek(0)
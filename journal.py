@@ -0,0 +1,238 @@
+"""Append-only journal for the local JSON collections.
+
+A collection is its snapshot, data/<name>.json (the file the app has always
+used), plus a log next to it, data/<name>.json.log, holding one JSON line per
+record-level write. Writes append a line and fsync it instead of rewriting
+the whole file; reads replay the log over the snapshot. A crash mid-append
+leaves at most a torn last line, which replay ignores and the next append
+cuts off.
+
+The log's first line records a hash of the snapshot it applies to.
+Compaction (and save_json) writes the new snapshot first and removes the log
+second, so if it stops in between, the leftover log no longer matches the
+snapshot and is ignored rather than applied twice. Logs are compacted by a
+background thread once they grow past COMPACT_BYTES.
+
+Writers hold an exclusive lock on data/<name>.json.lock and readers a shared
+one, so several processes (e.g. gunicorn workers) can use the same files.
+"""
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are serialized
+    fcntl = None
+
+COMPACT_BYTES = int(os.environ.get('JOURNAL_COMPACT_KB', 256)) * 1024
+LOG_SUFFIX = '.log'
+LOCK_SUFFIX = '.lock'
+
+_process_lock = threading.RLock()  # stands in for file locks without fcntl
+_snapshot_hashes = {}  # snapshot path -> (stat, hash), so appends don't re-read it
+_compact_queue = {}  # snapshot path -> apply function, waiting for the compactor
+_compact_cond = threading.Condition()
+_compactor = None
+
+@contextmanager
+def lock(path, shared=False):
+    """Locks a collection's files against other threads and processes."""
+    if fcntl is None:
+        with _process_lock:
+            yield
+        return
+    try:
+        f = open(path + LOCK_SUFFIX, 'a')
+    except OSError:
+        if not shared:
+            raise
+        # Read-only data folder (e.g. a deployed bundle): nothing can write, so nothing to lock
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+def state(path):
+    """Identifies the current contents of a collection's files; changes with every write."""
+    return _stat(path), _stat(path + LOG_SUFFIX)
+
+def _hash(raw):
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def _snapshot_hash(path, raw=None):
+    stat = _stat(path)
+    cached = _snapshot_hashes.get(path)
+    if cached and cached[0] == stat:
+        return cached[1]
+    if raw is None:
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b''
+    digest = _hash(raw)
+    _snapshot_hashes[path] = (stat, digest)
+    return digest
+
+def _fsync_dir(path):
+    if os.name != 'posix':
+        return
+    fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_atomic(path, raw):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+def _log_entries(path, base):
+    """Returns the log entries that apply to the snapshot with hash `base`."""
+    try:
+        with open(path + LOG_SUFFIX, 'rb') as f:
+            lines = f.read().split(b'\n')
+    except FileNotFoundError:
+        return []
+    try:
+        if json.loads(lines[0]).get('base') != base:
+            return []  # left over from before the snapshot was replaced
+    except ValueError:
+        return []
+    entries = []
+    # The last element is what follows the final newline: empty, or a torn write
+    for line in lines[1:-1]:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            break
+    return entries
+
+def read(path, apply, locked=False):
+    """Returns (data, state) for a collection with its log replayed.
+
+    apply(data, entry) applies one log entry and returns the data. Raises
+    FileNotFoundError if there is neither a snapshot nor a log, and
+    ValueError if the snapshot is not valid JSON. Pass locked=True when the
+    caller already holds lock(path).
+    """
+    with nullcontext() if locked else lock(path, shared=True):
+        current = state(path)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw)
+        except FileNotFoundError:
+            raw, data = b'', None
+        entries = _log_entries(path, _snapshot_hash(path, raw))
+        if current[0] is None and not entries:
+            raise FileNotFoundError(path)
+        for entry in entries:
+            data = apply(data, entry)
+        return data, current
+
+def append(path, entry, apply=None):
+    """Appends an entry to the log and fsyncs it. Caller holds lock(path).
+
+    Returns the new state. apply is what read() replays with; it is used to
+    compact the log in the background once it passes COMPACT_BYTES.
+    """
+    log_path = path + LOG_SUFFIX
+    base = _snapshot_hash(path)
+    if not _log_matches(log_path, base):
+        # No log yet, or one left over from an older snapshot
+        _write_atomic(log_path, json.dumps({'base': base}).encode('utf-8') + b'\n')
+    with open(log_path, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(end - 1)
+        if f.read(1) != b'\n':
+            # A torn line from a crashed append: cut back to the last full line
+            f.seek(0)
+            end = f.read().rfind(b'\n') + 1
+            f.truncate(end)
+        f.seek(end)
+        f.write(json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    if apply is not None and size >= COMPACT_BYTES:
+        _schedule_compaction(path, apply)
+    return state(path)
+
+def _log_matches(log_path, base):
+    try:
+        with open(log_path, 'rb') as f:
+            return json.loads(f.readline()).get('base') == base
+    except (OSError, ValueError):
+        return False
+
+def replace(path, data):
+    """Makes data the whole collection: a new snapshot and no log. Caller holds lock(path).
+
+    Returns the new state.
+    """
+    raw = json.dumps(data, indent=4).encode('utf-8')
+    digest = _hash(raw)
+    if _stat(path) is None or _snapshot_hash(path) != digest:
+        _write_atomic(path, raw)
+        _snapshot_hashes[path] = (_stat(path), digest)
+    # A new snapshot already makes the old log stale. If the bytes didn't
+    # change, the log still matches and removing it is what drops its entries.
+    try:
+        os.remove(path + LOG_SUFFIX)
+        _fsync_dir(path)
+    except FileNotFoundError:
+        pass
+    return state(path)
+
+def compact(path, apply):
+    """Folds the log into the snapshot. Returns False if there was nothing to fold."""
+    with lock(path):
+        if _stat(path + LOG_SUFFIX) is None:
+            return False
+        data, _ = read(path, apply, locked=True)
+        replace(path, data)
+        return True
+
+def _schedule_compaction(path, apply):
+    global _compactor
+    with _compact_cond:
+        _compact_queue[path] = apply
+        if _compactor is None:
+            _compactor = threading.Thread(target=_compact_loop, name='journal-compactor', daemon=True)
+            _compactor.start()
+        _compact_cond.notify()
+
+def _compact_loop():
+    while True:
+        with _compact_cond:
+            while not _compact_queue:
+                _compact_cond.wait()
+            path, apply = _compact_queue.popitem()
+        try:
+            # Another process may have compacted it while this was queued
+            log = _stat(path + LOG_SUFFIX)
+            if log is not None and log[1] >= COMPACT_BYTES:
+                compact(path, apply)
+        except Exception as e:
+            print(f"Journal compaction error for {path}: {e}")
@@ -0,0 +1,34 @@
+import utils
+
+# Collections whose records are looked up by id (see utils.get_record).
+# Existing arrays keep their layout; this only builds the `_ids/<collection>`
+# index that maps each record id to its array slot / child key, and backfills
+# the `sort_key` field paged listings order by (see utils.load_page).
+COLLECTIONS = [
+    'news.json',
+    'faculty.json',
+    'departments.json',
+    'gallery.json',
+    'placements.json',
+    'facilities.json',
+    'activities.json',
+    'leadership.json',
+    'announcements.json',
+    'academics.json',
+    'governance.json',
+]
+
+if __name__ == '__main__':
+    if not utils.firebase_enabled():
+        print("Error: Firebase is not configured, nothing to migrate.")
+        exit(1)
+
+    for filename in COLLECTIONS:
+        try:
+            utils.rebuild_id_index(filename)
+            sorted_count = utils.rebuild_sort_keys(filename)
+            print(f"Indexed {filename}" + (f" ({sorted_count} sort keys)" if sorted_count else ""))
+        except Exception as e:
+            print(f"!!! Failed to index {filename}: {e}")
+
+    print("\nId index migration complete.")
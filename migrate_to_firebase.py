@@ -1,140 +1,278 @@
-import os
+"""Migrates data/*.json to Firebase RTDB, uploading referenced images to Storage.
+
+    python migrate_to_firebase.py                # migrate, resuming a previous run
+    python migrate_to_firebase.py --workers 16   # more parallel uploads
+    python migrate_to_firebase.py --restart      # ignore the checkpoint
+
+Images are hashed (SHA-256) first so identical files are uploaded once, then
+uploaded on a bounded thread pool. Blobs are named after the hash, like the
+admin uploads in app.py, so changed content never reuses a stale blob.
+Finished uploads and collections are recorded in a checkpoint file, so an
+interrupted run picks up where it stopped instead of starting from zero.
+"""
+import argparse
+import hashlib
 import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import firebase_admin
 from firebase_admin import credentials, db, storage
 import utils
 
-# Firebase Initialization
 SERVICE_ACCOUNT_PATH = 'serviceAccountKey.json'
-if not os.path.exists(SERVICE_ACCOUNT_PATH):
-    print("Error: serviceAccountKey.json not found!")
-    exit(1)
-
-cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': f'https://{cred.project_id}-default-rtdb.firebaseio.com/',
-        'storageBucket': f'{cred.project_id}.appspot.com'
-    })
-
-bucket = storage.bucket()
-
-def upload_image(local_path, folder_name):
-    """Uploads a local image to Firebase Storage and returns its public URL."""
-    if not os.path.exists(local_path):
-        return None
-    
-    # Create a unique blob name
-    filename = os.path.basename(local_path)
-    blob_name = f"static/images/{folder_name}/{filename}"
+CHECKPOINT_PATH = 'migration_checkpoint.json'
+CHECKPOINT_INTERVAL = 1.0  # seconds between checkpoint writes while uploading
+CONTENT_NAME_LENGTH = 32  # hex digits of the SHA-256 in a blob name, as in app.py
+
+# (data file, image folder, image fields)
+MIGRATIONS = [
+    ('news.json', 'news', ['image']),
+    ('faculty.json', 'faculty', ['image']),
+    ('departments.json', 'departments', ['hod.image', 'labs[].image']),
+    ('gallery.json', 'gallery', ['image']),
+    ('placements.json', 'placements', ['image']), # Stories handled specially in collect_refs
+    ('facilities.json', 'facilities', ['image']),
+    ('activities.json', 'activities', ['image']),
+    ('leadership.json', 'leadership', ['image']),
+    ('announcements.json', 'none', []), # No images
+    ('academics.json', 'none', []), # No images
+    ('library.json', 'none', []), # No images
+    ('governance.json', 'none', []), # No images
+]
+
+bucket = None
+
+def init_firebase():
+    global bucket
+    if not os.path.exists(SERVICE_ACCOUNT_PATH):
+        print("Error: serviceAccountKey.json not found!")
+        sys.exit(1)
+
+    cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': f'https://{cred.project_id}-default-rtdb.firebaseio.com/',
+            'storageBucket': f'{cred.project_id}.appspot.com'
+        })
+    bucket = storage.bucket()
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def content_blob_name(local_path, digest):
+    """static/images/<folder>/<sha256 prefix>.<ext>: the blob for this exact content."""
+    folder = os.path.dirname(local_path).replace(os.sep, '/')
+    ext = os.path.splitext(local_path)[1].lower()
+    return f"{folder}/{digest[:CONTENT_NAME_LENGTH]}{ext}"
+
+def upload_image(local_path, blob_name):
+    """Uploads a local image to Firebase Storage. Returns (public URL, bytes sent).
+
+    blob_name is derived from the content hash, so a blob that is already in
+    the bucket (e.g. from an earlier run that died before its checkpoint was
+    written) holds the same bytes and is only made public, not re-uploaded.
+    """
     blob = bucket.blob(blob_name)
-    
-    # Upload
+    if blob.exists():
+        blob.make_public()
+        return blob.public_url, 0
+
     with open(local_path, 'rb') as f:
         blob.upload_from_file(f)
-    
-    # Make public
     blob.make_public()
-    return blob.public_url
+    return blob.public_url, os.path.getsize(local_path)
 
-def migrate_json_file(filename, folder_name, image_fields):
+def collect_refs(item, folder_name, image_fields):
     """
-    Migrates a JSON file to Firebase RTDB, uploading images along the way.
-    image_fields: list of paths to image fields in the object (e.g., ['image', 'hod.image', 'labs[].image'])
+    Returns (container, key, local_path, folder) for each local image a record references.
+    image_fields: list of paths to image fields in the object
+    (e.g., ['image', 'hod.image', 'labs[].image'])
     """
-    print(f"Migrating {filename}...")
-    local_data_path = os.path.join('data', filename)
-    if not os.path.exists(local_data_path):
-        print(f"  Skipping {filename}: Local file not found.")
-        return
-
-    with open(local_data_path, 'r') as f:
-        data = json.load(f)
-
-    # Helper to recursively update image fields
-    def process_item(item):
-        if not isinstance(item, dict):
-            return item
-        
-        # News/Faculty standard 'image' field
-        for field in image_fields:
-            if '[' in field: # Array of objects (like labs[].image)
-                base, subfield = field.split('[].')
-                if base in item and isinstance(item[base], list):
-                    for subitem in item[base]:
-                        if subfield in subitem:
-                            img_val = subitem[subfield]
-                            if img_val and not img_val.startswith('http'):
-                                local_img = os.path.join('static/images', base if base != 'labs' else 'labs', img_val)
-                                new_url = upload_image(local_img, base if base != 'labs' else 'labs')
-                                if new_url:
-                                    subitem[subfield] = new_url
-            
-            elif '.' in field: # Nested object (like hod.image)
-                parts = field.split('.')
-                curr = item
-                for part in parts[:-1]:
-                    if part in curr:
-                        curr = curr[part]
-                last = parts[-1]
-                if last in curr:
-                    img_val = curr[last]
-                    if img_val and not img_val.startswith('http'):
-                        # Determine folder name based on context
-                        local_img = os.path.join('static/images', folder_name, img_val)
-                        new_url = upload_image(local_img, folder_name)
-                        if new_url:
-                            curr[last] = new_url
-            else: # Standard field (like 'image')
-                if field in item:
-                    img_val = item[field]
-                    if img_val and not img_val.startswith('http'):
-                        local_img = os.path.join('static/images', folder_name, img_val)
-                        new_url = upload_image(local_img, folder_name)
-                        if new_url:
-                            item[field] = new_url
-        return item
-
-    if isinstance(data, list):
-        for item in data:
-            process_item(item)
-    elif isinstance(data, dict):
-        if 'stories' in data: # Special case for placements.json
-            for story in data['stories']:
-                process_item(story)
+    refs = []
+    if not isinstance(item, dict):
+        return refs
+
+    def add(container, key, folder):
+        img_val = container.get(key)
+        if img_val and not img_val.startswith('http'):
+            refs.append((container, key, os.path.join('static/images', folder, img_val), folder))
+
+    for field in image_fields:
+        if '[' in field: # Array of objects (like labs[].image)
+            base, subfield = field.split('[].')
+            if base in item and isinstance(item[base], list):
+                for subitem in item[base]:
+                    if isinstance(subitem, dict):
+                        add(subitem, subfield, base)
+
+        elif '.' in field: # Nested object (like hod.image)
+            parts = field.split('.')
+            curr = item
+            for part in parts[:-1]:
+                if isinstance(curr.get(part), dict):
+                    curr = curr[part]
+            add(curr, parts[-1], folder_name)
+
+        else: # Standard field (like 'image')
+            add(item, field, folder_name)
+    return refs
+
+def load_checkpoint(restart):
+    if not restart and os.path.exists(CHECKPOINT_PATH):
+        with open(CHECKPOINT_PATH) as f:
+            checkpoint = json.load(f)
+        checkpoint.setdefault('uploaded', {})
+        checkpoint.setdefault('collections', [])
+        return checkpoint
+    return {'uploaded': {}, 'collections': []}
+
+def save_checkpoint(checkpoint):
+    tmp_path = CHECKPOINT_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=4)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+def load_collections(checkpoint):
+    """Returns [(filename, data, refs)] for the collections still to migrate."""
+    pending = []
+    for filename, folder_name, image_fields in MIGRATIONS:
+        if filename in checkpoint['collections']:
+            print(f"  {filename}: already migrated, skipping")
+            continue
+        # Snapshot plus any journaled writes not yet compacted into it
+        data = utils.load_local(filename)
+        if data is None:
+            print(f"  Skipping {filename}: Local file not found.")
+            continue
+
+        if isinstance(data, list):
+            items = data
+        elif isinstance(data, dict) and 'stories' in data: # Special case for placements.json
+            items = data['stories']
         else:
-            process_item(data)
+            items = [data]
+        refs = [ref for item in items for ref in collect_refs(item, folder_name, image_fields)]
+        pending.append((filename, data, refs))
+    return pending
 
-    # Save to Firebase
-    key = filename.replace('.json', '')
-    ref = db.reference(key)
-    ref.set(data)
-    print(f"  Successfully migrated {filename} to Firebase.")
+def upload_all(paths, checkpoint, workers, stats):
+    """Hashes and uploads distinct local images. Returns {local_path: public URL}."""
+    existing = [p for p in paths if os.path.exists(p)]
+    for p in sorted(set(paths) - set(existing)):
+        print(f"  Missing image, left as is: {p}")
 
-if __name__ == '__main__':
-    # Define migration map
-    migrations = [
-        ('news.json', 'news', ['image']),
-        ('faculty.json', 'faculty', ['image']),
-        ('departments.json', 'departments', ['hod.image', 'labs[].image']),
-        ('gallery.json', 'gallery', ['image']),
-        ('placements.json', 'placements', ['image']), # Stories handled specially in function
-        ('facilities.json', 'facilities', ['image']),
-        ('activities.json', 'activities', ['image']),
-        ('leadership.json', 'leadership', ['image']),
-        ('announcements.json', 'none', []), # No images
-        ('academics.json', 'none', []), # No images
-        ('library.json', 'none', []), # No images
-        ('governance.json', 'none', []), # No images
-    ]
-
-    for filename, folder, img_fields in migrations:
-        print(f"\n--- Starting Migration for {filename} ---")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashes = dict(zip(existing, pool.map(sha256_file, existing)))
+
+        # One upload per distinct content
+        todo = {}
+        for path, digest in hashes.items():
+            if digest in checkpoint['uploaded']:
+                stats['resumed'] += 1
+            elif digest in todo:
+                stats['deduplicated'] += 1
+            else:
+                todo[digest] = path
+
+        print(f"  {len(hashes)} images, {len(todo)} to upload with {workers} workers")
+        lock = threading.Lock()
+        last_save = time.monotonic()
+        futures = {
+            pool.submit(upload_image, path, content_blob_name(path, digest)): digest
+            for digest, path in todo.items()
+        }
         try:
-            migrate_json_file(filename, folder, img_fields)
+            for future in as_completed(futures):
+                digest = futures[future]
+                try:
+                    url, sent = future.result()
+                except Exception as e:
+                    stats['failed'] += 1
+                    print(f"  !!! Upload failed for {todo[digest]}: {e}")
+                    continue
+                with lock:
+                    checkpoint['uploaded'][digest] = url
+                    stats['uploaded' if sent else 'existing'] += 1
+                    stats['bytes'] += sent
+                    if time.monotonic() - last_save >= CHECKPOINT_INTERVAL:
+                        save_checkpoint(checkpoint)
+                        last_save = time.monotonic()
+        finally:
+            save_checkpoint(checkpoint)
+
+    return {path: checkpoint['uploaded'][digest]
+            for path, digest in hashes.items() if digest in checkpoint['uploaded']}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8,
+                        help='parallel uploads (default %(default)s)')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore the checkpoint and migrate everything')
+    args = parser.parse_args()
+
+    init_firebase()
+    started = time.perf_counter()
+    checkpoint = load_checkpoint(args.restart)
+    stats = {'uploaded': 0, 'existing': 0, 'resumed': 0, 'deduplicated': 0, 'failed': 0, 'bytes': 0}
+
+    print("--- Collecting images ---")
+    pending = load_collections(checkpoint)
+    all_paths = [ref[2] for _, _, refs in pending for ref in refs]
+
+    print("\n--- Uploading images ---")
+    urls = upload_all(all_paths, checkpoint, max(1, args.workers), stats)
+    upload_time = time.perf_counter() - started
+
+    print("\n--- Writing collections ---")
+    failed_collections = 0
+    for filename, data, refs in pending:
+        complete = True
+        for container, key, local_path, _ in refs:
+            if local_path in urls:
+                container[key] = urls[local_path]
+            elif os.path.exists(local_path):
+                complete = False  # upload failed; retried on the next run
+        try:
+            # Save to Firebase (with the id index used by utils.get_record and
+            # the sort keys used by utils.load_page)
+            key = filename.replace('.json', '')
+            utils.add_sort_keys(key, data)
+            db.reference().update({
+                key: data,
+                f"{utils.ID_INDEX_ROOT}/{key}": utils.build_id_index(data) or None
+            })
         except Exception as e:
-            print(f"!!! Failed to migrate {filename}: {e}")
-            import traceback
-            traceback.print_exc()
+            failed_collections += 1
+            print(f"  !!! Failed to migrate {filename}: {e}")
+            continue
+        if complete:
+            checkpoint['collections'].append(filename)
+            save_checkpoint(checkpoint)
+        note = "" if complete else " (some images failed)"
+        print(f"  Successfully migrated {filename} to Firebase.{note}")
+
+    elapsed = time.perf_counter() - started
+    mb = stats['bytes'] / (1024 * 1024)
+    print(f"\nUploaded {stats['uploaded']} images ({mb:.1f} MB) in {upload_time:.1f}s "
+          f"({mb / upload_time if upload_time else 0:.2f} MB/s, "
+          f"{stats['uploaded'] / upload_time if upload_time else 0:.1f} files/s)")
+    print(f"Skipped: {stats['deduplicated']} duplicates, {stats['resumed']} from checkpoint, "
+          f"{stats['existing']} already in bucket. Failed: {stats['failed']}")
+    print(f"Total time {elapsed:.1f}s")
 
+    if stats['failed'] or failed_collections:
+        print("\nMigration incomplete; run again to retry the failures.")
+        return 1
     print("\nMigration complete! Your data is now live on Firebase.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
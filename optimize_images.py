@@ -0,0 +1,187 @@
+"""Recompresses the images under static/images and writes WebP siblings.
+
+    python optimize_images.py                  # optimize static/images
+    python optimize_images.py static/images/news --max-width 1600
+    python optimize_images.py --dry-run        # report only, change nothing
+
+Originals are only replaced when the re-encoded file is smaller, and keep
+their name and format so existing templates and records stay valid. A
+manifest of content hashes (static/images/.optimize_manifest.json) makes
+re-runs skip files that are already done, so this is safe to run in CI.
+Uploads with content-addressed names are left alone: they are already
+resized and re-encoded on upload, and are cached as immutable.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Pool
+
+import images
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.path.join(BASE_DIR, 'static', 'images')
+MANIFEST_NAME = '.optimize_manifest.json'
+EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Uploads named after their content (<sha256 prefix>[-<width>].<ext>, as in
+# app.py) are served as immutable, so they must never change in place
+CONTENT_NAME = re.compile(r'^[0-9a-f]{32}(-\d+)?\.\w+$')
+
+def sha256_of(data):
+    return hashlib.sha256(data).hexdigest()
+
+def find_images(root):
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if name.lower().endswith(EXTENSIONS) and not CONTENT_NAME.match(name):
+                yield os.path.join(dirpath, name)
+
+def _reencode(img, fmt):
+    buf = io.BytesIO()
+    if fmt == 'JPEG':
+        img.convert('RGB').save(buf, 'JPEG', quality=images.JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        img.save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+def optimize_file(task):
+    """Worker: optimizes one file. Returns a result dict for the report and manifest."""
+    path, max_width, make_webp, dry_run = task
+    from PIL import Image, ImageOps
+
+    with open(path, 'rb') as f:
+        original = f.read()
+    result = {'path': path, 'before': len(original), 'after': len(original), 'webp': 0,
+              'status': 'kept', 'sha256': sha256_of(original)}
+    try:
+        img = Image.open(io.BytesIO(original))
+    except Exception:
+        # Empty or not really an image; recorded so later runs don't retry it
+        result['status'] = 'skipped'
+        return result
+    try:
+        fmt = img.format
+        if getattr(img, 'is_animated', False) or fmt not in ('JPEG', 'PNG'):
+            result['status'] = 'skipped'
+            return result
+        img = ImageOps.exif_transpose(img)
+        if img.width > max_width:
+            img = img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+
+        optimized = _reencode(img, fmt)
+        final = original
+        if len(optimized) < len(original):
+            final = optimized
+            result['after'] = len(optimized)
+            result['status'] = 'optimized'
+            if not dry_run:
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(optimized)
+                os.replace(tmp_path, path)
+        result['sha256'] = sha256_of(final)
+
+        if make_webp:
+            buf = io.BytesIO()
+            webp_img = img if img.mode in ('RGB', 'RGBA') else img.convert('RGBA')
+            webp_img.save(buf, 'WEBP', quality=images.WEBP_QUALITY, method=6)
+            result['webp'] = len(buf.getvalue())
+            if not dry_run:
+                with open(os.path.splitext(path)[0] + '.webp', 'wb') as f:
+                    f.write(buf.getvalue())
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    return result
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def is_done(path, manifest, root, make_webp):
+    entry = manifest.get(os.path.relpath(path, root).replace(os.sep, '/'))
+    if not entry:
+        return False
+    if make_webp and entry.get('webp') and not os.path.exists(os.path.splitext(path)[0] + '.webp'):
+        return False
+    with open(path, 'rb') as f:
+        return sha256_of(f.read()) == entry.get('sha256')
+
+def human(n):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', nargs='?', default=DEFAULT_ROOT, help='folder to walk (default static/images)')
+    parser.add_argument('--max-width', type=int, default=images.VARIANT_WIDTHS[-1] * 2,
+                        help='downscale anything wider than this (default %(default)s px)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--no-webp', action='store_true', help="don't write .webp siblings")
+    parser.add_argument('--dry-run', action='store_true', help='report savings without writing anything')
+    parser.add_argument('--force', action='store_true', help='ignore the manifest and reprocess everything')
+    args = parser.parse_args()
+
+    if not images.available():
+        print("Error: Pillow is not installed (pip install -r requirements.txt).")
+        return 1
+
+    root = os.path.abspath(args.root)
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    manifest = {} if args.force else load_manifest(manifest_path)
+    make_webp = not args.no_webp
+
+    paths = list(find_images(root))
+    todo = [p for p in paths if args.force or not is_done(p, manifest, root, make_webp)]
+    print(f"{len(paths)} images under {os.path.relpath(root, BASE_DIR)}, "
+          f"{len(paths) - len(todo)} already optimized, {len(todo)} to process")
+    if not todo:
+        return 0
+
+    started = time.perf_counter()
+    tasks = [(p, args.max_width, make_webp, args.dry_run) for p in todo]
+    totals = {'before': 0, 'after': 0, 'webp': 0}
+    errors = 0
+    with Pool(processes=max(1, args.workers)) as pool:
+        for result in pool.imap_unordered(optimize_file, tasks):
+            rel = os.path.relpath(result['path'], root).replace(os.sep, '/')
+            if result['status'] == 'error':
+                errors += 1
+                print(f"  ERROR    {rel}: {result['error']}")
+                continue
+            for k in totals:
+                totals[k] += result[k]
+            saved = result['before'] - result['after']
+            webp = f", webp {human(result['webp'])}" if result['webp'] else ""
+            print(f"  {result['status']:<9} {rel}: {human(result['before'])} -> {human(result['after'])}"
+                  f" (-{human(saved)}){webp}")
+            if not args.dry_run:
+                manifest[rel] = {'sha256': result['sha256'], 'bytes': result['after'], 'webp': bool(result['webp'])}
+
+    if not args.dry_run:
+        with open(manifest_path, 'w') as f:
+            json.dump(dict(sorted(manifest.items())), f, indent=4)
+
+    elapsed = time.perf_counter() - started
+    saved = totals['before'] - totals['after']
+    pct = saved / totals['before'] * 100 if totals['before'] else 0
+    print(f"\nBefore: {human(totals['before'])}  After: {human(totals['after'])}  "
+          f"Saved: {human(saved)} ({pct:.0f}%)")
+    if make_webp:
+        print(f"WebP siblings: {human(totals['webp'])}")
+    print(f"{len(todo) - errors} files in {elapsed:.1f}s with {args.workers} workers"
+          + (" (dry run, nothing written)" if args.dry_run else ""))
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""On-demand request profiles for admins.
+
+A logged-in admin adds ?_profile=1 to a URL (or sends an X-Profile: 1
+header) and app.py runs that one request under cProfile. The profile covers
+the route, its utils reads and writes, and the template rendering. It is
+saved in PROFILE_DIR as a .pstats file, which `python -m pstats` or
+snakeviz can open, together with a small JSON description. The newest
+PROFILE_KEEP profiles are listed on the admin dashboard.
+
+cProfile follows only the request's own thread; time spent waiting on
+load_many's pool shows up as waiting in the request.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'site-profiles')
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))
+
+_NAME = re.compile(r'^\d{13}-[0-9a-f]{6}-[\w.-]+$')  # <unix ms>-<random>-<endpoint>
+
+def start():
+    """Returns a running profiler, or None if another profiler is already active."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+def save(profiler, info):
+    """Stops profiler and stores its stats with info (endpoint, path, status...). Returns the profile name."""
+    profiler.disable()
+    endpoint = re.sub(r'[^\w.-]', '_', info.get('endpoint') or 'unmatched')
+    name = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}-{endpoint}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name + '.pstats'))
+    with open(os.path.join(PROFILE_DIR, name + '.json'), 'w') as f:
+        json.dump(dict(info, name=name, recorded=time.strftime('%Y-%m-%d %H:%M:%S')), f)
+    _prune()
+    return name
+
+def _names():
+    """Stored profile names, oldest first."""
+    try:
+        files = os.listdir(PROFILE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(n[:-len('.json')] for n in files if n.endswith('.json') and _NAME.match(n[:-len('.json')]))
+
+def _prune():
+    for name in _names()[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+        for ext in ('.json', '.pstats'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + ext))
+            except OSError:
+                pass
+
+def recent():
+    """Returns the descriptions of the stored profiles, newest first."""
+    found = []
+    for name in reversed(_names()):
+        try:
+            with open(os.path.join(PROFILE_DIR, name + '.json')) as f:
+                found.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return found
+
+def path(name):
+    """Returns the .pstats file of a stored profile, or None if there is no such profile."""
+    if not _NAME.match(name):
+        return None
+    stats_path = os.path.join(PROFILE_DIR, name + '.pstats')
+    return stats_path if os.path.exists(stats_path) else None
+
+def summary(name, limit=40):
+    """Returns the profile's top functions by cumulative time as pstats prints them, or None."""
+    stats_path = path(name)
+    if stats_path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(stats_path, stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
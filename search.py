@@ -0,0 +1,240 @@
+"""Site-wide search.
+
+An in-process inverted index over the searchable text of a few collections
+(term -> {document: weighted term count}), ranked with BM25. Each source is
+synced when its collection version differs from the one it was indexed at.
+A record-level write in this process (append_record, update_record,
+delete_record) reports the record it touched, so the next search re-indexes
+just that record without loading the collection. Any other change (save_json,
+or a write by another instance) re-reads the collection. Records are then
+compared by a fingerprint of their raw JSON, and only records that were
+added, changed or removed are tokenized again.
+"""
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import re
+import threading
+from collections import Counter
+
+import utils
+
+# kind -> (data file, record list path, {field: weight}, title field, snippet field)
+# Field paths follow migrate_to_firebase.py: 'hod.name' for a nested object,
+# 'labs[].name' for a list of objects.
+SOURCES = {
+    'faculty': ('faculty.json', None,
+                {'name': 4, 'specialization': 2, 'qualification': 2, 'designation': 1, 'department': 1},
+                'name', 'specialization'),
+    'news': ('news.json', None, {'title': 3, 'description': 1}, 'title', 'description'),
+    'activities': ('activities.json', None,
+                   {'title': 3, 'category': 2, 'description': 1}, 'title', 'description'),
+    'departments': ('departments.json', None,
+                    {'name': 4, 'tagline': 2, 'hod.name': 2, 'labs[].name': 1, 'description': 1},
+                    'name', 'tagline'),
+    'notices': ('academics.json', 'notices', {'title': 3, 'content': 1}, 'title', 'content'),
+}
+MAX_RESULTS = 50
+SNIPPET_LENGTH = 160
+MAX_PREFIX_TERMS = 50  # completions considered for the last, partly typed query word
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from in is it of on or the to with'.split())
+_TOKEN = re.compile(r'[a-z0-9]+')
+_TAG = re.compile(r'<[^>]+>')
+
+_postings = {}  # term -> {doc: weighted count}
+_terms = []  # every indexed term, sorted, for prefix lookups
+_docs = {}  # doc -> {'fingerprint', 'counts', 'result'}; doc is (kind, record id)
+_lengths = {}  # doc -> total weighted term count
+_source_docs = {kind: set() for kind in SOURCES}
+_source_versions = {}  # kind -> collection version it was indexed at
+_pending = {}  # kind -> (indexed version, version after the writes, ids written since)
+_total_length = 0
+_lock = threading.RLock()  # loading a collection inside a sync re-enters via on_change
+_pending_lock = threading.Lock()  # writers only take this one, never wait for a sync
+
+def tokenize(text):
+    """Lower-cased words of text, without stopwords and HTML tags."""
+    words = _TOKEN.findall(_TAG.sub(' ', str(text)).lower())
+    return [w for w in words if w not in _STOPWORDS]
+
+def _field_values(record, field):
+    if '[' in field:
+        base, subfield = field.split('[].')
+        items = record.get(base)
+        return [i.get(subfield) for i in items if isinstance(i, dict)] if isinstance(items, list) else []
+    value = record
+    for part in field.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return [value]
+
+def _fingerprint(record):
+    raw = json.dumps(record, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+def _document(kind, record):
+    """Returns (weighted term counts, result dict) for a record."""
+    _, _, fields, title_field, snippet_field = SOURCES[kind]
+    counts = Counter()
+    for field, weight in fields.items():
+        for value in _field_values(record, field):
+            if value:
+                for term in tokenize(value):
+                    counts[term] += weight
+    snippet = ' '.join(_TAG.sub(' ', str(record.get(snippet_field) or '')).split())
+    if len(snippet) > SNIPPET_LENGTH:
+        snippet = snippet[:SNIPPET_LENGTH].rsplit(' ', 1)[0] + '...'
+    result = {
+        'kind': kind,
+        'id': record.get('id'),
+        'title': record.get(title_field) or '',
+        'snippet': snippet,
+        'date': record.get('date'),
+    }
+    return counts, result
+
+def _remove_doc(doc):
+    global _total_length
+    entry = _docs.pop(doc)
+    _total_length -= _lengths.pop(doc)
+    for term in entry['counts']:
+        postings = _postings[term]
+        del postings[doc]
+        if not postings:
+            del _postings[term]
+            del _terms[bisect.bisect_left(_terms, term)]
+
+def _add_doc(doc, fingerprint, counts, result):
+    global _total_length
+    _docs[doc] = {'fingerprint': fingerprint, 'counts': counts, 'result': result}
+    _lengths[doc] = sum(counts.values())
+    _total_length += _lengths[doc]
+    for term, count in counts.items():
+        postings = _postings.get(term)
+        if postings is None:
+            postings = _postings[term] = {}
+            bisect.insort(_terms, term)
+        postings[doc] = count
+
+def _index_record(kind, doc, record):
+    """(Re-)indexes one record unless its fingerprint is unchanged. Caller holds _lock."""
+    fingerprint = _fingerprint(record)
+    old = _docs.get(doc)
+    if old is not None:
+        if old['fingerprint'] == fingerprint:
+            return
+        _remove_doc(doc)
+    _add_doc(doc, fingerprint, *_document(kind, record))
+    _source_docs[kind].add(doc)
+
+def _sync_records(kind, record_ids):
+    """Re-indexes the records a write touched, fetched one by one. Caller holds _lock."""
+    filename, path, _, _, _ = SOURCES[kind]
+    for record_id in record_ids:
+        doc = (kind, record_id)
+        record = utils.get_record(filename, record_id, path)
+        if isinstance(record, dict):
+            _index_record(kind, doc, record)
+        elif doc in _docs:
+            _remove_doc(doc)
+            _source_docs[kind].discard(doc)
+
+def _sync_source(kind):
+    """Brings one source up to date with its collection. Caller holds _lock."""
+    filename, path, _, _, _ = SOURCES[kind]
+    version = utils.collection_version(filename)
+    with _pending_lock:
+        pending = _pending.pop(kind, None)
+    if version is not None and _source_versions.get(kind) == version:
+        return
+    if pending and version is not None and pending[:2] == (_source_versions.get(kind), version):
+        # Only these records changed since the last sync
+        _sync_records(kind, pending[2])
+        _source_versions[kind] = version
+        return
+    data = utils.load_json(filename)
+    records = data.get(path) if path and isinstance(data, dict) else data
+    seen = set()
+    for position, record in enumerate(records if isinstance(records, list) else []):
+        if not isinstance(record, dict):
+            continue
+        doc = (kind, record.get('id') or f'#{position}')
+        if doc in seen:
+            continue
+        seen.add(doc)
+        _index_record(kind, doc, record)
+    for doc in _source_docs[kind] - seen:
+        _remove_doc(doc)
+    _source_docs[kind] = seen
+    _source_versions[kind] = version
+
+@utils.on_record_change
+def _record_changed(key, path, record_id, before, after):
+    # Remember the record for the next sync, as long as the writes since the
+    # last sync form an unbroken chain of versions; otherwise it re-reads all
+    for kind, (filename, source_path, _, _, _) in SOURCES.items():
+        if filename.replace('.json', '') != key or source_path != path:
+            continue
+        with _pending_lock:
+            base, expected, ids = _pending.get(kind) or (_source_versions.get(kind), None, frozenset())
+            if before is None or after is None or before != (expected or base):
+                _pending.pop(kind, None)
+            else:
+                _pending[kind] = (base, after, ids | {record_id})
+
+def _expand(word, last):
+    """Index terms a query word matches: itself, plus completions if it is the last word."""
+    if not last:
+        return [word] if word in _postings else []
+    start = bisect.bisect_left(_terms, word)
+    end = bisect.bisect_right(_terms, word + '\uffff', lo=start)
+    return _terms[start:min(end, start + MAX_PREFIX_TERMS)]
+
+def search(query, kinds=None, limit=MAX_RESULTS):
+    """Returns ranked result dicts (kind, id, title, snippet, date, score) for a query.
+
+    Every query word is matched as a whole word, except the last, which also
+    matches words it is a prefix of (so "comp" finds "computer"). Documents
+    matching more of the query words rank first, then by BM25 score.
+    """
+    words = list(dict.fromkeys(tokenize(query)))
+    if not words:
+        return []
+    kinds = [k for k in (kinds or SOURCES) if k in SOURCES]
+
+    with _lock:
+        for kind in kinds:
+            try:
+                _sync_source(kind)
+            except Exception as e:
+                print(f"Search index error for {kind}: {e}")
+        n_docs = len(_docs) or 1
+        avg_length = (_total_length / n_docs) or 1
+        everything = set(kinds) == set(SOURCES)
+        matched = {}
+        scores = {}
+        for i, word in enumerate(words):
+            hits = set()
+            for term in _expand(word, i == len(words) - 1):
+                postings = _postings[term]
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, count in postings.items():
+                    if not everything and doc[0] not in kinds:
+                        continue
+                    norm = K1 * (1 - B + B * _lengths[doc] / avg_length)
+                    scores[doc] = scores.get(doc, 0) + idf * count * (K1 + 1) / (count + norm)
+                    hits.add(doc)
+            for doc in hits:
+                matched[doc] = matched.get(doc, 0) + 1
+        ranked = heapq.nsmallest(limit, scores, key=lambda doc: (-matched[doc], -scores[doc], doc))
+        return [dict(_docs[doc]['result'], score=round(scores[doc], 3)) for doc in ranked]
+
+def stats():
+    with _lock:
+        return {'documents': len(_docs), 'terms': len(_postings)}
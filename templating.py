@@ -0,0 +1,127 @@
+"""Jinja set-up shared by the app and the template build step.
+
+Compiled templates are kept as bytecode in TEMPLATE_CACHE_DIR.
+precompile_templates.py fills it at build time so it ships with the deploy,
+and a cold start loads each template's bytecode instead of parsing and
+compiling the source on its first render.
+
+FragmentCache adds a {% cache %} tag. It renders a shared block once and
+reuses the HTML until the process ends (a new deploy) or a collection it
+depends on changes:
+
+    {% cache "nav" %}...{% endcache %}
+    {% cache "sidebar", request.endpoint %}...{% endcache %}
+    {% cache "footer" depends "departments.json" %}...{% endcache %}
+
+The name, any extra key values and the depends versions make up the key,
+so the block may only use values that are part of its key.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+import metrics
+import utils
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR') or os.path.join(BASE_DIR, '.template_cache')
+
+class BytecodeCache(FileSystemBytecodeCache):
+    """Bytecode cache keyed by template name, for a cache built on another machine.
+
+    Jinja keys entries by the template's absolute path, which differs between
+    the build and the deployed function. Jinja also checks each entry against
+    the template's checksum, so a stale entry is recompiled instead of used.
+    Writes are best effort. On a read-only deploy, templates that were not
+    precompiled are still compiled in memory.
+    """
+    def __init__(self, directory=TEMPLATE_CACHE_DIR):
+        super().__init__(directory, '%s.cache')
+
+    def get_cache_key(self, name, filename=None):
+        return hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+    def dump_bytecode(self, bucket):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+# Fragment Cache
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 256))
+
+FRAGMENT_REQUESTS = metrics.counter(
+    'site_fragment_cache_requests_total', 'Template fragment cache lookups, by fragment.', ('fragment', 'result'))
+
+_fragments = OrderedDict()  # (template, name, key values, versions) -> rendered HTML
+_fragment_deps = {}  # collection key -> set of fragment keys
+_fragments_lock = threading.Lock()
+
+def _forget_fragment(key):
+    if _fragments.pop(key, None) is not None:
+        for collection, _ in key[3]:
+            _fragment_deps.get(collection, set()).discard(key)
+
+@utils.on_change
+def _drop_dependent_fragments(key, version):
+    with _fragments_lock:
+        for fragment_key in list(_fragment_deps.pop(key, ())):
+            _forget_fragment(fragment_key)
+
+def invalidate_fragments(name=None):
+    """Drops every cached copy of the named fragment, or all fragments if no name is given."""
+    with _fragments_lock:
+        for key in [k for k in _fragments if name is None or k[1] == name]:
+            _forget_fragment(key)
+
+def fragment_count():
+    with _fragments_lock:
+        return len(_fragments)
+
+class FragmentCache(Extension):
+    """The {% cache name[, key...] [depends collection, ...] %} tag (see the module docstring)."""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        values = []
+        while parser.stream.skip_if('comma'):
+            values.append(parser.parse_expression())
+        depends = []
+        if parser.stream.skip_if('name:depends'):
+            depends.append(parser.parse_expression())
+            while parser.stream.skip_if('comma'):
+                depends.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        args = [nodes.Const(parser.name), name, nodes.List(values), nodes.List(depends)]
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, template, name, values, depends, caller):
+        # While templates reload on edit, a cached fragment would hide the edit
+        if FRAGMENT_CACHE_MAX_ENTRIES <= 0 or self.environment.auto_reload:
+            return caller()
+        versions = tuple((c.replace('.json', ''), utils.collection_version(c)) for c in depends)
+        key = (template, name, tuple(values), versions)
+        with _fragments_lock:
+            html = _fragments.get(key)
+            if html is not None:
+                _fragments.move_to_end(key)
+        if html is not None:
+            FRAGMENT_REQUESTS.inc(name, 'hit')
+            return html
+        FRAGMENT_REQUESTS.inc(name, 'miss')
+        html = caller()
+        with _fragments_lock:
+            _forget_fragment(key)
+            _fragments[key] = html
+            for collection, _ in versions:
+                _fragment_deps.setdefault(collection, set()).add(key)
+            while len(_fragments) > FRAGMENT_CACHE_MAX_ENTRIES:
+                _forget_fragment(next(iter(_fragments)))
+        return html
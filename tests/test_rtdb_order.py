@@ -0,0 +1,55 @@
+"""utils against the Firebase stand-in: results must follow RTDB key order.
+
+firebase_admin orders query results by comparing keys as strings, so a
+legacy list (child keys "0".."11") that later gets push-keyed appends comes
+back with "10" and "11" before "2". These tests run the real SDK against
+benchmarks/firebase_standin.py.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import firebase_standin
+
+_server = firebase_standin.start()
+os.environ.update(firebase_standin.environment(_server))
+os.environ['DATA_CACHE_TTL'] = '0'
+
+import pytest
+
+import utils
+
+@pytest.fixture(autouse=True)
+def empty_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # any local fallback stays out of the repo
+    with _server.standin.lock:
+        _server.standin.tree = None
+    yield
+
+def _all_pages(filename, limit):
+    records, cursor = utils.load_page(filename, limit)
+    while cursor:
+        page, cursor = utils.load_page(filename, limit, cursor)
+        records += page
+    return records
+
+def test_key_ordered_pages_mix_integer_and_push_keys():
+    utils.save_json('announcements.json', [{'id': f'a{i}', 'text': str(i)} for i in range(12)])
+    utils.append_record('announcements.json', {'id': 'a12', 'text': '12'})
+    utils.append_record('announcements.json', {'id': 'a13', 'text': '13'})
+
+    for limit in (3, 4, 5):
+        ids = [r['id'] for r in _all_pages('announcements.json', limit)]
+        assert ids == [f'a{i}' for i in range(13, -1, -1)], limit
+
+def test_group_query_keeps_list_order():
+    faculty = [{'id': f'f{i}', 'name': f'F{i}', 'department': 'CSE' if i % 3 else 'ECE'} for i in range(14)]
+    utils.save_json('faculty.json', faculty)
+    utils.append_record('faculty.json', {'id': 'f14', 'name': 'F14', 'department': 'CSE'})
+
+    expected = [r['id'] for r in faculty if r['department'] == 'CSE'] + ['f14']
+    groups = utils.load_groups('faculty.json', 'CSE')
+    assert [r['id'] for r in groups['CSE']] == expected
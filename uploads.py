@@ -0,0 +1,166 @@
+"""Background uploads to Firebase Cloud Storage.
+
+Admin routes stage uploaded files on local disk (the same place the
+no-Firebase fallback keeps them, so the page works right away) and submit
+them here. A small worker pool uploads and publishes each file, then
+patches the record so it points at the public URL instead of the staged
+copy. Job status is kept in memory and can be queried by id.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import utils
+
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 4))
+UPLOAD_RETRIES = int(os.environ.get('UPLOAD_RETRIES', 2))
+MAX_JOBS = 200  # finished jobs kept for status queries, oldest dropped first
+
+_jobs = OrderedDict()  # job_id -> status dict
+_jobs_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='upload')
+        return _pool
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        if job_id in _jobs:
+            _jobs[job_id].update(fields)
+
+def submit(files, target=None):
+    """Queues staged files for upload. Returns the job id.
+
+    files is a list of dicts with 'path' (staged local file), 'blob' (blob
+    name), 'content_type', optional 'cache_control' and 'refs' (the strings
+    records use for the staged copy). target is (filename, record_id, path)
+    of the record to patch once everything is uploaded, or None to only
+    upload.
+    """
+    job_id = uuid.uuid4().hex[:12]
+    with _jobs_lock:
+        _jobs[job_id] = {
+            'id': job_id,
+            'status': 'queued',
+            'files': [f['blob'] for f in files],
+            'record': list(target) if target else None,
+            'urls': {},
+            'error': None,
+            'queued_at': time.time(),
+            'finished_at': None,
+        }
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+    _get_pool().submit(_run, job_id, files, target)
+    return job_id
+
+def status(job_id):
+    """Returns a copy of a job's status dict, or None if unknown."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def recent_jobs(limit=50):
+    """Returns the newest jobs first."""
+    with _jobs_lock:
+        return [dict(job) for job in reversed(list(_jobs.values())[-limit:])]
+
+def pending_count():
+    with _jobs_lock:
+        return sum(1 for job in _jobs.values() if job['status'] in ('queued', 'uploading'))
+
+def publish(bucket, blob_name, upload, cache_control=None):
+    """Uploads a content-addressed blob as a public object. Returns its public URL.
+
+    upload(blob, **options) sends the data, passing options on to the
+    upload_from_* call. That is one request: the object is created public
+    (predefined_acl) and only if it doesn't exist yet (if_generation_match=0).
+    The name is derived from the content, so an existing blob already holds
+    these bytes; it is only made public, in case an older upload never was.
+    """
+    from google.api_core.exceptions import PreconditionFailed
+    blob = bucket.blob(blob_name)
+    if cache_control:
+        blob.cache_control = cache_control
+    try:
+        upload(blob, predefined_acl='publicRead', if_generation_match=0)
+    except PreconditionFailed:
+        blob.make_public()
+    return blob.public_url
+
+def _upload(bucket, f):
+    for attempt in range(UPLOAD_RETRIES + 1):
+        try:
+            return publish(
+                bucket, f['blob'],
+                lambda blob, **options: blob.upload_from_filename(f['path'], content_type=f['content_type'], **options),
+                f.get('cache_control'))
+        except Exception as e:
+            if attempt == UPLOAD_RETRIES:
+                raise
+            print(f"Upload of {f['blob']} failed ({e}), retrying")
+            time.sleep(0.5 * 2 ** attempt)
+
+def _swap(value, replacements):
+    """Replaces references to staged files inside a record value."""
+    if isinstance(value, dict):
+        return {k: _swap(v, replacements) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_swap(v, replacements) for v in value]
+    if isinstance(value, str):
+        if value in replacements:
+            return replacements[value]
+        # srcset strings embed staged URLs among other entries
+        for old, new in replacements.items():
+            if old.startswith('/') and old in value:
+                value = value.replace(old, new)
+    return value
+
+def _patch_record(target, replacements):
+    filename, record_id, path = target
+    record = utils.get_record(filename, record_id, path=path)
+    if not record:
+        return  # deleted while the upload ran
+    fields = {}
+    for key, value in record.items():
+        swapped = _swap(value, replacements)
+        if swapped != value:
+            fields[key] = swapped
+    if fields:
+        utils.update_record(filename, record_id, fields, path=path)
+
+def _run(job_id, files, target):
+    from firebase_admin import storage
+    _update(job_id, status='uploading')
+    try:
+        bucket = storage.bucket()
+        replacements = {}
+        urls = {}
+        for f in files:
+            url = _upload(bucket, f)
+            urls[f['blob']] = url
+            for ref in f['refs']:
+                replacements[ref] = url
+        if target:
+            _patch_record(target, replacements)
+    except Exception as e:
+        print(f"Background upload error: {e}")
+        # The record keeps pointing at the staged copy. Only this instance can
+        # serve it, which is why serverless deploys upload inside the request.
+        _update(job_id, status='failed', error=str(e), finished_at=time.time())
+        return
+
+    for f in files:
+        try:
+            os.remove(f['path'])
+        except OSError:
+            pass
+    _update(job_id, status='done', urls=urls, finished_at=time.time())
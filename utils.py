@@ -1,93 +1,1306 @@
+import bisect
+import copy
+import hashlib
 import json
 import os
-import firebase_admin
-from firebase_admin import credentials, db, storage
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import backends
+import metrics
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Firebase Initialization
+# Deferred to the first data access (see firebase_enabled) so serverless cold
+# starts and routes that never touch data don't pay for importing
+# firebase_admin and building credentials.
 # Use service account file if it exists, otherwise assume environment variables (for Vercel)
 SERVICE_ACCOUNT_PATH = os.path.join(BASE_DIR, 'serviceAccountKey.json')
 
-if not firebase_admin._apps:
-    if os.path.exists(SERVICE_ACCOUNT_PATH):
-        cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
+db = None
+_firebase_ready = None
+_firebase_lock = threading.Lock()
+
+# With FIREBASE_DATABASE_EMULATOR_HOST set (and STORAGE_EMULATOR_HOST for
+# images), the SDKs talk to a local emulator or benchmarks/firebase_standin.py
+# instead, and no credentials are needed.
+EMULATOR_HOST = os.environ.get('FIREBASE_DATABASE_EMULATOR_HOST')
+
+def _emulator_credential(project_id):
+    """A credential that sends no token, for emulators (firebase_admin needs one to start)."""
+    from firebase_admin import credentials
+    from google.auth.credentials import AnonymousCredentials
+
+    class EmulatorCredential(credentials.Base):
+        def get_credential(self):
+            return AnonymousCredentials()
+
+    cred = EmulatorCredential()
+    cred.project_id = project_id
+    return cred
+
+def _init_firebase():
+    global db
+    has_credentials = (EMULATOR_HOST or os.path.exists(SERVICE_ACCOUNT_PATH)
+                       or os.environ.get("FIREBASE_PROJECT_ID"))
+    # An app may already have been initialized by the caller (e.g. migrate_to_firebase.py)
+    if not has_credentials and 'firebase_admin' not in sys.modules:
+        print("Warning: Firebase not initialized. Using local filesystem fallback.")
+        return False
+
+    import firebase_admin
+    from firebase_admin import credentials, db as firebase_db
+
+    if not firebase_admin._apps:
+        try:
+            if EMULATOR_HOST:
+                cred = _emulator_credential(os.environ.get("FIREBASE_PROJECT_ID") or 'demo-site')
+            elif os.path.exists(SERVICE_ACCOUNT_PATH):
+                cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
+            else:
+                # Fallback for Vercel Environment Variables
+                cred_dict = {
+                    "type": "service_account",
+                    "project_id": os.environ.get("FIREBASE_PROJECT_ID"),
+                    "private_key": os.environ.get("FIREBASE_PRIVATE_KEY", "").replace("\\n", "\n"),
+                    "client_email": os.environ.get("FIREBASE_CLIENT_EMAIL"),
+                    "token_uri": "https://oauth2.googleapis.com/token",
+                }
+                # Only try if at least one crucial var is set
+                if cred_dict["project_id"]:
+                    cred = credentials.Certificate(cred_dict)
+                else:
+                    cred = None
+
+            if cred:
+                firebase_admin.initialize_app(cred, {
+                    'databaseURL': f'https://{cred.project_id}-default-rtdb.firebaseio.com/',
+                    'storageBucket': f'{cred.project_id}.appspot.com'
+                })
+        except (ValueError, OSError) as e:
+            print(f"Firebase initialization error: {e}")
+
+    if not firebase_admin._apps:
+        print("Warning: Firebase not initialized. Using local filesystem fallback.")
+        return False
+
+    db = firebase_db
+    return True
+
+def firebase_enabled():
+    """Initializes Firebase on first call (thread-safe); returns True if it is available."""
+    global _firebase_ready
+    if DATA_BACKEND in LOCAL_BACKENDS:
+        return False
+    if _firebase_ready is None:
+        with _firebase_lock:
+            if _firebase_ready is None:
+                _firebase_ready = _init_firebase()
+    return _firebase_ready
+
+# Local storage
+# Without Firebase, collections are kept in a local store (see backends.py).
+# DATA_BACKEND picks it: 'files' for the JSON files in DATA_DIR (also what is
+# used when it is unset and Firebase isn't configured) or 'sqlite' for
+# indexed tables in SQLITE_PATH, imported from DATA_DIR on first use. Either
+# setting keeps Firebase off even where credentials are present.
+LOCAL_BACKENDS = ('files', 'sqlite')
+DATA_BACKEND = os.environ.get('DATA_BACKEND', '').strip().lower()
+DATA_DIR = os.environ.get('DATA_DIR')  # default: data/
+SQLITE_PATH = os.environ.get('SQLITE_PATH')  # default: site.db in DATA_DIR
+
+_local_store = None
+_local_store_lock = threading.Lock()
+
+def local_store():
+    """Returns the store local collections are read from and written to."""
+    global _local_store
+    if _local_store is None:
+        with _local_store_lock:
+            if _local_store is None:
+                folder = DATA_DIR or os.path.join(BASE_DIR, 'data')
+                files = backends.FileStore(folder, _apply_op)
+                if DATA_BACKEND == 'sqlite':
+                    path = SQLITE_PATH or os.path.join(folder, 'site.db')
+                    _local_store = backends.SqliteStore(path, _apply_op, _record_columns, seed=files)
+                else:
+                    _local_store = files
+    return _local_store
+
+def _indexed_store():
+    """The local store if it is in use and answers queries itself (SQLite), else None."""
+    if firebase_enabled():
+        return None
+    store = local_store()
+    return store if store.queries else None
+
+# In-process collection cache
+# Parsed collections are kept in memory so public routes don't pay a Firebase
+# round-trip (or a JSON parse) on every hit. Entries expire after CACHE_TTL
+# seconds so edits made by other instances are eventually picked up.
+CACHE_TTL = float(os.environ.get('DATA_CACHE_TTL', 60))
+CACHE_MAX_ENTRIES = int(os.environ.get('DATA_CACHE_MAX_ENTRIES', 32))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+# Metrics (see metrics.py). backend is 'cache' for a load served from memory,
+# else 'firebase' or 'local' for where the data was read from or written to.
+LOAD_SECONDS = metrics.histogram(
+    'site_data_load_seconds', 'Time to load a collection (load_json and load_many).', ('collection', 'backend'))
+SAVE_SECONDS = metrics.histogram(
+    'site_data_save_seconds', 'Time to save a whole collection (save_json).', ('collection', 'backend'))
+CACHE_REQUESTS = metrics.counter(
+    'site_data_cache_requests_total', 'Collection cache lookups.', ('collection', 'result'))
+CACHE_EVICTIONS = metrics.counter(
+    'site_data_cache_evictions_total', 'Collections dropped from the cache to stay under its size limit.')
+DATA_ERRORS = metrics.counter(
+    'site_data_errors_total', 'Failed collection reads and writes.', ('collection', 'backend', 'operation'))
+
+# Collection versions
+# A version is a hash of the collection's content, so every instance derives
+# the same version for the same data. Local collections hash their store
+# state instead (see backends.py), which every process sharing the store sees
+# alike and which costs neither a pass over the whole collection per write
+# nor loading it to find out. Listeners registered with on_change are
+# told whenever a collection's version changes (or becomes unknown after a
+# write to an uncached collection), which is how rendered pages get dropped.
+# Listeners registered with on_record_change also hear which record a
+# record-level write touched, with the versions before and after it.
+_versions = {}
+_change_listeners = []
+_record_listeners = []
+
+def _content_version(data, source=None):
+    if isinstance(source, tuple):  # store state of a local collection
+        payload = repr(source)
     else:
-        # Fallback for Vercel Environment Variables
-        import json as py_json
-        cred_dict = {
-            "type": "service_account",
-            "project_id": os.environ.get("FIREBASE_PROJECT_ID"),
-            "private_key": os.environ.get("FIREBASE_PRIVATE_KEY", "").replace("\\n", "\n"),
-            "client_email": os.environ.get("FIREBASE_CLIENT_EMAIL"),
-            "token_uri": "https://oauth2.googleapis.com/token",
-        }
-        # Only try if at least one crucial var is set
-        if cred_dict["project_id"]:
-            cred = credentials.Certificate(cred_dict)
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+def on_change(callback):
+    """Registers callback(key, version) to run when a collection changes. Usable as a decorator."""
+    _change_listeners.append(callback)
+    return callback
+
+def on_record_change(callback):
+    """Registers callback(key, path, record_id, before, after) to run after a record-level write.
+
+    before and after are the collection's versions around the write (None
+    when unknown): the write changed only that record if the listener last
+    saw the collection at `before`. Usable as a decorator.
+    """
+    _record_listeners.append(callback)
+    return callback
+
+def _record_changed(key, path, record_id, before, after):
+    for callback in list(_record_listeners):
+        try:
+            callback(key, path, record_id, before, after)
+        except Exception as e:
+            print(f"Record listener error for {key}: {e}")
+
+def _set_version(key, version):
+    with _cache_lock:
+        if _versions.get(key) == version:
+            return
+        if version is None:
+            _versions.pop(key, None)
         else:
-            cred = None
+            _versions[key] = version
+    for callback in list(_change_listeners):
+        try:
+            callback(key, version)
+        except Exception as e:
+            print(f"Change listener error for {key}: {e}")
 
-    if cred:
-        firebase_admin.initialize_app(cred, {
-            'databaseURL': f'https://{cred.project_id}-default-rtdb.firebaseio.com/',
-            'storageBucket': f'{cred.project_id}.appspot.com'
-        })
-    else:
-        print("Warning: Firebase not initialized. Using local filesystem fallback.")
+def collection_version(filename):
+    """Returns the content version of a collection, loading it if needed.
+
+    Local collections are not loaded: their version comes from the store's
+    state, and a cached copy that another process has since written over is
+    dropped on the way.
+    """
+    key = filename.replace('.json', '')
+    if not firebase_enabled():
+        try:
+            source = local_store().state(filename)
+        except OSError as e:
+            print(f"Local state error for {filename}: {e}")
+        else:
+            with _cache_lock:
+                entry = _cache.get(key)
+                if entry is not None and entry[5] != source:
+                    del _cache[key]
+            version = _content_version(None, source)
+            _set_version(key, version)
+            return version
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > time.monotonic() and key in _versions:
+            return _versions[key]
+    load_json(filename)
+    return _versions.get(key)
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            expires_at, data = entry[0], entry[1]
+            if expires_at > time.monotonic():
+                _cache.move_to_end(key)
+                _cache_stats['hits'] += 1
+                CACHE_REQUESTS.inc(key, 'hit')
+                # Hand out a copy so routes can mutate what they get back
+                return True, copy.deepcopy(data)
+            del _cache[key]
+        _cache_stats['misses'] += 1
+        CACHE_REQUESTS.inc(key, 'miss')
+        return False, None
+
+def _cache_put(key, data, source=None):
+    version = _content_version(data, source)
+    _set_version(key, version)
+    _cache_store(key, data, source, version)
+
+def _cache_store(key, data, source=None, version=None):
+    """Caches data without notifying change listeners (see _cache_put)."""
+    if CACHE_TTL <= 0 or CACHE_MAX_ENTRIES <= 0:
+        return
+    with _cache_lock:
+        # [expires_at, data, id index built on first get_record,
+        #  sorted indexes by path built on first load_page,
+        #  grouped views by path built on first load_groups,
+        #  store state of the local collection it was read from,
+        #  content version of data]
+        _cache[key] = [time.monotonic() + CACHE_TTL, copy.deepcopy(data), None, {}, {}, source,
+                       version or _content_version(data, source)]
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+            _cache_stats['evictions'] += 1
+            CACHE_EVICTIONS.inc()
+
+def invalidate_cache(filename=None):
+    """Drops one collection from the cache, or everything if no filename is given."""
+    with _cache_lock:
+        if filename is None:
+            keys = list(_versions)
+            _cache.clear()
+        else:
+            keys = [filename.replace('.json', '')]
+            _cache.pop(keys[0], None)
+    for key in keys:
+        _set_version(key, None)
+
+def cache_stats():
+    """Returns cache hit/miss counters and the current number of entries."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats['entries'] = len(_cache)
+    return stats
 
 def load_json(filename):
     """Loads data from Firebase RTDB if available, otherwise from local JSON."""
     # Use filename without .json as key
     key = filename.replace('.json', '')
-    
-    if firebase_admin._apps:
+
+    started = time.perf_counter()
+    found, data = _cache_get(key)
+    if found:
+        LOAD_SECONDS.observe(time.perf_counter() - started, key, 'cache')
+        return data
+    return _load_and_cache(key, filename)
+
+def _load_and_cache(key, filename):
+    started = time.perf_counter()
+    data, source = _load_uncached(key, filename)
+    if source:
+        _cache_put(key, data, source)
+    LOAD_SECONDS.observe(time.perf_counter() - started, key, 'firebase' if source is True else 'local')
+    return data
+
+# Bulk loading
+# Routes that need several collections fetch the uncached ones concurrently,
+# so the page waits for one RTDB round-trip instead of one per collection.
+LOAD_MANY_WORKERS = int(os.environ.get('LOAD_MANY_WORKERS', 8))
+
+_load_pool = None
+_load_pool_lock = threading.Lock()
+
+def _get_load_pool():
+    global _load_pool
+    with _load_pool_lock:
+        if _load_pool is None:
+            _load_pool = ThreadPoolExecutor(max_workers=LOAD_MANY_WORKERS, thread_name_prefix='load_many')
+        return _load_pool
+
+def load_many(*filenames):
+    """Loads several collections at once and returns them in the order given.
+
+    Cached collections are served directly; the rest are fetched in parallel
+    when Firebase is in use. Each result is the same as load_json would give.
+    """
+    results = {}
+    missing = []
+    for filename in filenames:
+        key = filename.replace('.json', '')
+        started = time.perf_counter()
+        found, data = _cache_get(key)
+        if found:
+            LOAD_SECONDS.observe(time.perf_counter() - started, key, 'cache')
+            results[filename] = data
+        elif filename not in missing:
+            missing.append(filename)
+
+    if len(missing) > 1 and firebase_enabled() and LOAD_MANY_WORKERS > 1:
+        pool = _get_load_pool()
+        futures = {f: pool.submit(_load_and_cache, f.replace('.json', ''), f) for f in missing}
+        for filename, future in futures.items():
+            results[filename] = future.result()
+    else:
+        for filename in missing:
+            results[filename] = _load_and_cache(filename.replace('.json', ''), filename)
+
+    # Duplicate names share one load; give each caller slot its own copy
+    seen = set()
+    ordered = []
+    for filename in filenames:
+        data = results[filename]
+        ordered.append(copy.deepcopy(data) if filename in seen else data)
+        seen.add(filename)
+    return ordered
+
+def _load_uncached(key, filename):
+    """Returns (data, source): True for Firebase, the store state for local
+    collections, or None for failed reads, which are not cached."""
+    if firebase_enabled():
         try:
             ref = db.reference(key)
             data = ref.get()
             if data is not None:
-                return data
+                return _unwrap_records(data), True
         except Exception as e:
             print(f"Firebase read error for {key}: {e}")
+            DATA_ERRORS.inc(key, 'firebase', 'load')
 
     # Fallback to local
-    filepath = os.path.join(BASE_DIR, 'data', filename)
+    data, source = _read_local(filename)
+    if source is None:
+        DATA_ERRORS.inc(key, 'local', 'load')
+    return data, source
+
+def _read_local(filename):
+    """Returns (data, store state) for a local collection, or ([], None) if it can't be read."""
     try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
-        return []
+        return local_store().read(filename)
+    except (ValueError, OSError):
+        return [], None
+
+def load_local(filename):
+    """Reads a collection from the local store, bypassing Firebase and the cache.
+
+    Returns None if it is missing or not valid JSON.
+    """
+    data, source = _read_local(filename)
+    return data if source else None
+
+def _rtdb_key_order(item):
+    # Mirrors RTDB orderByKey: integer keys first (numerically), then strings
+    k = item[0]
+    try:
+        return (0, int(k), '')
+    except ValueError:
+        return (1, 0, k)
+
+def _unwrap_records(data):
+    """Turns RTDB-shaped record nodes back into the lists the app expects.
+
+    Record-level writes leave holes in arrays (deletes) and add push-keyed
+    children (appends), so a collection can come back as a list with None
+    entries or as a dict keyed by child key. Both are flattened into a list
+    in RTDB key order.
+    """
+    if isinstance(data, list):
+        return [item for item in data if item is not None]
+    if isinstance(data, dict):
+        if data and all(isinstance(v, dict) and 'id' in v for v in data.values()):
+            return [v for _, v in sorted(data.items(), key=_rtdb_key_order)]
+        return {k: _unwrap_records(v) for k, v in data.items()}
+    return data
+
+def _write_local(filename, data):
+    """Replaces a local collection. Returns its new store state."""
+    store = local_store()
+    with _local_write_lock, store.lock(filename):
+        return store.replace(filename, data)
 
 def save_json(filename, data):
     """Saves data to Firebase RTDB if available, otherwise to local JSON."""
     key = filename.replace('.json', '')
+    started = time.perf_counter()
+    add_sort_keys(key, data)
     
-    if firebase_admin._apps:
+    if firebase_enabled():
         try:
-            ref = db.reference(key)
-            ref.set(data)
+            # Collection and its id index go out in one multi-path update
+            db.reference().update({key: data, _index_path(key): build_id_index(data) or None})
+            _cache_put(key, data)
+            SAVE_SECONDS.observe(time.perf_counter() - started, key, 'firebase')
             return True
         except Exception as e:
             print(f"Firebase save error for {key}: {e}")
+            DATA_ERRORS.inc(key, 'firebase', 'save')
 
     # Fallback to local
-    filepath = os.path.join(BASE_DIR, 'data', filename)
     try:
-        # Ensure data dir exists
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
+        _cache_put(key, data, _write_local(filename, data))
+        SAVE_SECONDS.observe(time.perf_counter() - started, key, 'local')
         return True
     except OSError as e:
         print(f"Local save error for {filename}: {e}")
+        DATA_ERRORS.inc(key, 'local', 'save')
+        invalidate_cache(filename)
         return False
 
+# Record-level writes
+# These touch a single child node in RTDB instead of re-uploading the whole
+# collection. `path` addresses a list nested inside a collection, e.g.
+# 'stories' in placements.json or 'calendar' in academics.json.
+#
+# Each record list also has an id index at `_ids/<collection>[/<path>]`
+# mapping record ids to RTDB child keys, so one record can be read or written
+# without downloading the whole collection. Data written before the index
+# existed is picked up by migrate_id_index.py.
+ID_INDEX_ROOT = '_ids'
+_PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+_INVALID_KEY_CHARS = set('.$#[]/')
+_local_write_lock = threading.Lock()
+
+def _child_path(key, path):
+    return f"{key}/{path}" if path else key
+
+def _index_path(node):
+    return f"{ID_INDEX_ROOT}/{node}"
+
+def _is_valid_key(value):
+    return isinstance(value, str) and value != '' and not _INVALID_KEY_CHARS.intersection(value)
+
+def _push_key():
+    """Generates a chronologically ordered child key, like RTDB push()."""
+    now = int(time.time() * 1000)
+    stamp = ''
+    for _ in range(8):
+        stamp = _PUSH_CHARS[now % 64] + stamp
+        now //= 64
+    return stamp + ''.join(random.choice(_PUSH_CHARS) for _ in range(12))
+
+def _is_record_map(data):
+    return bool(data) and all(isinstance(v, dict) and 'id' in v for v in data.values())
+
+def build_id_index(data):
+    """Maps record ids to RTDB child keys for every record list in `data`.
+
+    Works on raw RTDB data (sparse arrays or push-keyed maps) as well as the
+    plain lists kept in local JSON files.
+    """
+    if isinstance(data, list):
+        return {item['id']: str(i) for i, item in enumerate(data)
+                if isinstance(item, dict) and _is_valid_key(item.get('id'))}
+    if isinstance(data, dict):
+        if _is_record_map(data):
+            return {v['id']: k for k, v in data.items() if _is_valid_key(v['id'])}
+        index = {}
+        for k, v in data.items():
+            if isinstance(v, (list, dict)):
+                sub_index = build_id_index(v)
+                if sub_index:
+                    index[k] = sub_index
+        return index
+    return {}
+
+def rebuild_id_index(filename):
+    """Rebuilds the RTDB id index of a collection from its current contents."""
+    key = filename.replace('.json', '')
+    raw = db.reference(key).get()
+    index = build_id_index(raw)
+    if index:
+        db.reference(_index_path(key)).set(index)
+    else:
+        db.reference(_index_path(key)).delete()
+    return index
+
+def _resolve_child_key(node, record_id):
+    """Finds the RTDB child key holding `record_id` under `node`."""
+    if _is_valid_key(record_id):
+        child_key = db.reference(_index_path(node)).child(record_id).get()
+        if child_key is not None:
+            return str(child_key)
+    # Not in the index (e.g. not migrated yet): query by id instead
+    try:
+        matches = db.reference(node).order_by_child('id').equal_to(record_id).get()
+    except Exception as e:
+        # Without ".indexOn": ["id"] in the rules RTDB refuses the query
+        print(f"Firebase id query on {node} failed ({e}); scanning it instead")
+        return _scan_child_key(node, record_id)
+    if isinstance(matches, list):
+        # A match at child "0" comes back as an array
+        return next((str(i) for i, m in enumerate(matches) if m is not None), None)
+    if matches:
+        return next(iter(matches))
+    return None
+
+def _scan_child_key(node, record_id):
+    """Finds the child key holding `record_id` by reading the whole node."""
+    raw = db.reference(node).get()
+    if isinstance(raw, list):
+        children = enumerate(raw)
+    elif isinstance(raw, dict):
+        children = raw.items()
+    else:
+        return None
+    return next((str(k) for k, v in children if isinstance(v, dict) and v.get('id') == record_id), None)
+
+def _node(data, path, default):
+    """Returns the container at `path` inside data, creating it if missing."""
+    node = data
+    parts = path.split('/') if path else []
+    for part in parts[:-1]:
+        if not isinstance(node.get(part), dict):
+            node[part] = {}
+        node = node[part]
+    if parts:
+        if not isinstance(node.get(parts[-1]), type(default)):
+            node[parts[-1]] = default
+        node = node[parts[-1]]
+    return node
+
+def _index_records(data, path=None):
+    """Maps (path, id) to record for every record list in a loaded collection."""
+    index = {}
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict) and 'id' in item:
+                index[(path, item['id'])] = item
+    elif isinstance(data, dict):
+        for k, v in data.items():
+            if isinstance(v, (list, dict)):
+                index.update(_index_records(v, _child_path(path, k) if path else k))
+    return index
+
+def _cached_record(key, path, record_id):
+    """Looks a record up in the cached collection. Returns (cached, record)."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return False, None
+        if entry[2] is None:
+            entry[2] = _index_records(entry[1])
+        _cache_stats['hits'] += 1
+        return True, copy.deepcopy(entry[2].get((path, record_id)))
+
+def _cache_apply(key, change, path=None, record_id=None):
+    """Applies an in-place change to a cached collection, if it is cached.
+
+    With a record_id, the change touches that one record and returns it as it
+    is afterwards (None if removed); the entry's id and sorted indexes and
+    grouped views are then updated in place instead of being rebuilt.
+    """
+    # Uncached collections lose their version; the next read recomputes it
+    before, after = _cache_change(key, change, path, record_id)
+    _set_version(key, after)
+    if record_id is not None:
+        _record_changed(key, path, record_id, before, after)
+
+def _cache_change(key, change, path=None, record_id=None, source=None):
+    """_cache_apply without notifying listeners. Returns the versions (before, after), or Nones."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None, None
+        before = entry[6]
+        try:
+            if record_id is None:
+                change(entry[1])
+                entry[2] = None
+                entry[3] = {}
+                entry[4] = {}
+            else:
+                _apply_record_change(key, entry, change, path, record_id)
+        except (AttributeError, KeyError, TypeError):
+            del _cache[key]
+            return None, None
+        if source is not None:
+            entry[5] = source
+        entry[6] = _content_version(entry[1], entry[5])
+        return before, entry[6]
+
+def _apply_record_change(key, entry, change, path, record_id):
+    node = _child_path(key, path)
+    sorted_index = entry[3].get(path)
+    groups = entry[4].get(path)
+    date_field = SORTED_COLLECTIONS.get(node)
+    old = old_value = old_place = None
+    if sorted_index is not None or groups is not None:
+        if entry[2] is None:
+            entry[2] = _index_records(entry[1])
+        old = entry[2].get((path, record_id))
+        if old is not None:
+            # Read before the change: updates patch the record in place
+            if sorted_index is not None:
+                old_value = _sort_value(old, date_field)
+            if groups is not None:
+                old_place = _group_place(old, node)
+
+    record = change(entry[1])
+
+    if entry[2] is not None:
+        if record is None:
+            entry[2].pop((path, record_id), None)
+        else:
+            entry[2][(path, record_id)] = record
+    if sorted_index is not None:
+        if old is not None:
+            _sorted_remove(sorted_index, old, old_value)
+        if record is not None:
+            _sorted_insert(sorted_index, record, _sort_value(record, date_field))
+    if groups is not None:
+        place = _group_place(record, node) if record is not None else None
+        if place != old_place or record is not old:
+            if old is not None:
+                _group_remove(groups, old, old_place)
+            if record is not None:
+                _group_insert(groups, record, place)
+
+def _apply_op(data, op):
+    """Applies one record-level write as a local store records it (see _modify_local). Returns the data."""
+    path = op.get('path')
+    default = {} if op['op'] == 'patch' else []
+    if path and not isinstance(data, dict):
+        data = {}
+    elif not path and not isinstance(data, type(default)):
+        data = default
+    node = _node(data, path, default)
+    if op['op'] == 'append':
+        _insert(node, copy.deepcopy(op['record']), op.get('prepend', False))
+    elif op['op'] == 'update':
+        _patch_by_id(node, op['id'], copy.deepcopy(op['fields']))
+    elif op['op'] == 'delete':
+        _remove_by_id(node, op['id'])
+    elif op['op'] == 'patch':
+        node.update(copy.deepcopy(op['fields']))
+    return data
+
+def _cached_has(key, path, record_id):
+    """True/False if a cached collection has the record, None if it isn't cached."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[2] is None:
+            entry[2] = _index_records(entry[1])
+        return (path, record_id) in entry[2]
+
+def _modify_local(filename, op, change, path=None, record_id=None):
+    """Applies one record-level write to the local store (see backends.py).
+
+    `op` is the write as the store takes it (replayed by _apply_op), and
+    `change` makes the same write to the cached copy, as for Firebase
+    writes. The cached copy is only trusted if nothing else wrote the store
+    since it was loaded; otherwise a store that can't look records up itself
+    reloads the collection first. Updating or deleting a record that doesn't
+    exist writes nothing and returns False.
+    """
+    key = filename.replace('.json', '')
+    store = local_store()
+    done = True
+    # Listeners hear about the write once the locks are released
+    with _local_write_lock, store.lock(filename):
+        source = store.state(filename)
+        before = _content_version(None, source)
+        with _cache_lock:
+            entry = _cache.get(key)
+            current = entry is not None and entry[0] > time.monotonic() and entry[5] == source
+            if entry is not None and not current:
+                del _cache[key]
+        data = None
+        if not current and not store.queries:
+            data, source = _reload_local(store, key, filename)
+        if op['op'] in ('update', 'delete'):
+            found = _cached_has(key, path, record_id)
+            if found is None:  # not cached, or caching is off
+                found = _stored_has(store, filename, path, record_id, data)
+            done = found
+        if done:
+            source = store.write(filename, op)
+            _cache_change(key, change, path, record_id, source)
+    after = _content_version(None, source)
+    _set_version(key, after)
+    if done and record_id is not None:
+        _record_changed(key, path, record_id, before, after)
+    return done
+
+def _reload_local(store, key, filename):
+    """Reads a collection for a write, caching it. Caller holds the store's lock."""
+    try:
+        data, source = store.read(filename, locked=True)
+    except FileNotFoundError:
+        return None, store.state(filename)
+    except ValueError as e:
+        # Don't write on top of a collection that can't be read back
+        raise OSError(f"{filename} is not valid JSON: {e}")
+    _cache_store(key, data, source)
+    return data, source
+
+def _stored_has(store, filename, path, record_id, data):
+    if store.queries:
+        answered, record = store.get(filename, path, record_id)
+        if answered:
+            return record is not None
+        try:
+            data, _ = store.read(filename, locked=True)
+        except FileNotFoundError:
+            return False
+    return (path, record_id) in _index_records(data)
+
+def _remove_by_id(records, record_id):
+    for i, item in enumerate(records):
+        if item.get('id') == record_id:
+            del records[i]
+            return True
+    return False
+
+def _patch_by_id(records, record_id, fields):
+    """Updates a record in place. Returns it, or None if there is no such record."""
+    for item in records:
+        if item.get('id') == record_id:
+            item.update(fields)
+            return item
+    return None
+
+def _insert(records, record, prepend):
+    if prepend:
+        records.insert(0, record)
+    else:
+        records.append(record)
+    return record
+
+def get_record(filename, record_id, path=None):
+    """Fetches a single record by id without loading the whole collection.
+
+    Served from the cached collection when it is warm, otherwise via the
+    RTDB id index (two small reads regardless of collection size) or an
+    indexed SQLite lookup. Returns None if there is no such record.
+    """
+    key = filename.replace('.json', '')
+
+    cached, record = _cached_record(key, path, record_id)
+    if cached:
+        return record
+
+    if firebase_enabled():
+        try:
+            node = _child_path(key, path)
+            child_key = _resolve_child_key(node, record_id)
+            if child_key is None:
+                return None
+            record = db.reference(node).child(child_key).get()
+            if isinstance(record, dict) and record.get('id') == record_id:
+                return record
+        except Exception as e:
+            print(f"Firebase read error for {key}/{record_id}: {e}")
+
+    store = _indexed_store()
+    if store is not None:
+        try:
+            answered, record = store.get(filename, path, record_id)
+            if answered:
+                return record
+        except OSError as e:
+            print(f"Local query error for {key}/{record_id}: {e}")
+
+    # Local mode (or a stale index): load the collection, which also warms the cache
+    data = load_json(filename)
+    records = data.get(path, []) if path and isinstance(data, dict) else data
+    if not isinstance(records, list):
+        return None
+    return next((r for r in records if r.get('id') == record_id), None)
+
+def append_record(filename, record, path=None, prepend=False):
+    """Adds one record to a collection (or the list at `path` inside it)."""
+    key = filename.replace('.json', '')
+    record = _with_sort_key(_child_path(key, path), record)
+
+    def change(data):
+        return _insert(_node(data, path, []), copy.deepcopy(record), prepend)
+
+    if firebase_enabled():
+        try:
+            node = _child_path(key, path)
+            if prepend:
+                # Integer keys sort before push ids, so one below the
+                # smallest existing key puts the record first.
+                first = db.reference(node).order_by_key().limit_to_first(1).get()
+                if isinstance(first, list):
+                    # A first key of "0" comes back as an array
+                    first = {str(i): r for i, r in enumerate(first) if r is not None}
+                child_key = 0
+                if first:
+                    try:
+                        child_key = int(next(iter(first))) - 1
+                    except ValueError:
+                        pass
+                child_key = str(child_key)
+            else:
+                child_key = _push_key()
+            updates = {f"{node}/{child_key}": record}
+            if _is_valid_key(record.get('id')):
+                updates[f"{_index_path(node)}/{record['id']}"] = child_key
+            db.reference().update(updates)
+            _cache_apply(key, change, path, record.get('id'))
+            return True
+        except Exception as e:
+            print(f"Firebase append error for {key}: {e}")
+
+    try:
+        op = {'op': 'append', 'path': path, 'record': record, 'prepend': prepend}
+        return _modify_local(filename, op, change, path, record.get('id'))
+    except OSError as e:
+        print(f"Local save error for {filename}: {e}")
+        invalidate_cache(filename)
+        return False
+
+def update_record(filename, record_id, fields, path=None):
+    """Updates the given fields of the record with `record_id`. Returns False if not found."""
+    key = filename.replace('.json', '')
+    date_field = SORTED_COLLECTIONS.get(_child_path(key, path))
+    if date_field in fields:
+        fields = dict(fields, **{SORT_FIELD: sort_key_for(fields[date_field], record_id)})
+
+    def change(data):
+        return _patch_by_id(_node(data, path, []), record_id, copy.deepcopy(fields))
+
+    if firebase_enabled():
+        try:
+            node = _child_path(key, path)
+            child_key = _resolve_child_key(node, record_id)
+            if child_key is None:
+                return False
+            db.reference(node).child(child_key).update(fields)
+            _cache_apply(key, change, path, record_id)
+            return True
+        except Exception as e:
+            print(f"Firebase update error for {key}: {e}")
+
+    try:
+        op = {'op': 'update', 'path': path, 'id': record_id, 'fields': fields}
+        return _modify_local(filename, op, change, path, record_id)
+    except OSError as e:
+        print(f"Local save error for {filename}: {e}")
+        invalidate_cache(filename)
+        return False
+
+def delete_record(filename, record_id, path=None):
+    """Removes the record with `record_id`. Returns False if not found."""
+    key = filename.replace('.json', '')
+
+    def change(data):
+        _remove_by_id(_node(data, path, []), record_id)
+
+    if firebase_enabled():
+        try:
+            node = _child_path(key, path)
+            child_key = _resolve_child_key(node, record_id)
+            if child_key is None:
+                return False
+            updates = {f"{node}/{child_key}": None}
+            if _is_valid_key(record_id):
+                updates[f"{_index_path(node)}/{record_id}"] = None
+            db.reference().update(updates)
+            _cache_apply(key, change, path, record_id)
+            return True
+        except Exception as e:
+            print(f"Firebase delete error for {key}: {e}")
+
+    try:
+        return _modify_local(filename, {'op': 'delete', 'path': path, 'id': record_id}, change, path, record_id)
+    except OSError as e:
+        print(f"Local save error for {filename}: {e}")
+        invalidate_cache(filename)
+        return False
+
+def patch_json(filename, fields, path=None):
+    """Merges `fields` into the object at `path` (e.g. placements 'stats')."""
+    key = filename.replace('.json', '')
+
+    def change(data):
+        _node(data, path, {}).update(copy.deepcopy(fields))
+
+    if firebase_enabled():
+        try:
+            db.reference(_child_path(key, path)).update(fields)
+            _cache_apply(key, change)
+            return True
+        except Exception as e:
+            print(f"Firebase update error for {key}: {e}")
+
+    try:
+        return _modify_local(filename, {'op': 'patch', 'path': path, 'fields': fields}, change)
+    except OSError as e:
+        print(f"Local save error for {filename}: {e}")
+        invalidate_cache(filename)
+        return False
+
+# Paged reads
+# Listing pages show a collection newest first, `limit` records at a time.
+# Record lists in SORTED_COLLECTIONS carry a `sort_key` ("<ISO date>|<id>")
+# written with the record, so RTDB can order and limit on the server (add
+# ".indexOn": ["sort_key"] for them in the database rules); other lists are
+# paged in child-key order, which follows insertion order. The cursor handed
+# to the next page is the sort key (or id) of the last record shown.
+SORT_FIELD = 'sort_key'
+SORTED_COLLECTIONS = {
+    'news': 'date',
+    'activities': 'date',
+    'academics/calendar': 'date',
+    'academics/notices': 'date',
+}
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 12))
+MAX_PAGE_SIZE = 100
+
+_DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%B %d %Y', '%b %d %Y', '%d %B %Y', '%d %b %Y', '%B %Y', '%b %Y')
+# "June 15 - 20, 2025" -> "June 15 2025": ranges sort by their first day
+_DATE_RANGE = re.compile(r'^(\w+ \d{1,2})\s*-\s*\d{1,2}(?=\s+\d{4}$)')
+
+def parse_date(text):
+    """Parses the free-form dates admins type ("DEC 28, 2024", "2024-12-28"). Returns a date or None."""
+    if not isinstance(text, str):
+        return None
+    cleaned = ' '.join(text.replace(',', ' ').replace('.', ' ').split())
+    cleaned = _DATE_RANGE.sub(r'\1', cleaned)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def sort_key_for(date_text, record_id):
+    """Builds the sort_key of a dated record; undated records sort oldest."""
+    parsed = parse_date(date_text)
+    return f"{parsed.isoformat() if parsed else '0000-00-00'}|{record_id}"
+
+def _with_sort_key(node, record):
+    date_field = SORTED_COLLECTIONS.get(node)
+    if not date_field or not isinstance(record, dict):
+        return record
+    return dict(record, **{SORT_FIELD: sort_key_for(record.get(date_field), record.get('id'))})
+
+def add_sort_keys(key, data):
+    """Sets sort_key on every record of the sorted lists in a collection (in place)."""
+    for node, date_field in SORTED_COLLECTIONS.items():
+        parts = node.split('/')
+        if parts[0] != key:
+            continue
+        records = data
+        for part in parts[1:]:
+            records = records.get(part) if isinstance(records, dict) else None
+        if isinstance(records, list):
+            for item in records:
+                if isinstance(item, dict):
+                    item[SORT_FIELD] = sort_key_for(item.get(date_field), item.get('id'))
+    return data
+
+def rebuild_sort_keys(filename):
+    """Writes sort_key onto every record of a collection's sorted lists in RTDB. Returns the count."""
+    key = filename.replace('.json', '')
+    updates = {}
+    for node, date_field in SORTED_COLLECTIONS.items():
+        if node.split('/')[0] != key:
+            continue
+        raw = db.reference(node).get()
+        children = raw.items() if isinstance(raw, dict) else enumerate(raw or [])
+        for child_key, item in children:
+            if isinstance(item, dict):
+                updates[f"{node}/{child_key}/{SORT_FIELD}"] = sort_key_for(item.get(date_field), item.get('id'))
+    if updates:
+        db.reference().update(updates)
+    return len(updates)
+
+# Sorted indexes
+# Cached collections keep, for each list in SORTED_COLLECTIONS, its sort keys
+# in ascending order next to the matching records: ([sort_key], [record]).
+# The index is built once per cache fill, then single-record writes insert or
+# remove one entry (binary search) and pages are plain slices, so no request
+# sorts the collection.
+def _sort_value(record, date_field):
+    return record.get(SORT_FIELD) or sort_key_for(record.get(date_field), record.get('id'))
+
+def _record_columns(filename, path, record):
+    """(department, date, category) a record is indexed by in the SQLite store.
+
+    The date is the sort value in SORTED_COLLECTIONS lists, so pages can be
+    read in date order straight off the index.
+    """
+    date_field = SORTED_COLLECTIONS.get(_child_path(filename.replace('.json', ''), path))
+    date = _sort_value(record, date_field) if date_field else record.get('date')
+    return record.get('department'), date, record.get('category')
+
+def _build_sorted(records, date_field):
+    pairs = sorted(((_sort_value(r, date_field), r) for r in records if isinstance(r, dict)),
+                   key=lambda pair: pair[0])
+    return [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+
+def _sorted_remove(sorted_index, record, value):
+    keys, ordered = sorted_index
+    i = bisect.bisect_left(keys, value)
+    while i < len(keys) and keys[i] == value:
+        if ordered[i] is record:
+            del keys[i]
+            del ordered[i]
+            return
+        i += 1
+
+def _sorted_insert(sorted_index, record, value):
+    keys, ordered = sorted_index
+    i = bisect.bisect_right(keys, value)
+    keys.insert(i, value)
+    ordered.insert(i, record)
+
+def _records_at(data, path):
+    records = data.get(path, []) if path and isinstance(data, dict) else data
+    return records if isinstance(records, list) else []
+
+def _slice_sorted(sorted_index, limit, cursor):
+    """Returns (records newest first, next cursor) ending just before `cursor`."""
+    keys, ordered = sorted_index
+    end = bisect.bisect_left(keys, cursor) if cursor else len(keys)
+    start = max(0, end - limit) if limit else 0
+    return ordered[start:end][::-1], (keys[start] if start > 0 else None)
+
+def _page_from_list(records, node, limit, cursor):
+    date_field = SORTED_COLLECTIONS.get(node)
+    records = [r for r in records if isinstance(r, dict)]
+    if date_field:
+        return _slice_sorted(_build_sorted(records, date_field), limit, cursor)
+    values = [r.get('id') for r in records]
+    end = values.index(cursor) if cursor in values else (0 if cursor else len(records))
+    start = max(0, end - limit)
+    return records[start:end][::-1], (values[start] if start > 0 else None)
+
+def _cached_page(key, path, limit, cursor):
+    """Pages through a cached collection. Returns (cached, records, next_cursor)."""
+    node = _child_path(key, path)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return False, None, None
+        _cache_stats['hits'] += 1
+        if node in SORTED_COLLECTIONS:
+            sorted_index = entry[3].get(path)
+            if sorted_index is None:
+                sorted_index = entry[3][path] = _build_sorted(_records_at(entry[1], path), SORTED_COLLECTIONS[node])
+            page, next_cursor = _slice_sorted(sorted_index, limit, cursor)
+        else:
+            page, next_cursor = _page_from_list(_records_at(entry[1], path), node, limit, cursor)
+        return True, copy.deepcopy(page), next_cursor
+
+def _page_from_rtdb(node, limit, cursor):
+    date_field = SORTED_COLLECTIONS.get(node)
+    if date_field:
+        query = db.reference(node).order_by_child(SORT_FIELD)
+        end_value = cursor
+    else:
+        query = db.reference(node).order_by_key()
+        end_value = _resolve_child_key(node, cursor) if cursor else None
+        if cursor and end_value is None:
+            return [], None
+    if end_value is not None:
+        # end_at is inclusive, so the cursor record itself comes back too
+        query = query.end_at(end_value)
+    rows = query.limit_to_last(limit + 2 if cursor else limit + 1).get() or {}
+    if isinstance(rows, dict):
+        # The SDK orders the keys as plain strings ("10" before "9"); put
+        # them back in RTDB key order so the cursor and slice see the real order
+        rows = [r for _, r in (rows.items() if date_field else sorted(rows.items(), key=_rtdb_key_order))]
+    items = [r for r in rows if isinstance(r, dict)]
+    marker = SORT_FIELD if date_field else 'id'
+    if cursor and items and items[-1].get(marker) == cursor:
+        items.pop()
+    has_more = len(items) > limit
+    page = items[-limit:][::-1] if limit else []
+    return page, (page[-1].get(marker) if has_more and page else None)
+
+def load_page(filename, limit=None, cursor=None, path=None):
+    """Returns (records, next_cursor) for one page of a record list, newest first.
+
+    Pass next_cursor back as `cursor` to get the following page; it is None
+    on the last page. Served from the cached collection when it is warm, and
+    from an ordered, limited RTDB or SQLite query otherwise, so a page costs
+    the same however long the archive gets.
+    """
+    key = filename.replace('.json', '')
+    node = _child_path(key, path)
+    limit = max(1, min(limit or PAGE_SIZE, MAX_PAGE_SIZE))
+
+    cached, page, next_cursor = _cached_page(key, path, limit, cursor)
+    if cached:
+        return page, next_cursor
+    if firebase_enabled():
+        try:
+            return _page_from_rtdb(node, limit, cursor)
+        except Exception as e:
+            print(f"Firebase page query error for {node}: {e}")
+    store = _indexed_store()
+    if store is not None:
+        try:
+            answered, page, next_cursor = store.page(filename, path, limit, cursor, node in SORTED_COLLECTIONS)
+            if answered:
+                return page, next_cursor
+        except OSError as e:
+            print(f"Local page query error for {node}: {e}")
+
+    data = load_json(filename)
+    cached, page, next_cursor = _cached_page(key, path, limit, cursor)
+    if cached:
+        return page, next_cursor
+    # Caching is off: sort this one copy
+    return _page_from_list(_records_at(data, path), node, limit, cursor)
+
+def sorted_records(filename, path=None, oldest_first=False):
+    """Returns a whole dated record list in date order (newest first by default).
+
+    Read from the cached sorted index, so it costs a copy, not a sort.
+    """
+    key = filename.replace('.json', '')
+    node = _child_path(key, path)
+    if node not in SORTED_COLLECTIONS:
+        raise KeyError(f"{node} is not a sorted collection")
+    cached, records, _ = _cached_page(key, path, 0, None)
+    if not cached:
+        data = load_json(filename)
+        cached, records, _ = _cached_page(key, path, 0, None)
+        if not cached:
+            records, _ = _page_from_list(_records_at(data, path), node, 0, None)
+    return records[::-1] if oldest_first else records
+
+# Grouped views
+# Record lists in GROUPED_COLLECTIONS can be read grouped by a field, each
+# group ordered by rank and then list order: faculty by department, HOD first.
+# Cached collections keep the view ({group: ([rank], [record])}) next to the
+# data; it is built once per cache fill and a single-record write moves just
+# that record (an edit that changes its group or rank puts it last in its new
+# rank). Uncached, one group is fetched with an RTDB equalTo query, so add
+# ".indexOn": ["department"] for faculty in the database rules.
+ROLE_ORDER = ('HOD', 'Faculty', 'Staff')  # unknown roles rank after these
+GROUPED_COLLECTIONS = {
+    # record list: (group field, rank field, rank order)
+    'faculty': ('department', 'role', ROLE_ORDER),
+}
+DEFAULT_GROUP = 'Other'
+
+def _group_place(record, node):
+    """Returns (group, rank) of a record in its list's grouped view."""
+    group_field, rank_field, order = GROUPED_COLLECTIONS[node]
+    rank = record.get(rank_field)
+    return record.get(group_field) or DEFAULT_GROUP, order.index(rank) if rank in order else len(order)
+
+def _group_insert(groups, record, place):
+    group, rank = place
+    _sorted_insert(groups.setdefault(group, ([], [])), record, rank)
+
+def _group_remove(groups, record, place):
+    group, rank = place
+    if group in groups:
+        _sorted_remove(groups[group], record, rank)
+        if not groups[group][0]:
+            del groups[group]
+
+def _build_groups(records, node):
+    groups = {}
+    for record in records:
+        if isinstance(record, dict):
+            _group_insert(groups, record, _group_place(record, node))
+    return groups
+
+def _cached_groups(key, path, group):
+    """Reads a cached grouped view. Returns (cached, {group: [records]})."""
+    node = _child_path(key, path)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return False, None
+        _cache_stats['hits'] += 1
+        groups = entry[4].get(path)
+        if groups is None:
+            groups = entry[4][path] = _build_groups(_records_at(entry[1], path), node)
+        if group is not None:
+            groups = {group: groups[group]} if group in groups else {}
+        return True, copy.deepcopy({name: records for name, (_, records) in groups.items()})
+
+def _ordered_groups(groups, order):
+    """Puts groups named in `order` first, in that order; the rest follow by name."""
+    if not order:
+        return groups
+    first = [name for name in dict.fromkeys(order) if name in groups]
+    rest = sorted(name for name in groups if name not in first)
+    return {name: groups[name] for name in first + rest}
+
+def load_groups(filename, group=None, order=None, path=None):
+    """Returns {group: [records]} for a record list in GROUPED_COLLECTIONS.
+
+    With `group`, only that group is returned (and, when the collection is
+    not cached, only its records are fetched from Firebase or SQLite).
+    `order` lists group names to put first, e.g. department names in site
+    order.
+    """
+    key = filename.replace('.json', '')
+    node = _child_path(key, path)
+    group_field = GROUPED_COLLECTIONS[node][0]
+
+    cached, groups = _cached_groups(key, path, group)
+    if cached:
+        return _ordered_groups(groups, order)
+    if group is not None and firebase_enabled():
+        try:
+            rows = db.reference(node).order_by_child(group_field).equal_to(group).get() or {}
+            if isinstance(rows, dict):
+                # The SDK orders equal values by key as strings ("10" before
+                # "2"); list order is RTDB key order
+                rows = [r for _, r in sorted(rows.items(), key=_rtdb_key_order)]
+            records = [r for r in rows if isinstance(r, dict)]
+            return {name: records for name, (_, records) in _build_groups(records, node).items()}
+        except Exception as e:
+            print(f"Firebase group query error for {node}: {e}")
+    store = _indexed_store() if group is not None else None
+    if store is not None:
+        try:
+            # Records without the field are in DEFAULT_GROUP too
+            values = [group, None, ''] if group == DEFAULT_GROUP else [group]
+            answered, records = store.find(filename, path, group_field, values)
+            if answered:
+                return {name: records for name, (_, records) in _build_groups(records, node).items()}
+        except OSError as e:
+            print(f"Local group query error for {node}: {e}")
+
+    data = load_json(filename)
+    cached, groups = _cached_groups(key, path, group)
+    if not cached:
+        # Caching is off: group this one copy
+        groups = _build_groups(_records_at(data, path), node)
+        if group is not None:
+            groups = {group: groups[group]} if group in groups else {}
+        groups = {name: records for name, (_, records) in groups.items()}
+    return _ordered_groups(groups, order)
+
 def get_faculty_by_dept(faculty_list):
-    """Groups faculty by department for display."""
-    grouped = {}
-    for fac in faculty_list:
-        dept = fac.get('department', 'Other')
-        if dept not in grouped:
-            grouped[dept] = []
-        grouped[dept].append(fac)
-    return grouped
+    """Groups faculty by department for display, HOD first in each department."""
+    return {name: records for name, (_, records) in _build_groups(faculty_list, 'faculty').items()}